@@ -124,3 +124,13 @@ def change_password_url():
 @pytest.fixture
 def user_info_url():
     return reverse('user_info')
+
+
+@pytest.fixture
+def profile_url():
+    return reverse('profile-list')
+
+
+@pytest.fixture
+def profile_sync_url():
+    return reverse('profile-sync')
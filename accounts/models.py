@@ -50,6 +50,8 @@ class User(AbstractUser, PermissionsMixin):
     # MFA fields (feature-flagged)
     mfa_enabled = models.BooleanField(default=False)
     mfa_secret = models.CharField(max_length=255, blank=True, null=True)
+    # Part of the profile's Last-Modified, which nests the user
+    updated_at = models.DateTimeField(auto_now=True)
 
     username = None
 
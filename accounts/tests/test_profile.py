@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+import pytest
+from django.utils.http import http_date
+from rest_framework import status
+from accounts.models import UserProfile
+
+pytestmark = [pytest.mark.django_db, pytest.mark.auth]
+
+
+class TestProfileConditionalGet:
+    """Test Last-Modified and If-Modified-Since on the profile endpoints."""
+
+    def test_sync_not_modified(self, authenticated_client, profile_sync_url):
+        """Test that an unchanged profile gets a 304, and the sync is still recorded."""
+        client, user = authenticated_client
+        last_modified = client.get(profile_sync_url)['Last-Modified']
+        synced = UserProfile.objects.get(pk=user.profile.pk).last_synced
+
+        response = client.get(profile_sync_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['Last-Modified'] == last_modified
+        profile = UserProfile.objects.get(pk=user.profile.pk)
+        assert profile.last_synced > synced
+        assert profile.sync_status == 'synced'
+
+    def test_sync_modified(self, authenticated_client, profile_sync_url):
+        """Test that a profile changed after If-Modified-Since is sent in full."""
+        client, user = authenticated_client
+        profile = user.profile
+        since = http_date((profile.updated_at - timedelta(seconds=5)).timestamp())
+
+        response = client.get(profile_sync_url, HTTP_IF_MODIFIED_SINCE=since)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['id'] == profile.id
+        assert response.data['sync_status'] == 'synced'
+
+    def test_sync_does_not_touch_last_modified(self, authenticated_client, profile_sync_url):
+        """Test that syncing alone does not change the profile's Last-Modified."""
+        client, user = authenticated_client
+
+        first = client.get(profile_sync_url)
+        second = client.get(profile_sync_url)
+
+        assert first['Last-Modified'] == second['Last-Modified']
+
+    def test_list_not_modified(self, authenticated_client, profile_url):
+        """Test that the profile itself is also answered with a 304 when unchanged."""
+        client, user = authenticated_client
+        last_modified = client.get(profile_url)['Last-Modified']
+
+        response = client.get(profile_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_user_change_is_modified(self, authenticated_client, profile_sync_url):
+        """Test that editing the nested user changes the validators, even within the same second."""
+        client, user = authenticated_client
+        first = client.get(profile_sync_url)
+
+        user.name = 'Renamed User'
+        user.save()
+        response = client.get(profile_sync_url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != first['ETag']
+        assert response.data['user']['name'] == 'Renamed User'
+
+    def test_etag_not_modified(self, authenticated_client, profile_url):
+        """Test that a current ETag gets a 304."""
+        client, user = authenticated_client
+        etag = client.get(profile_url)['ETag']
+
+        response = client.get(profile_url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
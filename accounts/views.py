@@ -4,6 +4,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.core.mail import send_mail
 from django.conf import settings
@@ -57,13 +59,30 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         """
         return self.request.user.profile
 
+    def conditional_response(self, request, profile):
+        """
+        Respond with the profile and its validators, or 304 if it has not
+        changed since the request's ``If-None-Match`` or ``If-Modified-Since``.
+
+        The profile nests its user, so both are taken from the later of the
+        two ``updated_at``. ``Last-Modified`` only has whole seconds; the
+        ``ETag`` tells apart writes within the same second.
+        """
+        updated_at = max(profile.updated_at, profile.user.updated_at)
+        etag = f'W/"{int(updated_at.timestamp() * 1_000_000)}"'
+        last_modified = int(updated_at.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(self.get_serializer(profile).data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
     def list(self, request, *args, **kwargs):
         """
         Return the profile for the authenticated user.
         """
-        profile = self.get_object()
-        serializer = self.get_serializer(profile)
-        return Response(serializer.data)
+        return self.conditional_response(request, self.get_object())
 
     @action(detail=False, methods=['put'], serializer_class=UserProfileUpdateSerializer)
     def update_profile(self, request):
@@ -115,17 +134,21 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         """
         Sync the user profile from the mobile app.
 
-        This endpoint returns the latest profile data from the server.
+        This endpoint returns the latest profile data from the server. Send the
+        ``Last-Modified`` of the previous response as ``If-Modified-Since`` to
+        get a 304 if the profile has not changed since.
         """
         profile = self.get_object()
 
-        # Update last_synced timestamp
+        # Update last_synced timestamp. Written with update() so that updated_at,
+        # the profile's Last-Modified, only changes when the profile does
         profile.last_synced = timezone.now()
         profile.sync_status = 'synced'
-        profile.save()
+        UserProfile.objects.filter(pk=profile.pk).update(
+            last_synced=profile.last_synced, sync_status=profile.sync_status
+        )
 
-        serializer = self.get_serializer(profile)
-        return Response(serializer.data)
+        return self.conditional_response(request, profile)
 
 
 class RegisterView(generics.CreateAPIView):
@@ -0,0 +1,136 @@
+# backend/pagination.py
+"""
+Keyset pagination for the API's list endpoints.
+"""
+import base64
+import binascii
+import json
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate on ``(created_at, id)``, continuing after the last row of the page.
+
+    The ``next`` link carries an opaque cursor holding that row's position,
+    and the next page is read with a range condition on it instead of an
+    offset, so with an index on the ordering columns a deep page costs the
+    same as the first one. Views whose model records its creation time under
+    another name, or that list newest first (``('-created_at', '-id')``), set
+    ``pagination_ordering``. Rows may also be ``values()`` dicts that include
+    the ordering fields.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    ordering = ('created_at', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        page_size = self.get_page_size(request)
+        timestamp_field, id_field = (field.lstrip('-') for field in self.ordering)
+        after, seen = ('lte', 'gte') if self.ordering[0].startswith('-') else ('gte', 'lte')
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            timestamp, pk = position
+            # Written as a range on the timestamp so the index scan starts at
+            # the cursor, minus the rows of that timestamp already returned
+            queryset = queryset.filter(**{f'{timestamp_field}__{after}': timestamp}).exclude(
+                **{timestamp_field: timestamp, f'{id_field}__{seen}': pk}
+            )
+
+        rows = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            if isinstance(last, dict):
+                self.next_position = (last[timestamp_field], last[id_field])
+            else:
+                self.next_position = (getattr(last, timestamp_field), getattr(last, id_field))
+        return rows
+
+    def get_ordering(self, view):
+        return getattr(view, 'pagination_ordering', self.ordering)
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+                if page_size > 0:
+                    return min(page_size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            timestamp, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            timestamp = parse_datetime(timestamp)
+            if timestamp is None or not isinstance(pk, int):
+                raise ValueError(encoded)
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return timestamp, pk
+
+    def encode_cursor(self, position):
+        timestamp, pk = position
+        encoded = base64.urlsafe_b64encode(json.dumps([timestamp.isoformat(), pk]).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
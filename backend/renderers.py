@@ -0,0 +1,79 @@
+# backend/renderers.py
+"""
+JSON rendering with orjson.
+
+orjson serializes floats, datetimes and UUIDs natively, several times faster
+than ``json`` with DRF's encoder, which dominates the cost of the sync and
+list responses. Types orjson does not know (``Decimal``, lazy translations,
+querysets, ...) go through DRF's ``JSONEncoder.default``, so everything DRF
+can render still renders.
+"""
+import orjson
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z
+
+_default = JSONEncoder().default
+
+
+def _escape(content):
+    # As DRF does, so the output is a strict JavaScript subset
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def dumps(data, option=0):
+    """
+    Encode ``data`` as JSON bytes.
+    """
+    return _escape(orjson.dumps(data, default=_default, option=OPTIONS | option))
+
+
+def iter_json_array(items, chunk_size=500):
+    """
+    Yield a JSON array of ``items`` in chunks of ``chunk_size`` encoded items.
+
+    Only one chunk is held in memory at a time, whatever the number of items.
+    """
+    separator = b'['
+    chunk = []
+    for item in items:
+        chunk.append(dumps(item))
+        if len(chunk) >= chunk_size:
+            yield separator + b','.join(chunk)
+            separator = b','
+            chunk = []
+    if chunk:
+        yield separator + b','.join(chunk)
+        separator = b','
+    yield b']' if separator == b',' else b'[]'
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """
+    Response streaming a JSON array of ``items`` as they are produced.
+    """
+
+    def __init__(self, items, chunk_size=500, **kwargs):
+        kwargs.setdefault('content_type', ORJSONRenderer.media_type)
+        super().__init__(iter_json_array(items, chunk_size), **kwargs)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` encoding with orjson.
+
+    orjson only indents by two spaces, which is used for any requested indent.
+    Non-ASCII characters are always output as UTF-8, as with DRF's default
+    ``UNICODE_JSON``.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        return dumps(data, orjson.OPT_INDENT_2 if indent else 0)
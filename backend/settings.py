@@ -59,6 +59,17 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        "backend.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "backend.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    "DEFAULT_PAGINATION_CLASS": "backend.pagination.KeysetPagination",
+    "PAGE_SIZE": config("API_PAGE_SIZE", default=100, cast=int),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
@@ -168,9 +179,12 @@ CORS_ALLOW_HEADERS = [
     "authorization",
     "content-type",
     "dnt",
+    "idempotency-key",
     "origin",
+    "prefer",
     "user-agent",
     "x-csrftoken",
+    "x-device-id",
     "x-requested-with",
 ]
 
@@ -218,6 +232,41 @@ AUTH_USER_MODEL = "accounts.User"
 DATA_UPLOAD_MAX_NUMBER_FIELDS = None
 DATA_UPLOAD_MAX_NUMBER_FILES = None
 
+# Bulk sync: rows written per bulk_create/bulk_update statement
+SYNC_BATCH_SIZE = config("SYNC_BATCH_SIZE", default=500, cast=int)
+# Sync endpoints: commit every N rows instead of once per request (0 = one
+# transaction per request)
+SYNC_COMMIT_EVERY = config("SYNC_COMMIT_EVERY", default=0, cast=int)
+# Idempotency-Key: how long (seconds) a stored sync response can be replayed,
+# how long a duplicate waits for the in-flight original before giving up, and
+# after how long an in-flight claim whose worker died can be taken over
+IDEMPOTENCY_KEY_TTL = config("IDEMPOTENCY_KEY_TTL", default=86400, cast=int)
+IDEMPOTENCY_WAIT_TIMEOUT = config("IDEMPOTENCY_WAIT_TIMEOUT", default=30, cast=int)
+IDEMPOTENCY_LEASE_TIMEOUT = config("IDEMPOTENCY_LEASE_TIMEOUT", default=120, cast=int)
+# Farm list/retrieve responses: seconds they stay in the shared cache (0
+# disables caching) and number kept in each process's LRU in front of it
+RESPONSE_CACHE_TIMEOUT = config("RESPONSE_CACHE_TIMEOUT", default=300, cast=int)
+RESPONSE_CACHE_LRU_SIZE = config("RESPONSE_CACHE_LRU_SIZE", default=256, cast=int)
+
+CACHE_BACKEND = config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache")
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": config("CACHE_LOCATION", default=""),
+    }
+}
+# Whether the default cache is shared by every process writing farm data (web
+# workers and process_sync_jobs). The farm collection versions live in it, so
+# without a shared cache the farm responses are neither cached nor given ETags.
+RESPONSE_CACHE_SHARED = config(
+    "RESPONSE_CACHE_SHARED",
+    default=CACHE_BACKEND not in (
+        "django.core.cache.backends.locmem.LocMemCache",
+        "django.core.cache.backends.dummy.DummyCache",
+    ),
+    cast=bool,
+)
+
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = config("EMAIL_HOST")
 EMAIL_PORT = config("EMAIL_PORT", cast=int)
@@ -4,6 +4,7 @@ from django.urls import path
 from django.shortcuts import redirect
 from django.template.response import TemplateResponse
 from django.utils.html import format_html
+from farm.geometry import bbox
 from farm.models import Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation
 import csv
 from datetime import datetime
@@ -55,13 +56,21 @@ class InspectionObservationInline(admin.TabularInline):
 
 @admin.register(Farm)
 class FarmAdmin(admin.ModelAdmin):
-    list_display = ('name', 'size', 'plant_type', 'created_at', 'user')
+    list_display = ('name', 'size', 'boundary_area', 'plant_type', 'created_at', 'user')
     list_filter = ('plant_type', 'created_at')
     search_fields = ('name', 'user__email')
     ordering = ('-created_at',)
     list_per_page = 20
     inlines = [BoundaryPointInline, ObservationPointInline, InspectionSuggestionInline, InspectionObservationInline]
     
+    def boundary_area(self, obj):
+        """Area enclosed by the boundary, from the cached geometry."""
+        if obj.geometry:
+            return f"{obj.geometry['area_acres']:.2f} acres"
+        return "—"
+    
+    boundary_area.short_description = 'Boundary Area'
+    
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
@@ -146,23 +155,21 @@ class FarmAdmin(admin.ModelAdmin):
             ]))
             return tbl
 
-        def generate_satellite_map(boundary_points, observation_points):
+        def generate_satellite_map(farm_geometry, observation_points):
             """Generate a satellite map image with farm boundary and observation points overlay."""
-            if not boundary_points:
+            if not farm_geometry:
                 return None
             
             try:
-                # Calculate bounding box including both boundary and observation points
-                all_lats = [bp.latitude for bp in boundary_points]
-                all_lons = [bp.longitude for bp in boundary_points]
+                # Start from the boundary's cached bounding box
+                boxes = [farm_geometry['bbox']]
                 
-                # Add observation points to bounding box calculation
+                # Widen it to the observation points
                 if observation_points:
-                    all_lats.extend([op.latitude for op in observation_points])
-                    all_lons.extend([op.longitude for op in observation_points])
+                    boxes.append(bbox([(op.latitude, op.longitude) for op in observation_points]))
                 
-                min_lat, max_lat = min(all_lats), max(all_lats)
-                min_lon, max_lon = min(all_lons), max(all_lons)
+                min_lat, max_lat = min(b['min_latitude'] for b in boxes), max(b['max_latitude'] for b in boxes)
+                min_lon, max_lon = min(b['min_longitude'] for b in boxes), max(b['max_longitude'] for b in boxes)
                 
                 # Add padding to the bounding box
                 lat_padding = (max_lat - min_lat) * 0.1 if max_lat != min_lat else 0.001
@@ -195,10 +202,11 @@ class FarmAdmin(admin.ModelAdmin):
                     draw.line([(0, i), (img_width, i)], fill=(200, 200, 200, 50))
                 
                 # Draw boundary polygon
-                if len(boundary_points) >= 3:
+                polygon = farm_geometry['polygon']
+                if len(polygon) >= 3:
                     polygon_points = []
-                    for bp in boundary_points:
-                        x, y = lat_lon_to_pixel(bp.latitude, bp.longitude)
+                    for lat, lon in polygon:
+                        x, y = lat_lon_to_pixel(lat, lon)
                         polygon_points.append((x, y))
                     
                     # Close the polygon
@@ -208,8 +216,8 @@ class FarmAdmin(admin.ModelAdmin):
                     draw.polygon(polygon_points, fill=(255, 255, 0, 100), outline=(255, 0, 0, 255))
                 
                 # Draw boundary points (red circles)
-                for bp in boundary_points:
-                    x, y = lat_lon_to_pixel(bp.latitude, bp.longitude)
+                for lat, lon in polygon:
+                    x, y = lat_lon_to_pixel(lat, lon)
                     draw.ellipse([x-4, y-4, x+4, y+4], fill='red', outline='darkred', width=2)
                 
                 # Draw observation points (blue squares)
@@ -248,6 +256,13 @@ class FarmAdmin(admin.ModelAdmin):
             ["Created At", farm.created_at.strftime("%Y-%m-%d %H:%M:%S")],
             ["User", farm.user.name],
         ]
+        if farm.geometry:
+            centroid = farm.geometry['centroid']
+            farm_data += [
+                ["Boundary Area", f"{farm.geometry['area_acres']:.2f} acres ({farm.geometry['area_m2']:.0f} m²)"],
+                ["Boundary Perimeter", f"{farm.geometry['perimeter_m']:.0f} m"],
+                ["Centroid", f"{centroid['latitude']:.6f}, {centroid['longitude']:.6f}"],
+            ]
         elements.append(styled_table(farm_data, col_widths=[120, 380]))
         elements.append(Spacer(1, 20))
 
@@ -292,11 +307,10 @@ class FarmAdmin(admin.ModelAdmin):
         elements.append(Paragraph("Farm Boundary Satellite Map", styles["SectionHeading"]))
         elements.append(Spacer(1, 6))
         
-        boundary_points = list(farm.boundary_points.all())
         observation_points = list(farm.observation_points.all())
         
-        if boundary_points:
-            map_image_buffer = generate_satellite_map(boundary_points, observation_points)
+        if farm.geometry:
+            map_image_buffer = generate_satellite_map(farm.geometry, observation_points)
             if map_image_buffer:
                 try:
                     # Add the satellite map image to the PDF
@@ -0,0 +1,73 @@
+# farm/boundaries.py
+"""
+Farm boundary rings and the geometry cached from them.
+
+A farm's ring is its boundary points in id order. ``Farm.geometry`` caches
+what maps and reports derive from it: the ordered polygon, its bounding box,
+area, centroid and perimeter (see ``farm.geometry``), or null while the farm
+has no boundary points. It is recomputed only when boundary points change:
+by the signals on single saves and deletes, and by the bulk sync paths, which
+call ``refresh_geometry`` themselves.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import caching
+from .changes import ENTITY_TYPES, record_changes
+from .geometry import ring_geometry
+from .models import Farm, BoundaryPoint
+
+
+def rings(farm_ids):
+    """
+    Map each of ``farm_ids`` to its boundary ring of ``(latitude, longitude)`` pairs.
+    """
+    found = {farm_id: [] for farm_id in farm_ids}
+    rows = (
+        BoundaryPoint.objects.filter(farm_id__in=list(found))
+        .order_by('farm_id', 'id')
+        .values_list('farm_id', 'latitude', 'longitude')
+    )
+    for farm_id, latitude, longitude in rows:
+        found[farm_id].append((latitude, longitude))
+    return found
+
+
+def farm_geometry(ring):
+    """
+    The ``Farm.geometry`` of a ring: the polygon and its derived geometry, or None if it is empty.
+    """
+    if not ring:
+        return None
+    return {'polygon': [[latitude, longitude] for latitude, longitude in ring], **ring_geometry(ring)}
+
+
+def refresh_geometry(farm_ids):
+    """
+    Recompute the cached geometry of ``farm_ids`` from their boundary points.
+
+    Only the farms whose geometry changed are written; they are recorded in
+    the change log and their owners' cached responses invalidated. Returns
+    the number of such farms.
+    """
+    farms = Farm.objects.filter(id__in=list(farm_ids)).values_list('id', 'user_id', 'geometry')
+    stored = {farm_id: (user_id, geometry) for farm_id, user_id, geometry in farms}
+    if not stored:
+        return 0
+
+    changed = []
+    by_user = defaultdict(list)
+    for farm_id, ring in rings(stored).items():
+        user_id, before = stored[farm_id]
+        geometry = farm_geometry(ring)
+        if geometry != before:
+            changed.append(Farm(id=farm_id, geometry=geometry))
+            by_user[user_id].append(farm_id)
+    Farm.objects.bulk_update(changed, ['geometry'], batch_size=settings.SYNC_BATCH_SIZE)
+
+    entity_type = ENTITY_TYPES[Farm]
+    for user_id, ids in by_user.items():
+        record_changes(user_id, entity_type, ids)
+        caching.invalidate(user_id, [entity_type])
+    return len(changed)
@@ -0,0 +1,209 @@
+# farm/caching.py
+"""
+Per-user cache and conditional GET of the farm list and retrieve responses.
+
+Each user has a version number per collection (``farms``, ``boundary_points``,
+...) in the shared cache. A response is cached under a key made of the request
+URL and the versions of the collections it reads, so a write only has to bump
+the versions of the collections it touches: later requests build new keys, and
+the stale entries are never read again and expire. Versions are bumped by the
+``post_save``/``post_delete`` signals and by the bulk sync paths.
+
+Responses are also kept in a small in-process LRU in front of the shared
+cache. That is safe across processes because the versions themselves are
+always read from the shared cache.
+
+The same versions give every response a cheap ``ETag``: a request whose
+``If-None-Match`` matches it is answered ``304 Not Modified`` before any row
+is read, whether or not the response is still cached.
+
+Both rely on every process that writes farm data bumping the same versions.
+When the cache is local to each process (``RESPONSE_CACHE_SHARED`` is off, the
+default for ``LocMemCache``), a write made by another process, such as the
+``process_sync_jobs`` worker, would go unnoticed, so responses are then
+neither cached nor given a version ``ETag``.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from .changes import ENTITY_TYPES
+from .fieldsets import expansions
+
+
+KEY_PREFIX = 'farm-responses'
+
+
+class LRUCache:
+    """
+    Thread-safe in-process mapping holding the ``maxsize`` most recently used entries.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LRUCache(settings.RESPONSE_CACHE_LRU_SIZE)
+
+
+def _version_key(user_id, entity_type):
+    return f'{KEY_PREFIX}:version:{user_id}:{entity_type}'
+
+
+def _start_version(key):
+    # Versions start from the clock rather than 0, so a version evicted from
+    # the cache never comes back to a value that keyed an older response
+    cache.add(key, time.time_ns(), timeout=None)
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            _start_version(key)
+
+
+def invalidate(user_id, entity_types=None):
+    """
+    Bump ``user_id``'s versions of ``entity_types`` (every collection if None).
+
+    The bump is repeated when the surrounding transaction commits, so a
+    response cached by a request that read the rows before the commit is not
+    served afterwards.
+    """
+    if user_id is None:
+        return
+    keys = [_version_key(user_id, entity_type) for entity_type in entity_types or ENTITY_TYPES.values()]
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def _versions(keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            _start_version(key)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def collections(view, request):
+    """
+    Entity types a response of ``view`` reads: its own and those of the requested expansions.
+    """
+    serializer_class = view.get_serializer_class()
+    model = serializer_class.Meta.model
+    models = [model] + [
+        model._meta.get_field(name).related_model
+        for name in expansions(request, getattr(serializer_class, 'expandable_fields', {}))
+    ]
+    return {ENTITY_TYPES[related] for related in models}
+
+
+def version_digest(request, entity_types):
+    """
+    Digest of the request URL, its media type and the user's versions of ``entity_types``.
+
+    It changes whenever a response to ``request`` may have.
+    """
+    keys = [_version_key(request.user.id, entity_type) for entity_type in sorted(entity_types)]
+    versions = _versions(keys)
+    url = request.build_absolute_uri()
+    media_type = getattr(request, 'accepted_media_type', '')
+    return hashlib.sha256(f'{url}|{media_type}|{versions}'.encode()).hexdigest()
+
+
+def etag(digest, weak=True):
+    # Weak by default: list and retrieve responses may be rendered to
+    # different bytes for equal data (indentation, encoding)
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def not_modified(request, tag):
+    """
+    ``304 Not Modified`` if ``If-None-Match`` matches ``tag``, else None.
+    """
+    response = get_conditional_response(request, etag=tag)
+    if response is not None:
+        response['ETag'] = tag
+    return response
+
+
+def cached_response(view, request, respond, *args, **kwargs):
+    """
+    Answer ``request`` with a 304, from the cache, or by calling ``respond``.
+
+    Only 200 responses are cached.
+    """
+    if not request.user.is_authenticated or not settings.RESPONSE_CACHE_SHARED:
+        return respond(request, *args, **kwargs)
+
+    digest = version_digest(request, collections(view, request))
+    tag = etag(digest)
+    response = not_modified(request, tag)
+    if response is not None:
+        return response
+
+    timeout = settings.RESPONSE_CACHE_TIMEOUT
+    key = f'{KEY_PREFIX}:{request.user.id}:{digest}'
+    if timeout:
+        data = local_cache.get(key)
+        if data is None:
+            data = cache.get(key)
+            if data is not None:
+                local_cache.set(key, data)
+        if data is not None:
+            return Response(data, headers={'ETag': tag})
+
+    response = respond(request, *args, **kwargs)
+    if response.status_code != 200:
+        return response
+    response['ETag'] = tag
+    # Streamed lists are not Response instances and are never cached
+    if timeout and isinstance(response, Response):
+        cache.set(key, response.data, timeout)
+        local_cache.set(key, response.data)
+    return response
+
+
+class CachedResponseMixin:
+    """
+    View mixin serving ``list`` and ``retrieve`` with ETags and through the
+    per-user response cache.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(self, request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(self, request, super().retrieve, *args, **kwargs)
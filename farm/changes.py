@@ -0,0 +1,119 @@
+# farm/changes.py
+"""
+Server-side change feed.
+
+Every insert, update and delete of a farm record is appended to
+``ChangeLogEntry`` under a per-user monotonic sequence number. Devices keep the
+last sequence number they have seen as their cursor and pull only the entries
+after it, which is an index range scan on ``(user, seq)``.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import (
+    Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation,
+    ChangeSequence, ChangeLogEntry,
+)
+
+
+ENTITY_TYPES = {
+    Farm: 'farms',
+    BoundaryPoint: 'boundary_points',
+    ObservationPoint: 'observation_points',
+    InspectionSuggestion: 'inspection_suggestions',
+    InspectionObservation: 'inspection_observations',
+}
+
+ENTITY_MODELS = {entity_type: model for model, entity_type in ENTITY_TYPES.items()}
+
+
+def owner_id(instance):
+    """
+    Return the id of the user a farm record belongs to, or None if its farm is gone.
+    """
+    if isinstance(instance, (BoundaryPoint, ObservationPoint)):
+        return Farm.objects.filter(id=instance.farm_id).values_list('user_id', flat=True).first()
+    return instance.user_id
+
+
+def record_changes(user_id, entity_type, object_ids, operation='upsert'):
+    """
+    Append one change log entry per id, allocating a block of sequence numbers.
+
+    The sequence row stays locked until the surrounding transaction commits,
+    which serialises writers of the same user and keeps cursors gap-free.
+    """
+    object_ids = list(object_ids)
+    if user_id is None or not object_ids:
+        return
+    with transaction.atomic():
+        ChangeSequence.objects.get_or_create(user_id=user_id)
+        ChangeSequence.objects.filter(user_id=user_id).update(value=F('value') + len(object_ids))
+        last = ChangeSequence.objects.filter(user_id=user_id).values_list('value', flat=True).get()
+        first = last - len(object_ids) + 1
+        ChangeLogEntry.objects.bulk_create([
+            ChangeLogEntry(
+                user_id=user_id,
+                seq=first + offset,
+                entity_type=entity_type,
+                object_id=object_id,
+                operation=operation,
+            )
+            for offset, object_id in enumerate(object_ids)
+        ])
+
+
+def current_cursor(user):
+    """
+    Return the latest sequence number handed out for ``user`` (0 if none).
+    """
+    return ChangeSequence.objects.filter(user=user).values_list('value', flat=True).first() or 0
+
+
+def parse_cursor(value):
+    """
+    Parse a ``since`` query parameter; None means "from the beginning".
+    """
+    if value in (None, ''):
+        return None
+    cursor = int(value)
+    if cursor < 0:
+        raise ValueError('Cursor must not be negative')
+    return cursor
+
+
+def changed_ids(user, entity_type, since):
+    """
+    Subquery of ids of ``entity_type`` rows inserted or updated after ``since``.
+    """
+    return ChangeLogEntry.objects.filter(
+        user=user, seq__gt=since, entity_type=entity_type, operation='upsert'
+    ).values('object_id')
+
+
+def changes_since(user, since, limit):
+    """
+    Return ``(entries, cursor, has_more)`` for up to ``limit`` log entries after ``since``.
+
+    Entries are compacted so only the latest operation per record is kept.
+    """
+    entries = list(
+        ChangeLogEntry.objects
+        .filter(user=user, seq__gt=since or 0)
+        .order_by('seq')
+        .values_list('seq', 'entity_type', 'object_id', 'operation')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    cursor = entries[-1][0] if entries else (since or 0)
+
+    latest = {}
+    for seq, entity_type, object_id, operation in entries:
+        latest.pop((entity_type, object_id), None)
+        latest[(entity_type, object_id)] = (seq, operation)
+
+    compacted = [
+        (seq, entity_type, object_id, operation)
+        for (entity_type, object_id), (seq, operation) in latest.items()
+    ]
+    return compacted, cursor, has_more
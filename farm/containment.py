@@ -0,0 +1,102 @@
+# farm/containment.py
+"""
+Whether observation points lie inside their farm's boundary ring.
+
+``ObservationPoint.inside_boundary`` is classified against the ring the farm's
+boundary points draw in id order, and is null while the farm has fewer than
+three of them. All the points of a farm are classified in one vectorized pass
+(``geometry.points_in_ring``), and only the rows whose flag changes are
+written, a few ``UPDATE ... WHERE id IN`` statements per batch.
+
+Single saves are classified by the signals. The bulk sync paths don't send
+them, and call ``classify_points`` and ``classify_farms`` themselves.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from . import caching
+from .boundaries import rings
+from .changes import ENTITY_TYPES, record_changes
+from .geometry import points_in_ring
+from .models import ObservationPoint
+
+
+# inside_boundary as stored in the int8 arrays below
+FLAGS = {1: True, 0: False, -1: None}
+
+
+def classify(farm_ids, latitudes, longitudes):
+    """
+    ``inside_boundary`` of points given as parallel arrays, coded 1/0 (-1 for null).
+    """
+    farm_ids = np.asarray(farm_ids)
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    codes = np.full(len(farm_ids), -1, dtype=np.int8)
+    for farm_id, ring in rings(np.unique(farm_ids).tolist()).items():
+        if len(ring) < 3:
+            continue
+        mask = farm_ids == farm_id
+        codes[mask] = points_in_ring(ring, latitudes[mask], longitudes[mask])
+    return codes
+
+
+def _write(ids, flag):
+    # Chunked UPDATEs, skipping the rows that already hold the flag
+    for start in range(0, len(ids), settings.SYNC_BATCH_SIZE):
+        batch = ids[start:start + settings.SYNC_BATCH_SIZE]
+        ObservationPoint.objects.filter(id__in=batch).exclude(inside_boundary=flag).update(inside_boundary=flag)
+
+
+def classify_points(points):
+    """
+    Classify observation point instances that were just written, setting their ``inside_boundary``.
+
+    Their own change log entries already carry the new flags, so nothing is
+    recorded here.
+    """
+    if not points:
+        return
+    codes = classify(
+        [point.farm_id for point in points],
+        [point.latitude for point in points],
+        [point.longitude for point in points],
+    ).tolist()
+    for point, code in zip(points, codes):
+        point.inside_boundary = FLAGS[code]
+    for code, flag in FLAGS.items():
+        _write([point.id for point, point_code in zip(points, codes) if point_code == code], flag)
+
+
+def classify_farms(farm_ids):
+    """
+    Reclassify all the observation points of ``farm_ids`` after their rings changed.
+
+    The points whose flag changes are recorded in the change log and their
+    owners' cached responses invalidated. Returns the number of such points.
+    """
+    rows = list(
+        ObservationPoint.objects.filter(farm_id__in=list(farm_ids))
+        .values_list('id', 'farm_id', 'latitude', 'longitude', 'inside_boundary', 'farm__user_id')
+    )
+    if not rows:
+        return 0
+    ids, point_farms, latitudes, longitudes, stored, owners = zip(*rows)
+    codes = classify(point_farms, latitudes, longitudes)
+    stored = np.array([-1 if flag is None else flag for flag in stored], dtype=np.int8)
+    changed = codes != stored
+
+    ids = np.asarray(ids)
+    for code, flag in FLAGS.items():
+        _write(ids[changed & (codes == code)].tolist(), flag)
+
+    entity_type = ENTITY_TYPES[ObservationPoint]
+    flipped = defaultdict(list)
+    for pk, user_id in zip(ids[changed].tolist(), np.asarray(owners)[changed].tolist()):
+        flipped[user_id].append(pk)
+    for user_id, point_ids in flipped.items():
+        record_changes(user_id, entity_type, point_ids)
+        caching.invalidate(user_id, [entity_type])
+    return int(changed.sum())
@@ -0,0 +1,194 @@
+# farm/digests.py
+"""
+Hierarchical (Merkle) digests of a user's farm data.
+
+    user digest        = H(farm id and digest of every farm)
+    farm digest        = H(farm content_hash, its four collection digests)
+    collection digest  = XOR of H(id:content_hash) over the collection's rows
+
+A device keeps the digests it saw after its last sync and compares them top
+down: an equal user digest means there is nothing to do, otherwise only the
+farms, and within them the collections, whose digests differ have to be pulled
+or pushed.
+
+Collection digests are stored in ``FarmDigest`` and updated on every write by
+XOR-ing the old leaf out and the new one in; the farm and user levels are cheap
+to derive from them on read.
+"""
+import hashlib
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation, FarmDigest,
+)
+
+
+# model -> (FarmDigest field, attname of the farm the row belongs to)
+COLLECTIONS = {
+    BoundaryPoint: ('boundary_points', 'farm_id'),
+    ObservationPoint: ('observation_points', 'farm_id'),
+    InspectionSuggestion: ('inspection_suggestions', 'property_location_id'),
+    InspectionObservation: ('observations', 'farm_id'),
+}
+
+COLLECTION_NAMES = tuple(collection for collection, _ in COLLECTIONS.values())
+
+
+def leaf_hash(pk, content_hash):
+    """
+    Leaf hash of one row, as an integer so leaves can be XOR-ed together.
+    """
+    return int.from_bytes(hashlib.sha256(f'{pk}:{content_hash}'.encode()).digest(), 'big')
+
+
+def _hex(value):
+    return f'{value:064x}'
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def row_state(instance):
+    """
+    Return ``(farm_id, content_hash)`` of a child row instance.
+    """
+    _, parent = COLLECTIONS[type(instance)]
+    return getattr(instance, parent), instance.content_hash
+
+
+def row_states(model, ids):
+    """
+    Map the ids of existing ``model`` rows to ``(farm_id, content_hash)``.
+    """
+    ids = list(ids)
+    if not ids:
+        return {}
+    _, parent = COLLECTIONS[model]
+    rows = model.objects.filter(id__in=ids).values_list('id', parent, 'content_hash')
+    return {pk: (farm_id, digest) for pk, farm_id, digest in rows}
+
+
+def track(model, before, after):
+    """
+    Fold written ``model`` rows into their farms' digests.
+
+    ``before`` and ``after`` map row ids to ``(farm_id, content_hash)`` as
+    returned by ``row_states``. ``before`` holds the previous state of the rows
+    that were written or deleted, ``after`` their new state; a row missing from
+    ``before`` was inserted and one missing from ``after`` was deleted.
+    """
+    collection, _ = COLLECTIONS[model]
+    deltas = {}
+    for states in (before, after):
+        for pk, (farm_id, digest) in states.items():
+            if farm_id is not None:
+                deltas[farm_id] = deltas.get(farm_id, 0) ^ leaf_hash(pk, digest)
+    deltas = {farm_id: delta for farm_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        digests = list(
+            FarmDigest.objects.select_for_update().filter(farm_id__in=deltas).order_by('farm_id')
+        )
+        now = timezone.now()
+        for digest in digests:
+            value = int(getattr(digest, collection), 16) ^ deltas[digest.farm_id]
+            setattr(digest, collection, _hex(value))
+            digest.updated_at = now
+        FarmDigest.objects.bulk_update(digests, [collection, 'updated_at'])
+
+        # Farms without a digest row yet get one computed from scratch, which
+        # already includes this write
+        missing = set(deltas) - {digest.farm_id for digest in digests}
+        if missing:
+            rebuild(missing)
+
+
+def rebuild(farm_ids):
+    """
+    Recompute the ``FarmDigest`` rows of ``farm_ids`` from the current rows.
+
+    Missing digest rows are created first, and all of them locked before the
+    child rows are read, like ``track`` locks them before folding a write in:
+    a concurrent write is then either among the rows read here, or folded in
+    by its ``track`` after this rebuild stored its result, never lost in between.
+    """
+    with transaction.atomic():
+        farm_ids = set(Farm.objects.filter(id__in=farm_ids).values_list('id', flat=True))
+        if not farm_ids:
+            return
+        FarmDigest.objects.bulk_create([FarmDigest(farm_id=farm_id) for farm_id in farm_ids], ignore_conflicts=True)
+        digests = list(
+            FarmDigest.objects.select_for_update().filter(farm_id__in=farm_ids).order_by('farm_id')
+        )
+
+        values = {farm_id: dict.fromkeys(COLLECTION_NAMES, 0) for farm_id in farm_ids}
+        for model, (collection, parent) in COLLECTIONS.items():
+            rows = model.objects.filter(**{f'{parent}__in': farm_ids}).values_list('id', parent, 'content_hash')
+            for pk, farm_id, digest in rows.iterator():
+                values[farm_id][collection] ^= leaf_hash(pk, digest)
+
+        now = timezone.now()
+        for digest in digests:
+            for name, value in values[digest.farm_id].items():
+                setattr(digest, name, _hex(value))
+            digest.updated_at = now
+        FarmDigest.objects.bulk_update(digests, [*COLLECTION_NAMES, 'updated_at'])
+
+
+def farm_digest(content_hash, collections):
+    """
+    Digest of one farm from its own content hash and its collection digests.
+    """
+    return _sha256('|'.join([content_hash, *(collections[name] for name in COLLECTION_NAMES)]))
+
+
+def _farm_node(farm_id, content_hash, collections):
+    collections = {name: collections.get(name) or FarmDigest.EMPTY for name in COLLECTION_NAMES}
+    return {
+        'id': farm_id,
+        'digest': farm_digest(content_hash, collections),
+        'collections': collections,
+    }
+
+
+def digest_tree(user):
+    """
+    Return the user-level digest and the digest node of each of ``user``'s farms.
+    """
+    rows = (
+        Farm.objects.filter(user=user)
+        .order_by('id')
+        .values_list('id', 'content_hash', *(f'digest__{name}' for name in COLLECTION_NAMES))
+    )
+    farms = [
+        _farm_node(farm_id, content_hash, dict(zip(COLLECTION_NAMES, collections)))
+        for farm_id, content_hash, *collections in rows
+    ]
+    return {
+        'digest': _sha256('\n'.join(f"{farm['id']}:{farm['digest']}" for farm in farms)),
+        'farms': farms,
+    }
+
+
+def farm_node(farm):
+    """
+    Return the digest node of a single farm.
+    """
+    collections = FarmDigest.objects.filter(farm=farm).values(*COLLECTION_NAMES).first() or {}
+    return _farm_node(farm.id, farm.content_hash, collections)
+
+
+def leaves(farm, collection):
+    """
+    Return ``[id, content_hash]`` pairs of ``farm``'s rows in ``collection``, by id.
+    """
+    for model, (name, parent) in COLLECTIONS.items():
+        if name == collection:
+            rows = model.objects.filter(**{parent: farm.id}).order_by('id').values_list('id', 'content_hash')
+            return [list(row) for row in rows]
+    raise KeyError(collection)
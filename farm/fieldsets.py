@@ -0,0 +1,126 @@
+# farm/fieldsets.py
+"""
+Sparse fieldsets and expansions for the farm serializers.
+
+On reads, ``?fields=id,latitude,longitude`` restricts the response to the
+listed fields, and ``?expand=farm`` renders a relation as the related row
+instead of its id (or adds a reverse collection, such as a farm's
+``boundary_points``). The serializer drops the other fields, and the view
+narrows the ``SELECT`` list to the columns the remaining fields read and joins
+or prefetches only the requested expansions.
+"""
+import sys
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _names(request, param):
+    """
+    Names listed in the ``param`` query parameter of a read, or None.
+
+    ``request`` may be a DRF or a plain Django request.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.GET.get(param)
+    if not value:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def expansions(request, expandable_fields):
+    """
+    Names of ``expandable_fields`` the ``?expand=`` parameter of a read asks for.
+    """
+    return [name for name in _names(request, EXPAND_PARAM) or () if name in expandable_fields]
+
+
+class SparseFieldsMixin:
+    """
+    ``ModelSerializer`` mixin applying ``?fields=`` and ``?expand=``.
+
+    ``expandable_fields`` maps a field name to the name of a serializer in the
+    same module and whether the relation is to many rows. Only the top-level
+    serializer of a response applies the parameters; the expanded serializers
+    render all their fields.
+    """
+    expandable_fields = {}
+
+    def _is_root(self):
+        return self.parent is None or (isinstance(self.parent, ListSerializer) and self.parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_root():
+            return fields
+        request = self.context.get('request')
+
+        expand = expansions(request, self.expandable_fields)
+        for name in expand:
+            serializer_name, many = self.expandable_fields[name]
+            serializer_class = getattr(sys.modules[type(self).__module__], serializer_name)
+            fields[name] = serializer_class(many=many, read_only=True)
+
+        requested = _names(request, FIELDS_PARAM)
+        if requested is not None:
+            keep = set(requested) | set(expand)
+            fields = {name: field for name, field in fields.items() if name in keep}
+        return fields
+
+
+def sparse_queryset(queryset, serializer):
+    """
+    Narrow ``queryset`` to what ``serializer`` renders.
+
+    Expanded relations are joined (to one) or prefetched in id order (to many).
+    With ``?fields=``, the other columns are deferred, unless a kept field
+    reads something other than a model field.
+    """
+    request = serializer.context.get('request')
+    model = queryset.model
+    expand = expansions(request, getattr(serializer, 'expandable_fields', {}))
+    for name in expand:
+        model_field = model._meta.get_field(name)
+        if model_field.many_to_one or model_field.one_to_one:
+            queryset = queryset.select_related(name)
+        else:
+            queryset = queryset.prefetch_related(
+                Prefetch(name, queryset=model_field.related_model.objects.order_by('id'))
+            )
+
+    if _names(request, FIELDS_PARAM) is None:
+        return queryset
+    columns = {model._meta.pk.name}
+    for name, field in serializer.fields.items():
+        if name in expand or field.write_only:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return queryset
+        if not model_field.concrete or model_field.many_to_many:
+            return queryset
+        columns.add(model_field.name)
+    return queryset.only(*columns | {name for name in expand if model._meta.get_field(name).concrete})
+
+
+class SparseQuerysetMixin:
+    """
+    View mixin reading only what the response of a sparse read renders.
+
+    Applied to the actions in ``sparse_actions``; others get the full rows.
+    """
+    sparse_actions = ('list', 'retrieve', 'pending_sync')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.sparse_actions:
+            return queryset
+        return sparse_queryset(queryset, self.get_serializer())
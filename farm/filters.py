@@ -0,0 +1,40 @@
+# farm/filters.py
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from . import geohash
+
+
+class BoundingBoxFilter(BaseFilterBackend):
+    """
+    Filter for ``?bbox=min_lon,min_lat,max_lon,max_lat``.
+
+    The box is read as geohash range scans on the indexed ``geohash`` column
+    followed by the exact latitude/longitude bounds (see ``farm.geohash``). A
+    ``min_lon`` greater than ``max_lon`` is a box crossing the antimeridian.
+    """
+    query_param = 'bbox'
+    invalid_message = 'Expected min_lon,min_lat,max_lon,max_lat in degrees'
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.query_param)
+        if not value:
+            return queryset
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(','))
+        except ValueError:
+            raise ValidationError({self.query_param: self.invalid_message})
+        if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+            raise ValidationError({self.query_param: self.invalid_message})
+        return queryset.filter(geohash.bbox_q(min_lon, min_lat, max_lon, max_lat))
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Bounding box: min_lon,min_lat,max_lon,max_lat.',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -0,0 +1,135 @@
+# farm/geohash.py
+"""
+Geohashes of observation points, for bounding-box queries without PostGIS.
+
+A geohash interleaves the bits of a point's longitude and latitude and writes
+them in base 32, so points that share a prefix share a cell and every cell
+is a contiguous range of the sorted column. A bounding box is covered by a
+few cells of the finest precision that keeps their number small, and each
+run of adjacent cells becomes one range scan on the geohash index; an exact
+latitude/longitude filter then drops the points of those cells that fall
+outside the box.
+"""
+import math
+
+from django.db.models import Q
+
+
+# In ascending ASCII order, which is what makes cells contiguous ranges
+ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9
+MAX_CELLS = 16
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    """
+    Geohash of a point, ``precision`` characters long.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(ALPHABET[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """
+    ``(height, width)`` in degrees of the cells of a precision.
+    """
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision - lon_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def _steps(low, high, origin, span, size):
+    # Indexes of the cells of ``size`` along an axis of ``span`` degrees that [low, high] overlaps
+    last = round(span / size) - 1
+    return range(max(int((low - origin) // size), 0), min(int((high - origin) // size), last) + 1)
+
+
+def cover(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_CELLS):
+    """
+    Sorted geohash cells covering a bounding box that does not cross the antimeridian.
+
+    The cells are of the finest precision (up to ``PRECISION``) needing at
+    most ``max_cells`` of them, or of precision 1 for boxes larger than that.
+    """
+    chosen = 1
+    for precision in range(1, PRECISION + 1):
+        height, width = cell_size(precision)
+        rows = _steps(min_lat, max_lat, -90.0, 180.0, height)
+        columns = _steps(min_lon, max_lon, -180.0, 360.0, width)
+        if len(rows) * len(columns) > max_cells:
+            break
+        chosen = precision
+
+    height, width = cell_size(chosen)
+    return sorted({
+        encode(-90.0 + (row + 0.5) * height, -180.0 + (column + 0.5) * width, chosen)
+        for row in _steps(min_lat, max_lat, -90.0, 180.0, height)
+        for column in _steps(min_lon, max_lon, -180.0, 360.0, width)
+    })
+
+
+def successor(cell):
+    """
+    The first geohash of the cell sorting after ``cell``, or None if there is none.
+    """
+    chars = list(cell)
+    while chars:
+        index = ALPHABET.index(chars[-1])
+        if index + 1 < len(ALPHABET):
+            chars[-1] = ALPHABET[index + 1]
+            return ''.join(chars)
+        chars.pop()
+    return None
+
+
+def ranges(cells):
+    """
+    ``(start, stop)`` ranges of sorted ``cells``, merging adjacent ones; ``stop`` may be None.
+    """
+    merged = []
+    for cell in cells:
+        if merged and merged[-1][1] == cell:
+            merged[-1][1] = successor(cell)
+        else:
+            merged.append([cell, successor(cell)])
+    return [tuple(item) for item in merged]
+
+
+def bbox_q(min_lon, min_lat, max_lon, max_lat, field='geohash'):
+    """
+    ``Q`` of the points inside a bounding box: geohash range scans, then the exact bounds.
+
+    A box whose ``min_lon`` is greater than its ``max_lon`` crosses the
+    antimeridian and is split in two.
+    """
+    if min_lon > max_lon:
+        return (bbox_q(min_lon, min_lat, 180.0, max_lat, field)
+                | bbox_q(-180.0, min_lat, max_lon, max_lat, field))
+
+    cells = Q()
+    for start, stop in ranges(cover(min_lat, min_lon, max_lat, max_lon)):
+        cell = Q(**{f'{field}__gte': start})
+        if stop is not None:
+            cell &= Q(**{f'{field}__lt': stop})
+        cells |= cell
+    return cells & Q(
+        latitude__gte=min_lat, latitude__lte=max_lat, longitude__gte=min_lon, longitude__lte=max_lon
+    )
@@ -0,0 +1,140 @@
+# farm/geometry.py
+"""
+Planar geometry of farm boundaries.
+
+Boundaries are small enough that an equirectangular projection around their
+mean latitude is accurate to well under a percent, which is all the derived
+values here are used for. Rings are processed as NumPy arrays, one vectorized
+operation over all their vertices or points at a time.
+"""
+import numpy as np
+
+
+EARTH_RADIUS_M = 6_371_008.8
+SQ_M_PER_ACRE = 4046.8564224
+
+
+def _vertices(points):
+    # ``(latitude, longitude)`` pairs as an (n, 2) float array
+    return np.asarray(points, dtype=float).reshape(-1, 2)
+
+
+def bbox(points):
+    """
+    Bounding box of ``(latitude, longitude)`` pairs, or None if there are none.
+    """
+    vertices = _vertices(points)
+    if not len(vertices):
+        return None
+    (min_latitude, min_longitude), (max_latitude, max_longitude) = vertices.min(axis=0), vertices.max(axis=0)
+    return {
+        'min_latitude': float(min_latitude),
+        'min_longitude': float(min_longitude),
+        'max_latitude': float(max_latitude),
+        'max_longitude': float(max_longitude),
+    }
+
+
+def _project(vertices):
+    # Equirectangular x/y in metres around the mean latitude, and its x scale
+    latitudes, longitudes = np.radians(vertices[:, 0]), np.radians(vertices[:, 1])
+    scale = np.cos(latitudes.mean())
+    return longitudes * scale * EARTH_RADIUS_M, latitudes * EARTH_RADIUS_M, scale
+
+
+def _shoelace(x, y):
+    # Twice the signed area of the closed ring, and the cross product of each edge
+    cross = x * np.roll(y, -1) - np.roll(x, -1) * y
+    return cross.sum(), cross
+
+
+def ring_area(points):
+    """
+    Area in square metres enclosed by a ring of ``(latitude, longitude)`` pairs.
+
+    The ring is closed implicitly; fewer than three points enclose nothing.
+    """
+    vertices = _vertices(points)
+    if len(vertices) < 3:
+        return 0.0
+    x, y, _ = _project(vertices)
+    twice_area, _ = _shoelace(x, y)
+    return float(abs(twice_area) / 2)
+
+
+def ring_centroid(points):
+    """
+    ``{'latitude', 'longitude'}`` of the centroid of the area a ring encloses, or None if it is empty.
+
+    Rings enclosing no area (fewer than three points, or collinear ones) get
+    the mean of their points instead.
+    """
+    vertices = _vertices(points)
+    if not len(vertices):
+        return None
+    latitude, longitude = vertices.mean(axis=0)
+    if len(vertices) >= 3:
+        x, y, scale = _project(vertices)
+        twice_area, cross = _shoelace(x, y)
+        if twice_area:
+            cx = ((x + np.roll(x, -1)) * cross).sum() / (3 * twice_area)
+            cy = ((y + np.roll(y, -1)) * cross).sum() / (3 * twice_area)
+            latitude, longitude = np.degrees(cy / EARTH_RADIUS_M), np.degrees(cx / (scale * EARTH_RADIUS_M))
+    return {'latitude': float(latitude), 'longitude': float(longitude)}
+
+
+def ring_perimeter(points):
+    """
+    Length in metres of a closed ring of ``(latitude, longitude)`` pairs, along great circles.
+
+    Fewer than three points make no ring.
+    """
+    vertices = _vertices(points)
+    if len(vertices) < 3:
+        return 0.0
+    latitudes, longitudes = np.radians(vertices[:, 0]), np.radians(vertices[:, 1])
+    next_latitudes, next_longitudes = np.roll(latitudes, -1), np.roll(longitudes, -1)
+    # Haversine distance of every edge at once
+    a = (np.sin((next_latitudes - latitudes) / 2) ** 2
+         + np.cos(latitudes) * np.cos(next_latitudes) * np.sin((next_longitudes - longitudes) / 2) ** 2)
+    return float((2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))).sum())
+
+
+def ring_geometry(points):
+    """
+    Derived geometry of a boundary ring: its bounding box, area, centroid and perimeter.
+    """
+    area = ring_area(points)
+    return {
+        'bbox': bbox(points),
+        'area_m2': area,
+        'area_acres': area / SQ_M_PER_ACRE,
+        'centroid': ring_centroid(points),
+        'perimeter_m': ring_perimeter(points),
+    }
+
+
+def points_in_ring(ring, latitudes, longitudes):
+    """
+    Boolean array of which points lie inside a ring of ``(latitude, longitude)`` pairs.
+
+    Even-odd ray casting, vectorized over the points: each edge of the ring
+    is tested against all of them at once, so the Python loop runs once per
+    vertex rather than once per point. The ring is closed implicitly; fewer
+    than three points enclose nothing.
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    inside = np.zeros(latitudes.shape, dtype=bool)
+    if len(ring) < 3:
+        return inside
+
+    vertices = np.asarray(ring, dtype=float)
+    starts, ends = vertices, np.roll(vertices, -1, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for (lat1, lon1), (lat2, lon2) in zip(starts, ends):
+            # The edge spans the point's latitude; where does a ray east of it cross?
+            spans = (lat1 > latitudes) != (lat2 > latitudes)
+            crossing = lon1 + (latitudes - lat1) * (lon2 - lon1) / (lat2 - lat1)
+            inside ^= spans & (longitudes < crossing)
+    return inside
@@ -0,0 +1,258 @@
+# farm/idempotency.py
+"""
+``Idempotency-Key`` support for the sync endpoints.
+
+The first request with a key inserts an ``in_progress`` record and commits it
+straight away, so a concurrent duplicate sees it and waits for the outcome
+instead of running the batch a second time. The response is stored in the same
+transaction as the sync writes, so a stored response always matches what was
+written.
+
+An ``in_progress`` record is a lease of ``IDEMPOTENCY_LEASE_TIMEOUT`` seconds
+from its ``claimed_at``. A retry finding an expired lease (its worker was
+killed before it could release the key) takes the record over and runs the
+request; the original request, should it still finish, notices it lost the
+lease and rolls its writes back instead of storing a second outcome.
+
+Views that commit in chunks (``chunked=True`` with ``SYNC_COMMIT_EVERY`` set)
+are not wrapped in one transaction, so their lock-hold time stays bounded for
+retrying clients too. Each chunk checks the lease in its own transaction
+(``hold_lease``), so only the holder of the key writes, and the response is
+stored once the last chunk has committed. A retry of a request that died
+halfway runs it again: the committed chunks resolve through their stored id
+mappings and come back ``unchanged``.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotency-Replayed'
+POLL_INTERVAL = 0.1
+
+# The record leased by the chunked request running on this thread
+_current = threading.local()
+
+
+class LeaseLost(Exception):
+    """
+    Raised in a chunk of a request whose key was taken over by a retry.
+    """
+
+
+def request_digest(request):
+    """
+    Digest of the method, path and parsed body of ``request``.
+    """
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.status_code)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _claim(user, key, digest):
+    """
+    Insert an ``in_progress`` record for ``key``, or return the existing one.
+
+    Returns ``(record, created)``. An expired record is replaced, and an
+    ``in_progress`` one of the same request whose lease expired is taken over.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    while True:
+        try:
+            with transaction.atomic():
+                record = IdempotencyRecord.objects.create(
+                    user=user, key=key, request_digest=digest, claimed_at=now, expires_at=expires_at
+                )
+            return record, True
+        except IntegrityError:
+            record = IdempotencyRecord.objects.filter(user=user, key=key).first()
+            if record is None:
+                continue
+            if record.expires_at <= now:
+                IdempotencyRecord.objects.filter(pk=record.pk, expires_at__lte=now).delete()
+                continue
+            if record.request_digest == digest and _lease_expired(record, now):
+                # Conditional on the lease we saw, so one retry wins the takeover
+                taken = IdempotencyRecord.objects.filter(
+                    pk=record.pk, state='in_progress', claimed_at=record.claimed_at
+                ).update(claimed_at=now, expires_at=expires_at)
+                if not taken:
+                    continue
+                record.claimed_at, record.expires_at = now, expires_at
+                return record, True
+            return record, False
+
+
+def _lease_expired(record, now=None):
+    now = now or timezone.now()
+    lease = timedelta(seconds=settings.IDEMPOTENCY_LEASE_TIMEOUT)
+    return record.state == 'in_progress' and record.claimed_at <= now - lease
+
+
+def _held(record):
+    # The records still leased by this request
+    return IdempotencyRecord.objects.filter(pk=record.pk, claimed_at=record.claimed_at)
+
+
+def hold_lease():
+    """
+    Check, inside a chunk's transaction, that the current chunked request still holds its key.
+
+    The record stays locked until the chunk commits, so a retry cannot take
+    the key over halfway through a chunk. Raises ``LeaseLost`` if it already
+    has. Does nothing outside a chunked idempotent request.
+    """
+    record = getattr(_current, 'record', None)
+    if record is not None and not _held(record).select_for_update().exists():
+        raise LeaseLost()
+
+
+def _wait_for(record):
+    """
+    Poll an ``in_progress`` record until it completes, disappears, its lease
+    expires or the wait times out.
+
+    Returns the record, or None if it disappeared or is still in progress.
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        if _lease_expired(record):
+            return record
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyRecord.objects.filter(pk=record.pk).first()
+        if record is None or record.state == 'completed':
+            return record
+    return None
+
+
+def _in_progress():
+    return Response(
+        {'error': 'A request with this idempotency key is still in progress'},
+        status=status.HTTP_409_CONFLICT
+    )
+
+
+def idempotent(view_method=None, *, chunked=False):
+    """
+    Make a sync view method safe to retry with an ``Idempotency-Key`` header.
+
+    Requests without the header run as before. Apply it outside
+    ``transaction.atomic`` so the ``in_progress`` marker is committed first.
+    Pass ``chunked=True`` for views whose writes commit every
+    ``SYNC_COMMIT_EVERY`` rows through ``BulkSyncEngine``.
+    """
+    if view_method is None:
+        return functools.partial(idempotent, chunked=chunked)
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {'error': f'{IDEMPOTENCY_HEADER} must be at most 255 characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        digest = request_digest(request)
+        while True:
+            record, created = _claim(request.user, key, digest)
+            if created:
+                break
+            if record.request_digest != digest:
+                return Response(
+                    {'error': f'{IDEMPOTENCY_HEADER} has already been used for a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record.state == 'completed':
+                return _replay(record)
+
+            record = _wait_for(record)
+            if record is None:
+                # The original request failed (its record was released) or is
+                # still running after the wait timeout
+                if IdempotencyRecord.objects.filter(user=request.user, key=key).exists():
+                    return _in_progress()
+                continue
+            if record.state == 'completed':
+                return _replay(record)
+            # Its lease expired: claim the key again
+
+        if chunked and settings.SYNC_COMMIT_EVERY:
+            return _run_chunked(view_method, self, request, record, *args, **kwargs)
+        try:
+            with transaction.atomic():
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code >= 500 or not hasattr(response, 'data'):
+                    raise _NotStored(response)
+                stored = _held(record).update(
+                    state='completed', status_code=response.status_code, response_body=response.data
+                )
+                if not stored:
+                    # Taken over by a retry after the lease expired, which
+                    # stores the outcome; roll this run's writes back
+                    raise _NotStored(_in_progress())
+        except _NotStored as e:
+            _held(record).delete()
+            return e.response
+        except Exception:
+            _held(record).delete()
+            raise
+        return response
+
+    return wrapper
+
+
+def _run_chunked(view_method, view, request, record, *args, **kwargs):
+    """
+    Run a chunked view for ``record``'s key and store its response after the last chunk.
+    """
+    _current.record = record
+    try:
+        response = view_method(view, request, *args, **kwargs)
+    except LeaseLost:
+        # The retry that took the key over stores the outcome
+        return _in_progress()
+    except Exception:
+        _held(record).delete()
+        raise
+    finally:
+        _current.record = None
+
+    if response.status_code >= 500 or not hasattr(response, 'data'):
+        _held(record).delete()
+        return response
+    stored = _held(record).update(state='completed', status_code=response.status_code, response_body=response.data)
+    if not stored:
+        return _in_progress()
+    return response
+
+
+class _NotStored(Exception):
+    """
+    Raised to roll back and release the key for a response that must not be replayed.
+    """
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
@@ -0,0 +1,123 @@
+# farm/jobs.py
+"""
+Database-backed queue for asynchronous sync jobs.
+
+``SyncDataAPIView`` persists the payload as a ``SyncJob`` and answers 202 right
+away; the ``process_sync_jobs`` management command runs a pool of workers that
+claim queued jobs and apply them batch by batch, recording progress as they go.
+"""
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import SyncJob
+from .sync import ENTITY_KEYS, sync_in_batches
+
+
+logger = logging.getLogger('api')
+
+
+def enqueue_sync_job(user, data, device=''):
+    """
+    Persist ``data`` as a queued job for ``user``, sent from ``device``.
+    """
+    total = sum(len(data.get(key, [])) for key in ENTITY_KEYS)
+    return SyncJob.objects.create(user=user, payload=data, total_rows=total, device=device)
+
+
+def claim_next_job(worker):
+    """
+    Mark the oldest queued job as running for ``worker`` and return it, or None.
+
+    ``skip_locked`` lets concurrent workers pass over each other's candidates on
+    PostgreSQL; the conditional update keeps the claim exclusive everywhere.
+    """
+    with transaction.atomic():
+        job = (
+            SyncJob.objects.select_for_update(skip_locked=True)
+            .filter(status='queued')
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = SyncJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running', worker=worker, started_at=now, updated_at=now, attempts=job.attempts + 1
+        )
+    if not claimed:
+        return claim_next_job(worker)
+    job.refresh_from_db()
+    return job
+
+
+def run_sync_job(job):
+    """
+    Apply a claimed job and store its per-row results.
+
+    Every batch commits on its own, so re-running a job that was interrupted
+    only re-applies idempotent upserts.
+    """
+    def on_progress(done):
+        SyncJob.objects.filter(pk=job.pk).update(processed_rows=done, updated_at=timezone.now())
+
+    try:
+        results = sync_in_batches(job.user, job.payload, on_progress=on_progress, device=job.device)
+    except Exception as e:
+        logger.exception('Sync job %s failed', job.pk)
+        job.status = 'failed'
+        job.error = str(e)
+    else:
+        job.status = 'succeeded'
+        job.results = results
+        job.processed_rows = job.total_rows
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'results', 'processed_rows', 'finished_at', 'updated_at'])
+    return job
+
+
+def requeue_stale_jobs(stale_after):
+    """
+    Put running jobs that have not reported progress for ``stale_after`` seconds back in the queue.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return SyncJob.objects.filter(status='running', updated_at__lt=cutoff).update(
+        status='queued', worker='', updated_at=timezone.now()
+    )
+
+
+def work(worker, stop, once=False, poll_interval=2.0, stale_after=None):
+    """
+    Worker loop: claim and run jobs until ``stop`` is set (or the queue is empty with ``once``).
+
+    With ``stale_after``, jobs abandoned by dead workers are requeued every
+    ``stale_after`` seconds, so a crash doesn't strand them until the next restart.
+    """
+    next_requeue = time.monotonic()
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            if stale_after is not None and time.monotonic() >= next_requeue:
+                requeued = requeue_stale_jobs(stale_after)
+                if requeued:
+                    logger.warning('Worker %s requeued %s stale sync jobs', worker, requeued)
+                next_requeue = time.monotonic() + stale_after
+            job = claim_next_job(worker)
+            if job is None:
+                if once:
+                    return
+                stop.wait(poll_interval)
+                continue
+            logger.info('Worker %s running sync job %s', worker, job.pk)
+            run_sync_job(job)
+    finally:
+        close_old_connections()
+
+
+def worker_name(index):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
@@ -0,0 +1,173 @@
+# farm/listing.py
+"""
+Fast path for the list endpoints.
+
+``ModelSerializer`` builds a model instance per row and walks every field's
+``get_attribute``/``to_representation`` on it. For flat serializers whose
+fields map one to one onto model columns, the same output can be produced from
+``values()`` rows: the serializer is compiled once into a plan of
+``(output name, column, conversion)`` and each row is converted with plain
+lookups. Serializers the plan cannot reproduce exactly fall back to the
+regular path.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.fields.files import FieldFile
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from backend.renderers import StreamingJSONResponse
+
+
+# DRF fields whose representation of a value read from the database is the value itself
+RAW_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+# DRF fields whose own to_representation works on the raw database value
+CONVERTED_FIELDS = (
+    serializers.DateField,
+    serializers.DateTimeField,
+    serializers.DecimalField,
+    serializers.JSONField,
+    serializers.UUIDField,
+)
+
+_plans = {}
+
+
+def _column(model, field):
+    """
+    Return the column attname ``field`` reads, or None if it is not a plain column.
+    """
+    if field.source == '*' or '.' in field.source:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete or model_field.many_to_many:
+        return None
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is not None:
+        return None
+    return model_field.attname
+
+
+def _compile(serializer):
+    model = serializer.Meta.model
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        attname = _column(model, field)
+        if attname is None or isinstance(field, (serializers.ManyRelatedField, serializers.SerializerMethodField)):
+            return None
+        if isinstance(field, serializers.FileField):
+            kind = 'file' if getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL) else 'raw'
+        elif isinstance(field, serializers.FloatField):
+            kind = 'float'
+        elif isinstance(field, CONVERTED_FIELDS):
+            kind = 'field'
+        elif isinstance(field, RAW_FIELDS):
+            kind = 'raw'
+        else:
+            return None
+        plan.append((name, attname, kind))
+    return tuple(plan)
+
+
+def field_plan(serializer):
+    """
+    Return the compiled plan of a ``ModelSerializer`` instance, or None if it has none.
+
+    Plans are cached per serializer class and set of fields, which differs
+    with sparse fieldsets and expansions.
+    """
+    key = (type(serializer), tuple((name, type(field)) for name, field in serializer.fields.items()))
+    if key not in _plans:
+        _plans[key] = _compile(serializer) if isinstance(serializer, serializers.ModelSerializer) else None
+    return _plans[key]
+
+
+def _file_converter(field, model_field):
+    def convert(name):
+        return field.to_representation(FieldFile(None, model_field, name))
+    return convert
+
+
+def _converters(serializer, plan):
+    model = serializer.Meta.model
+    columns = []
+    for name, attname, kind in plan:
+        field = serializer.fields[name]
+        if kind == 'raw':
+            convert = None
+        elif kind == 'float':
+            convert = float
+        elif kind == 'file':
+            convert = _file_converter(field, model._meta.get_field(field.source))
+        else:
+            convert = field.to_representation
+        columns.append((name, attname, convert))
+    return columns
+
+
+def iter_rows(serializer, plan, rows):
+    """
+    Yield ``values()`` rows serialized as ``serializer`` would serialize their instances.
+    """
+    columns = _converters(serializer, plan)
+    for row in rows:
+        item = {}
+        for name, attname, convert in columns:
+            value = row[attname]
+            item[name] = value if value is None or convert is None else convert(value)
+        yield item
+
+
+def encode_rows(serializer, plan, rows):
+    """
+    Serialize ``values()`` rows as ``serializer`` would serialize their instances.
+    """
+    return list(iter_rows(serializer, plan, rows))
+
+
+class FastListMixin:
+    """
+    ``list`` through ``values()`` rows and a compiled field plan.
+
+    The response is the same as the regular ``list``, which is used whenever
+    the serializer has no plan. With ``?stream=true`` the whole list is
+    returned unpaginated, as a JSON array streamed in chunks of
+    ``stream_chunk_size`` rows read with a server-side cursor.
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        plan = field_plan(serializer)
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        columns = {attname for _, attname, _ in plan}
+        ordering = ()
+        if self.paginator is not None and hasattr(self.paginator, 'get_ordering'):
+            ordering = self.paginator.get_ordering(self)
+            columns.update(field.lstrip('-') for field in ordering)
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+
+        if request.query_params.get(self.stream_query_param) in ('true', '1'):
+            if ordering:
+                queryset = queryset.order_by(*ordering)
+            rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+            return StreamingJSONResponse(iter_rows(serializer, plan, rows), chunk_size=self.stream_chunk_size)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(encode_rows(serializer, plan, page))
+        return Response(encode_rows(serializer, plan, queryset))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from farm.containment import classify_farms
+from farm.models import Farm
+
+
+class Command(BaseCommand):
+    help = "Reclassify observation points as inside or outside their farm's boundary ring."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--farm', type=int, nargs='+', dest='farms',
+                            help='Only reclassify these farms (ids). Defaults to every farm.')
+
+    def handle(self, *args, **options):
+        farms = Farm.objects.order_by('id')
+        if options['farms']:
+            farms = farms.filter(id__in=options['farms'])
+
+        changed = 0
+        farm_ids = list(farms.values_list('id', flat=True))
+        for farm_id in farm_ids:
+            # One transaction per farm: its flags and change log entries together
+            with transaction.atomic():
+                changed += classify_farms([farm_id])
+        self.stdout.write(self.style.SUCCESS(
+            f'Reclassified {len(farm_ids)} farms; {changed} observation points changed'
+        ))
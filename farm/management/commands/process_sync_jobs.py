@@ -0,0 +1,55 @@
+import threading
+
+from django.core.management.base import BaseCommand
+
+from farm.jobs import requeue_stale_jobs, work, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Process queued asynchronous sync jobs with a pool of database-backed workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker threads.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait between polls of an empty queue.')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Requeue running jobs without progress for this many seconds.')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(options['stale_after'])
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale sync jobs')
+
+        stop = threading.Event()
+        workers = max(1, options['workers'])
+        # Only the first worker keeps requeueing stale jobs while the pool runs
+        if workers == 1:
+            work(worker_name(0), stop, once=options['once'], poll_interval=options['poll_interval'],
+                 stale_after=options['stale_after'])
+            return
+
+        threads = [
+            threading.Thread(
+                target=work,
+                args=(worker_name(index), stop),
+                kwargs={
+                    'once': options['once'],
+                    'poll_interval': options['poll_interval'],
+                    'stale_after': options['stale_after'] if index == 0 else None,
+                },
+                daemon=True,
+            )
+            for index in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping workers...')
+            stop.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,92 @@
+# Generated by Django 5.2 on 2026-10-17 04:37
+
+import datetime
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def content_hash(values):
+    # Frozen copy of farm.models.content_hash at the time of this migration
+    normalized = []
+    for value in values:
+        if isinstance(value, datetime.datetime):
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            value = value.astimezone(datetime.timezone.utc).isoformat()
+        elif isinstance(value, (datetime.date, datetime.time)):
+            value = value.isoformat()
+        elif isinstance(value, float):
+            value = repr(value)
+        normalized.append(value)
+    return hashlib.sha256(json.dumps(normalized, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+# Frozen copies of each model's SYNC_HASH_FIELDS at the time of this migration
+HASH_FIELDS = {
+    'Farm': ('name', 'size', 'plant_type'),
+    'BoundaryPoint': ('farm_id', 'latitude', 'longitude', 'description'),
+    'ObservationPoint': (
+        'farm_id', 'latitude', 'longitude', 'observation_status', 'name', 'segment',
+        'inspection_suggestion_id', 'confidence_level', 'target_entity',
+    ),
+    'InspectionSuggestion': (
+        'target_entity', 'confidence_level', 'property_location_id', 'area_size', 'density_of_plant',
+    ),
+    'InspectionObservation': (
+        'date', 'inspection_id', 'farm_id', 'confidence', 'plant_per_section', 'status',
+        'target_entity', 'severity',
+    ),
+}
+
+
+def backfill_content_hash(apps, schema_editor):
+    for model_name, fields in HASH_FIELDS.items():
+        model = apps.get_model('farm', model_name)
+        batch = []
+        for row in model.objects.values('id', *fields).iterator(chunk_size=2000):
+            batch.append(model(id=row['id'], content_hash=content_hash(row[name] for name in fields)))
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['content_hash'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0007_sync_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boundarypoint',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='farm',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='inspectionobservation',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='inspectionsuggestion',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='observationpoint',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
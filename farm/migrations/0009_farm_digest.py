@@ -0,0 +1,61 @@
+# Generated by Django 5.2 on 2026-10-17 04:43
+
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def leaf_hash(pk, content_hash):
+    # Frozen copy of farm.digests.leaf_hash at the time of this migration
+    return int.from_bytes(hashlib.sha256(f'{pk}:{content_hash}'.encode()).digest(), 'big')
+
+
+# Frozen copy of farm.digests.COLLECTIONS at the time of this migration
+COLLECTIONS = {
+    'BoundaryPoint': ('boundary_points', 'farm_id'),
+    'ObservationPoint': ('observation_points', 'farm_id'),
+    'InspectionSuggestion': ('inspection_suggestions', 'property_location_id'),
+    'InspectionObservation': ('observations', 'farm_id'),
+}
+
+
+def backfill_farm_digests(apps, schema_editor):
+    Farm = apps.get_model('farm', 'Farm')
+    FarmDigest = apps.get_model('farm', 'FarmDigest')
+    values = {farm_id: {} for farm_id in Farm.objects.values_list('id', flat=True)}
+    for model_name, (collection, parent) in COLLECTIONS.items():
+        model = apps.get_model('farm', model_name)
+        for pk, farm_id, digest in model.objects.values_list('id', parent, 'content_hash').iterator():
+            collections = values[farm_id]
+            collections[collection] = collections.get(collection, 0) ^ leaf_hash(pk, digest)
+    FarmDigest.objects.bulk_create(
+        [
+            FarmDigest(farm_id=farm_id, **{name: f'{value:064x}' for name, value in collections.items()})
+            for farm_id, collections in values.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0008_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FarmDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('boundary_points', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+                ('observation_points', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+                ('inspection_suggestions', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+                ('observations', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('farm', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='digest', to='farm.farm')),
+            ],
+        ),
+        migrations.RunPython(backfill_farm_digests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-17 04:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_mappings(apps, schema_editor):
+    MobileIdMapping = apps.get_model('farm', 'MobileIdMapping')
+    sources = [
+        ('ObservationPoint', 'observation_points', 'farm__user_id'),
+        ('InspectionSuggestion', 'inspection_suggestions', 'user_id'),
+    ]
+    for model_name, entity_type, user_field in sources:
+        model = apps.get_model('farm', model_name)
+        rows = model.objects.filter(mobile_id__isnull=False).values_list(user_field, 'mobile_id', 'id')
+        MobileIdMapping.objects.bulk_create(
+            [
+                MobileIdMapping(user_id=user_id, entity_type=entity_type, mobile_id=mobile_id, server_id=pk)
+                for user_id, mobile_id, pk in rows.iterator()
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0009_farm_digest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inspectionsuggestion',
+            name='mobile_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='observationpoint',
+            name='mobile_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='MobileIdMapping',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device', models.CharField(blank=True, default='', max_length=255)),
+                ('entity_type', models.CharField(max_length=50)),
+                ('mobile_id', models.BigIntegerField()),
+                ('server_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mobile_id_mappings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'device', 'entity_type', 'mobile_id'), name='unique_mobile_id_per_device')],
+            },
+        ),
+        migrations.RunPython(backfill_mappings, migrations.RunPython.noop),
+    ]
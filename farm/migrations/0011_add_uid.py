@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0010_mobile_id_mapping'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boundarypoint',
+            name='uid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='farm',
+            name='uid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspectionobservation',
+            name='uid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspectionsuggestion',
+            name='uid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='observationpoint',
+            name='uid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+    ]
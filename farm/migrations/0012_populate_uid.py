@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-17 05:10
+
+import os
+import uuid
+
+from django.db import migrations
+
+
+# Frozen copy of farm.models.uuid7 at the time of this migration
+def uuid7(timestamp_ms):
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+# model -> the field its creation time is stored in
+CREATION_FIELDS = {
+    'Farm': 'created_at',
+    'BoundaryPoint': 'timestamp',
+    'ObservationPoint': 'created_at',
+    'InspectionSuggestion': 'created_at',
+    'InspectionObservation': 'created_at',
+}
+
+
+def populate_uid(apps, schema_editor):
+    # Existing rows get a key minted from their own creation time, so the
+    # index order still follows insertion order
+    for model_name, created_field in CREATION_FIELDS.items():
+        model = apps.get_model('farm', model_name)
+        batch = []
+        rows = model.objects.order_by('id').values_list('id', created_field)
+        for pk, created in rows.iterator(chunk_size=2000):
+            batch.append(model(id=pk, uid=uuid7(int(created.timestamp() * 1000))))
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['uid'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['uid'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0011_add_uid'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_uid, migrations.RunPython.noop),
+    ]
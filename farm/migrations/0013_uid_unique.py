@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-17 05:10
+
+import farm.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0012_populate_uid'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='boundarypoint',
+            name='uid',
+            field=models.UUIDField(default=farm.models.uuid7, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='farm',
+            name='uid',
+            field=models.UUIDField(default=farm.models.uuid7, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='inspectionobservation',
+            name='uid',
+            field=models.UUIDField(default=farm.models.uuid7, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='inspectionsuggestion',
+            name='uid',
+            field=models.UUIDField(default=farm.models.uuid7, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='observationpoint',
+            name='uid',
+            field=models.UUIDField(default=farm.models.uuid7, editable=False, unique=True),
+        ),
+    ]
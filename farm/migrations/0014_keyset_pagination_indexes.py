@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-17 05:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0013_uid_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='syncjob',
+            name='farm_syncjo_user_id_190d01_idx',
+        ),
+        migrations.AddIndex(
+            model_name='boundarypoint',
+            index=models.Index(fields=['timestamp', 'id'], name='farm_bounda_timesta_3c7720_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='farm',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='farm_farm_user_id_f5cbb6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionobservation',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='farm_inspec_user_id_c6ef3c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionsuggestion',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='farm_inspec_user_id_8f3ddf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='observationpoint',
+            index=models.Index(fields=['created_at', 'id'], name='farm_observ_created_fa4703_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syncjob',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='farm_syncjo_user_id_f70084_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syncsession',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='farm_syncse_user_id_9ff8e0_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-17 05:52
+
+from django.db import migrations, models
+
+
+# Frozen copy of farm.geohash.encode at the time of this migration
+ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9
+
+
+def encode_geohash(latitude, longitude):
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < PRECISION:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(ALPHABET[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def populate_geohash(apps, schema_editor):
+    ObservationPoint = apps.get_model('farm', 'ObservationPoint')
+    batch = []
+    rows = ObservationPoint.objects.order_by('id').values_list('id', 'latitude', 'longitude')
+    for pk, latitude, longitude in rows.iterator(chunk_size=2000):
+        batch.append(ObservationPoint(id=pk, geohash=encode_geohash(latitude, longitude)))
+        if len(batch) >= 2000:
+            ObservationPoint.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    if batch:
+        ObservationPoint.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0014_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='observationpoint',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        # Filled before the index is built, so the index is written once
+        migrations.RunPython(populate_geohash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='observationpoint',
+            index=models.Index(fields=['geohash'], name='farm_observ_geohash_bc53b6_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0015_observationpoint_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='observationpoint',
+            name='inside_boundary',
+            field=models.BooleanField(editable=False, null=True),
+        ),
+    ]
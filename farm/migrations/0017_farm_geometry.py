@@ -0,0 +1,95 @@
+# Generated by Django 5.2 on 2026-10-17 06:11
+
+import numpy as np
+from django.db import migrations, models
+
+
+# Frozen copy of farm.geometry.ring_geometry and its helpers at the time of this migration
+EARTH_RADIUS_M = 6_371_008.8
+SQ_M_PER_ACRE = 4046.8564224
+
+
+def _project(vertices):
+    latitudes, longitudes = np.radians(vertices[:, 0]), np.radians(vertices[:, 1])
+    scale = np.cos(latitudes.mean())
+    return longitudes * scale * EARTH_RADIUS_M, latitudes * EARTH_RADIUS_M, scale
+
+
+def _shoelace(x, y):
+    cross = x * np.roll(y, -1) - np.roll(x, -1) * y
+    return cross.sum(), cross
+
+
+def ring_geometry(points):
+    vertices = np.asarray(points, dtype=float).reshape(-1, 2)
+    if not len(vertices):
+        return {'bbox': None, 'area_m2': 0.0, 'area_acres': 0.0, 'centroid': None, 'perimeter_m': 0.0}
+
+    (min_latitude, min_longitude), (max_latitude, max_longitude) = vertices.min(axis=0), vertices.max(axis=0)
+    latitude, longitude = vertices.mean(axis=0)
+    area = perimeter = 0.0
+    if len(vertices) >= 3:
+        x, y, scale = _project(vertices)
+        twice_area, cross = _shoelace(x, y)
+        area = float(abs(twice_area) / 2)
+        if twice_area:
+            cx = ((x + np.roll(x, -1)) * cross).sum() / (3 * twice_area)
+            cy = ((y + np.roll(y, -1)) * cross).sum() / (3 * twice_area)
+            latitude, longitude = np.degrees(cy / EARTH_RADIUS_M), np.degrees(cx / (scale * EARTH_RADIUS_M))
+
+        latitudes, longitudes = np.radians(vertices[:, 0]), np.radians(vertices[:, 1])
+        next_latitudes, next_longitudes = np.roll(latitudes, -1), np.roll(longitudes, -1)
+        a = (np.sin((next_latitudes - latitudes) / 2) ** 2
+             + np.cos(latitudes) * np.cos(next_latitudes) * np.sin((next_longitudes - longitudes) / 2) ** 2)
+        perimeter = float((2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))).sum())
+
+    return {
+        'bbox': {
+            'min_latitude': float(min_latitude),
+            'min_longitude': float(min_longitude),
+            'max_latitude': float(max_latitude),
+            'max_longitude': float(max_longitude),
+        },
+        'area_m2': area,
+        'area_acres': area / SQ_M_PER_ACRE,
+        'centroid': {'latitude': float(latitude), 'longitude': float(longitude)},
+        'perimeter_m': perimeter,
+    }
+
+
+def populate_geometry(apps, schema_editor):
+    Farm = apps.get_model('farm', 'Farm')
+    BoundaryPoint = apps.get_model('farm', 'BoundaryPoint')
+    farm_ids = list(Farm.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(farm_ids), 500):
+        rings = {}
+        rows = (
+            BoundaryPoint.objects.filter(farm_id__in=farm_ids[start:start + 500])
+            .order_by('farm_id', 'id')
+            .values_list('farm_id', 'latitude', 'longitude')
+        )
+        for farm_id, latitude, longitude in rows:
+            rings.setdefault(farm_id, []).append((latitude, longitude))
+        Farm.objects.bulk_update(
+            [
+                Farm(id=farm_id, geometry={'polygon': [list(point) for point in ring], **ring_geometry(ring)})
+                for farm_id, ring in rings.items()
+            ],
+            ['geometry'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0016_observationpoint_inside_boundary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farm',
+            name='geometry',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_geometry, migrations.RunPython.noop),
+    ]
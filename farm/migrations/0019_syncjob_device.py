@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0018_idempotencyrecord_claimed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncjob',
+            name='device',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
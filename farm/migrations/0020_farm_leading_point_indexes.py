@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0019_syncjob_device'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='boundarypoint',
+            name='farm_bounda_timesta_3c7720_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='observationpoint',
+            name='farm_observ_created_fa4703_idx',
+        ),
+        migrations.AddIndex(
+            model_name='boundarypoint',
+            index=models.Index(fields=['farm', 'timestamp', 'id'], name='farm_bounda_farm_id_0d66ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='observationpoint',
+            index=models.Index(fields=['farm', 'created_at', 'id'], name='farm_observ_farm_id_11393b_idx'),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# farm/mobile_ids.py
+"""
+Resolution of device-assigned record ids to server ids.
+
+The per-entity sync endpoints identify records by the id the device gave them
+(``mobile_id``), and the bulk sync accepts negative temporary ids for records
+created offline. Those ids are only unique on one device, so they are looked up
+in ``MobileIdMapping`` under ``(user, device, entity_type)``: one query per
+batch, whatever its size.
+
+Mappings stored before ids were scoped to devices (and those of requests
+without ``X-Device-Id``) belong to the default device ``''``. A device that
+sends one of those ids resolves it through the default mapping, which is then
+moved to that device, so records created before the upgrade keep syncing.
+"""
+from django.db.models import Q
+
+from .models import MobileIdMapping
+
+
+DEVICE_HEADER = 'X-Device-Id'
+
+
+def device_id(request):
+    """
+    Return the device id a sync request was sent from ('' if not given).
+    """
+    return request.headers.get(DEVICE_HEADER, '')[:255]
+
+
+def as_mobile_id(value):
+    """
+    Return ``value`` as an integer mobile id, or None if it cannot be one.
+
+    The sync engine parses the server ids and references of its rows with it too.
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def resolve(user, device, entity_type, mobile_ids):
+    """
+    Map the known ones of ``mobile_ids`` to their server ids.
+    """
+    mobile_ids = {mobile_id for mobile_id in map(as_mobile_id, mobile_ids) if mobile_id is not None}
+    return resolve_many(user, device, {entity_type: mobile_ids})[entity_type]
+
+
+def resolve_many(user, device, wanted):
+    """
+    Resolve mobile ids of several entity types in one query.
+
+    ``wanted`` maps entity types to mobile ids; the result maps the same entity
+    types to ``{mobile_id: server_id}`` for the ids that are known.
+    """
+    condition = Q()
+    for entity_type, ids in wanted.items():
+        if ids:
+            condition |= Q(entity_type=entity_type, mobile_id__in=ids)
+    resolved = {entity_type: {} for entity_type in wanted}
+    if not condition:
+        return resolved
+    rows = (
+        MobileIdMapping.objects
+        .filter(condition, user=user, device__in={device, ''})
+        .values_list('pk', 'device', 'entity_type', 'mobile_id', 'server_id')
+    )
+    legacy = {}
+    for pk, row_device, entity_type, mobile_id, server_id in rows:
+        if row_device == device:
+            resolved[entity_type][mobile_id] = server_id
+        else:
+            legacy[(entity_type, mobile_id)] = (pk, server_id)
+
+    # Default-device mappings the device has no mapping of its own for are adopted by it
+    adopted = []
+    for (entity_type, mobile_id), (pk, server_id) in legacy.items():
+        if mobile_id not in resolved[entity_type]:
+            resolved[entity_type][mobile_id] = server_id
+            adopted.append(pk)
+    if adopted:
+        MobileIdMapping.objects.filter(pk__in=adopted, device='').update(device=device)
+    return resolved
+
+
+def remember(user, device, entity_type, mapping):
+    """
+    Store ``mapping`` (mobile id -> server id), replacing existing entries.
+    """
+    if not mapping:
+        return
+    MobileIdMapping.objects.bulk_create(
+        [
+            MobileIdMapping(
+                user=user, device=device, entity_type=entity_type, mobile_id=mobile_id, server_id=server_id
+            )
+            for mobile_id, server_id in mapping.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['user', 'device', 'entity_type', 'mobile_id'],
+        update_fields=['server_id'],
+    )
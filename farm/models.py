@@ -2,31 +2,163 @@ from django.db import models
 
 # Create your models here.
 # api/models.py
+import datetime
+import hashlib
+import json
+import os
+import time
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from . import geohash
+
+
+def uuid7(timestamp_ms=None):
+    """
+    Time-ordered UUID (RFC 9562 version 7).
+
+    The leading 48 bits are the Unix time in milliseconds, so keys minted by
+    devices and by the server sort roughly by creation time and new rows land at
+    the end of the index; the remaining bits are random.
+    """
+    if timestamp_ms is None:
+        timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+def content_hash(values):
+    """
+    Stable SHA-256 of a sequence of field values.
+
+    Floats are hashed by ``repr`` and datetimes in UTC, so a value read back from
+    the database hashes the same as the payload value it was written from.
+    """
+    normalized = []
+    for value in values:
+        if isinstance(value, datetime.datetime):
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            value = value.astimezone(datetime.timezone.utc).isoformat()
+        elif isinstance(value, (datetime.date, datetime.time)):
+            value = value.isoformat()
+        elif isinstance(value, float):
+            value = repr(value)
+        normalized.append(value)
+    return hashlib.sha256(json.dumps(normalized, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+class ContentHashMixin:
+    """
+    Keeps ``content_hash`` in step with the model's ``SYNC_HASH_FIELDS``.
+
+    The sync endpoints compare an incoming record's hash with the stored one and
+    skip the write when nothing changed. ``DERIVED_FIELDS`` are the columns
+    ``refresh_derived_fields`` computes from the others; they are refreshed on
+    ``save`` and written by the bulk sync along with the synced fields.
+    """
+    SYNC_HASH_FIELDS = ()
+    DERIVED_FIELDS = ('content_hash',)
+
+    @classmethod
+    def compute_content_hash(cls, values):
+        """
+        Hash a mapping of attname -> value (a model instance's ``__dict__`` or a ``values()`` row).
+
+        Values go through the field's ``to_python`` first, so a raw payload value
+        such as ``1`` hashes the same as the ``1.0`` stored in a float column.
+        """
+        return content_hash(
+            cls._meta.get_field(name).to_python(values.get(name)) for name in cls.SYNC_HASH_FIELDS
+        )
+
+    @classmethod
+    def refresh_content_hashes(cls, queryset):
+        """
+        Recompute the stored hash of every row in ``queryset``.
+
+        ``QuerySet.update`` bypasses ``save``; call this after one that touches
+        any of the ``SYNC_HASH_FIELDS``.
+        """
+        rows = queryset.values('id', *cls.SYNC_HASH_FIELDS)
+        cls.objects.bulk_update(
+            [cls(id=row['id'], content_hash=cls.compute_content_hash(row)) for row in rows],
+            ['content_hash'],
+            batch_size=settings.SYNC_BATCH_SIZE,
+        )
+
+    def refresh_content_hash(self):
+        self.content_hash = self.compute_content_hash(self.__dict__)
+        return self.content_hash
+
+    def refresh_derived_fields(self):
+        self.refresh_content_hash()
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = [
+                *update_fields, *(name for name in self.DERIVED_FIELDS if name not in update_fields)
+            ]
+        super().save(*args, **kwargs)
+
+
+class Farm(ContentHashMixin, models.Model):
+    SYNC_HASH_FIELDS = ('name', 'size', 'plant_type')
 
-class Farm(models.Model):
     name = models.CharField(max_length=255)
     size = models.FloatField()
     plant_type = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='farms')
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    uid = models.UUIDField(default=uuid7, unique=True, editable=False)
+    # Polygon, bbox, area, centroid and perimeter of the boundary ring, cached
+    # whenever its points change (see farm.boundaries)
+    geometry = models.JSONField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.plant_type}"
 
-class BoundaryPoint(models.Model):
+class BoundaryPoint(ContentHashMixin, models.Model):
+    SYNC_HASH_FIELDS = ('farm_id', 'latitude', 'longitude', 'description')
+
     farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='boundary_points')
     latitude = models.FloatField()
     longitude = models.FloatField()
     description = models.CharField(max_length=255, blank=True, null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    uid = models.UUIDField(default=uuid7, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pages of a user's points scan each of their farms in order
+            models.Index(fields=['farm', 'timestamp', 'id']),
+        ]
     
     def __str__(self):
         desc = self.description if self.description else f"Point at {self.latitude:.4f}, {self.longitude:.4f}"
         return f"Boundary Point - {desc} - {self.farm}"
 
-class ObservationPoint(models.Model):
+class ObservationPoint(ContentHashMixin, models.Model):
+    SYNC_HASH_FIELDS = (
+        'farm_id', 'latitude', 'longitude', 'observation_status', 'name', 'segment',
+        'inspection_suggestion_id', 'confidence_level', 'target_entity',
+    )
+
     farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='observation_points')
     latitude = models.FloatField()
     longitude = models.FloatField()
@@ -41,7 +173,7 @@ class ObservationPoint(models.Model):
     image = models.ImageField(upload_to='observation_images/', null=False, blank=False)
 
     # Sync-related fields
-    mobile_id = models.IntegerField(unique=True, null=True, blank=True)
+    mobile_id = models.IntegerField(null=True, blank=True)
     last_synced = models.DateTimeField(null=True, blank=True)
     sync_status = models.CharField(
         max_length=20,
@@ -52,19 +184,38 @@ class ObservationPoint(models.Model):
         ],
         default='pending'
     )
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    uid = models.UUIDField(default=uuid7, unique=True, editable=False)
+    # Maintained from latitude/longitude for bounding-box queries (see farm.geohash)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
+    # Whether the point lies inside its farm's boundary ring; null while the
+    # farm has no ring. Maintained by farm.containment
+    inside_boundary = models.BooleanField(null=True, editable=False)
+
+    DERIVED_FIELDS = ('content_hash', 'geohash')
 
     class Meta:
         indexes = [
             models.Index(fields=['farm']),
             models.Index(fields=['mobile_id']),
             models.Index(fields=['sync_status']),
+            models.Index(fields=['farm', 'created_at', 'id']),
+            models.Index(fields=['geohash']),
         ]
 
     def __str__(self):
         return f"Observation Point {self.id} - Farm {self.farm_id} - Segment {self.segment}"
 
+    def refresh_derived_fields(self):
+        super().refresh_derived_fields()
+        self.geohash = geohash.encode(self.latitude, self.longitude)
+
+
+class InspectionSuggestion(ContentHashMixin, models.Model):
+    SYNC_HASH_FIELDS = (
+        'target_entity', 'confidence_level', 'property_location_id', 'area_size', 'density_of_plant',
+    )
 
-class InspectionSuggestion(models.Model):
     target_entity = models.CharField(max_length=255)
     confidence_level = models.CharField(max_length=50)
     property_location = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='inspection_suggestions')
@@ -74,7 +225,7 @@ class InspectionSuggestion(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='inspection_suggestions')
 
     # Sync-related fields
-    mobile_id = models.IntegerField(unique=True, null=True, blank=True)
+    mobile_id = models.IntegerField(null=True, blank=True)
     last_synced = models.DateTimeField(null=True, blank=True)
     sync_status = models.CharField(
         max_length=20,
@@ -85,6 +236,8 @@ class InspectionSuggestion(models.Model):
         ],
         default='pending'
     )
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    uid = models.UUIDField(default=uuid7, unique=True, editable=False)
 
     class Meta:
         indexes = [
@@ -92,12 +245,18 @@ class InspectionSuggestion(models.Model):
             models.Index(fields=['user']),
             models.Index(fields=['mobile_id']),
             models.Index(fields=['sync_status']),
+            models.Index(fields=['user', 'created_at', 'id']),
         ]
 
     def __str__(self):
         return f"Inspection Suggestion {self.id} - {self.target_entity} - Farm {self.property_location_id}"
 
-class InspectionObservation(models.Model):
+class InspectionObservation(ContentHashMixin, models.Model):
+    SYNC_HASH_FIELDS = (
+        'date', 'inspection_id', 'farm_id', 'confidence', 'plant_per_section', 'status',
+        'target_entity', 'severity',
+    )
+
     date = models.DateTimeField()
     inspection = models.ForeignKey(InspectionSuggestion, on_delete=models.CASCADE, related_name='observations')
     confidence = models.CharField(max_length=50)
@@ -111,7 +270,216 @@ class InspectionObservation(models.Model):
     severity = models.CharField(max_length=50, blank=True, null=True)
     image = models.ImageField(upload_to='inspection_images/', blank=True, null=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='observations')
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    uid = models.UUIDField(default=uuid7, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         target = self.target_entity if self.target_entity else "Unknown"
         return f"Observation - {target} - {self.status} - {self.farm}"
+
+
+class ChangeSequence(models.Model):
+    """
+    Per-user counter that hands out change feed sequence numbers.
+
+    Writers lock this row while allocating, so for any one user sequence numbers
+    are assigned in commit order and a reader never skips a concurrent write.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='change_sequence')
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Change sequence for user {self.user_id} at {self.value}"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    One insert, update or delete of a farm record, in per-user sequence order.
+    """
+    OPERATION_CHOICES = [
+        ('upsert', 'Upsert'),
+        ('delete', 'Delete'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='changes')
+    seq = models.BigIntegerField()
+    entity_type = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'seq'], name='unique_change_seq_per_user'),
+        ]
+
+    def __str__(self):
+        return f"Change {self.seq} - {self.operation} {self.entity_type} {self.object_id}"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Outcome of a sync request sent with an ``Idempotency-Key`` header.
+
+    A retry with the same key inside the TTL window is answered from
+    ``response_body`` instead of replaying the batch against the farm tables.
+    """
+    STATE_CHOICES = [
+        ('in_progress', 'In progress'),
+        ('completed', 'Completed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_records')
+    key = models.CharField(max_length=255)
+    request_digest = models.CharField(max_length=64)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='in_progress')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Start of the lease of the request running an in_progress key
+    claimed_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key} - {self.state}"
+
+
+class SyncJob(models.Model):
+    """
+    A sync payload queued for the background workers (``process_sync_jobs``).
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sync_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    results = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=255, blank=True)
+    # X-Device-Id of the request that queued the job, scoping its mobile ids
+    device = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Sync job {self.id} - {self.status} - {self.processed_rows}/{self.total_rows}"
+
+
+class SyncSession(models.Model):
+    """
+    A large sync split across several requests, one numbered chunk at a time.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('committed', 'Committed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sync_sessions')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    total_chunks = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    committed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Sync session {self.id} - {self.status}"
+
+
+class SyncSessionChunk(models.Model):
+    """
+    A chunk of a sync session that has been applied, with its per-row results.
+    """
+    session = models.ForeignKey(SyncSession, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    digest = models.CharField(max_length=64)
+    row_count = models.PositiveIntegerField(default=0)
+    results = models.JSONField(encoder=DjangoJSONEncoder)
+    applied_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'index'], name='unique_chunk_index_per_session'),
+        ]
+
+    def __str__(self):
+        return f"Chunk {self.index} of sync session {self.session_id}"
+
+
+class FarmDigest(models.Model):
+    """
+    Digests of one farm's child collections, kept up to date on every write.
+
+    Each collection digest is the XOR of the leaf hashes of its rows (see
+    ``farm.digests``), so a write only has to XOR out the row's old leaf and XOR
+    in the new one instead of rehashing the collection.
+    """
+    EMPTY = '0' * 64
+
+    farm = models.OneToOneField(Farm, on_delete=models.CASCADE, related_name='digest')
+    boundary_points = models.CharField(max_length=64, default=EMPTY)
+    observation_points = models.CharField(max_length=64, default=EMPTY)
+    inspection_suggestions = models.CharField(max_length=64, default=EMPTY)
+    observations = models.CharField(max_length=64, default=EMPTY)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Digest for farm {self.farm_id}"
+
+
+class MobileIdMapping(models.Model):
+    """
+    The server id of a record a device created under its own local id.
+
+    Device ids are only unique per device, so they are scoped to the user and
+    the device that sent them (``X-Device-Id``); the composite unique index
+    makes resolving a batch of them a single index scan.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='mobile_id_mappings')
+    device = models.CharField(max_length=255, blank=True, default='')
+    entity_type = models.CharField(max_length=50)
+    mobile_id = models.BigIntegerField()
+    server_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'device', 'entity_type', 'mobile_id'], name='unique_mobile_id_per_device'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type} {self.mobile_id} on {self.device or 'default device'} -> {self.server_id}"
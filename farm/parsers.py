@@ -0,0 +1,37 @@
+# farm/parsers.py
+import orjson
+
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser for newline-delimited JSON sync uploads.
+
+    Unlike ``JSONParser`` it does not read the body up front: ``request.data``
+    is a lazy iterator of ``(line_number, record, error)`` tuples, so a request
+    of any size is consumed one line at a time.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        return iter_ndjson(stream, encoding)
+
+
+def iter_ndjson(stream, encoding='utf-8'):
+    """
+    Yield ``(line_number, record, error)`` for each non-blank line of ``stream``.
+
+    A line that is not valid JSON yields ``record=None`` and an error message
+    instead of aborting the whole upload.
+    """
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, orjson.loads(line.decode(encoding) if isinstance(line, bytes) else line), None
+        except ValueError as e:
+            yield number, None, f'Invalid JSON: {e}'
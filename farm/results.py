@@ -0,0 +1,135 @@
+# farm/results.py
+"""
+Compact encoding of sync results for large batches.
+
+A sync response carries one ``{mobile_id, server_id, status, message}`` dict
+per uploaded row, which for a big upload can outweigh the upload itself. With
+``?results=columnar`` each list of results is sent as parallel arrays instead:
+
+    {
+        "format": "columnar",
+        "statuses": ["created", "updated", "unchanged", "failed"],
+        "mobile_id": [...],
+        "server_id": [...],
+        "status": [0, 2, 3, ...],
+        "messages": {"2": "..."}
+    }
+
+``status`` holds indexes into ``statuses``; ``messages`` (and ``uid``, for
+created rows that have one) are keyed by row index and only list the rows that
+have them. Sync responses are also gzipped when the client's ``Accept-Encoding``
+allows it.
+"""
+import functools
+
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+
+RESULTS_PARAM = 'results'
+COLUMNAR = 'columnar'
+STATUSES = ('created', 'updated', 'unchanged', 'failed')
+# Smaller bodies are not worth compressing
+GZIP_MIN_LENGTH = 200
+
+
+def columnar(results):
+    """
+    Encode a list of per-row sync results as parallel arrays.
+    """
+    encoded = {
+        'format': COLUMNAR,
+        'statuses': STATUSES,
+        'mobile_id': [],
+        'server_id': [],
+        'status': [],
+        'messages': {},
+    }
+    uids = {}
+    for index, result in enumerate(results):
+        encoded['mobile_id'].append(result.get('mobile_id'))
+        encoded['server_id'].append(result.get('server_id'))
+        encoded['status'].append(STATUSES.index(result['status']))
+        if 'message' in result:
+            encoded['messages'][str(index)] = result['message']
+        if 'uid' in result:
+            uids[str(index)] = result['uid']
+    if uids:
+        encoded['uid'] = uids
+    return encoded
+
+
+def encode_results(data):
+    """
+    Return a copy of a sync response body with its ``results`` encoded columnar.
+
+    ``results`` is either one list or, for the combined sync, a list per collection.
+    """
+    data = dict(data)
+    results = data['results']
+    if isinstance(results, dict):
+        data['results'] = {entity: columnar(rows) for entity, rows in results.items()}
+    else:
+        data['results'] = columnar(results)
+    return data
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Whether an ``Accept-Encoding`` header value allows a gzip response.
+
+    Codings are weighed by their ``q`` value: ``gzip;q=0`` refuses gzip, and
+    ``*`` stands for gzip when it is not listed itself.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+def gzip_response(response):
+    """
+    Post-render callback compressing ``response`` with gzip.
+    """
+    if response.has_header('Content-Encoding') or len(response.content) < GZIP_MIN_LENGTH:
+        return
+    compressed = compress_string(response.content)
+    if len(compressed) >= len(response.content):
+        return
+    response.content = compressed
+    response['Content-Encoding'] = 'gzip'
+    response['Content-Length'] = str(len(compressed))
+
+
+def compact_results(view_method):
+    """
+    Encode a sync view's results as requested by the client.
+
+    Apply it outside ``idempotent`` so the stored response keeps the plain
+    format and a replay is encoded for the client asking for it.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        response = view_method(self, request, *args, **kwargs)
+        data = getattr(response, 'data', None)
+        if request.query_params.get(RESULTS_PARAM) == COLUMNAR and isinstance(data, dict) and 'results' in data:
+            response.data = encode_results(data)
+        # Whether the body is compressed depends on the header, for caches too
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if accepts_gzip(request.headers.get('Accept-Encoding', '')):
+            response.add_post_render_callback(gzip_response)
+        return response
+
+    return wrapper
@@ -1,22 +1,73 @@
 # farmserializers.py
 from rest_framework import serializers
-from .models import Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation
+from .models import (
+    Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation, SyncJob, SyncSession
+)
+from .fieldsets import SparseFieldsMixin
+
+class FarmSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'boundary_points': ('BoundaryPointSerializer', True),
+        'observation_points': ('ObservationPointSerializer', True),
+        'inspection_suggestions': ('InspectionSuggestionSerializer', True),
+        'observations': ('InspectionObservationSerializer', True),
+    }
 
-class FarmSerializer(serializers.ModelSerializer):
     class Meta:
         model = Farm
         fields = '__all__'
+        read_only_fields = ('content_hash', 'uid', 'geometry')
+
+class BoundaryPointSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'farm': ('FarmSerializer', False),
+    }
 
-class BoundaryPointSerializer(serializers.ModelSerializer):
     class Meta:
         model = BoundaryPoint
         fields = '__all__'
+        read_only_fields = ('content_hash', 'uid')
+
+class ObservationPointSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'farm': ('FarmSerializer', False),
+        'inspection_suggestion': ('InspectionSuggestionSerializer', False),
+    }
 
-class ObservationPointSerializer(serializers.ModelSerializer):
     class Meta:
         model = ObservationPoint
         fields = '__all__'
-        read_only_fields = ('id', 'created_at', 'updated_at', 'last_synced', 'sync_status')
+        read_only_fields = (
+            'id', 'created_at', 'updated_at', 'last_synced', 'sync_status', 'content_hash', 'uid', 'geohash',
+            'inside_boundary',
+        )
+
+class BoundaryVertexSerializer(serializers.Serializer):
+    """
+    One vertex of a boundary ring.
+    """
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+
+
+class BoundaryPointBulkSyncSerializer(serializers.Serializer):
+    """
+    Serializer for replacing a farm's whole boundary ring.
+    """
+    farm_id = serializers.IntegerField()
+    boundary_points = BoundaryVertexSerializer(many=True)
+
+
+class FarmBulkSyncSerializer(serializers.Serializer):
+    """
+    Serializer for bulk syncing farms.
+    """
+    farms = serializers.ListField(
+        child=serializers.JSONField(),
+        required=True
+    )
+
 
 class ObservationPointBulkSyncSerializer(serializers.Serializer):
     """
@@ -40,12 +91,88 @@ class InspectionSuggestionBulkSyncSerializer(serializers.Serializer):
     )
 
 
-class InspectionSuggestionSerializer(serializers.ModelSerializer):
+class InspectionSuggestionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'property_location': ('FarmSerializer', False),
+        'observation_points': ('ObservationPointSerializer', True),
+        'observations': ('InspectionObservationSerializer', True),
+    }
+
     class Meta:
         model = InspectionSuggestion
         fields = '__all__'
+        read_only_fields = ('content_hash', 'uid')
+
+class InspectionObservationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'farm': ('FarmSerializer', False),
+        'inspection': ('InspectionSuggestionSerializer', False),
+        'section': ('BoundaryPointSerializer', False),
+    }
 
-class InspectionObservationSerializer(serializers.ModelSerializer):
     class Meta:
         model = InspectionObservation
         fields = '__all__'
+        read_only_fields = ('content_hash', 'uid')
+
+
+
+class FarmSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a farm with its whole hierarchy, to bootstrap a device.
+
+    Expects the related rows to be prefetched (see ``snapshots.with_hierarchy``).
+    """
+    boundary_points = BoundaryPointSerializer(many=True, read_only=True)
+    observation_points = ObservationPointSerializer(many=True, read_only=True)
+    inspection_suggestions = InspectionSuggestionSerializer(many=True, read_only=True)
+    observations = InspectionObservationSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Farm
+        fields = '__all__'
+        read_only_fields = ('content_hash', 'uid', 'geometry')
+
+
+class SyncJobSerializer(serializers.ModelSerializer):
+    """
+    Progress and outcome of an asynchronous sync job.
+    """
+    class Meta:
+        model = SyncJob
+        fields = (
+            'id', 'status', 'total_rows', 'processed_rows', 'results', 'error',
+            'created_at', 'started_at', 'finished_at',
+        )
+        read_only_fields = fields
+
+
+class SyncSessionSerializer(serializers.ModelSerializer):
+    """
+    State of a chunked sync session: which chunks the server has applied and
+    which one the client should send next.
+    """
+    acknowledged_chunks = serializers.SerializerMethodField()
+    next_chunk = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SyncSession
+        fields = ('id', 'status', 'total_chunks', 'acknowledged_chunks', 'next_chunk', 'created_at', 'committed_at')
+        read_only_fields = ('id', 'status', 'acknowledged_chunks', 'next_chunk', 'created_at', 'committed_at')
+
+    def get_acknowledged_chunks(self, obj):
+        if obj.pk is None:
+            return []
+        # Read from the chunks SyncSessionViewSet prefetches, not one query per session
+        return sorted(chunk.index for chunk in obj.chunks.all())
+
+    def get_next_chunk(self, obj):
+        """
+        The lowest chunk index not applied yet.
+        """
+        next_index = 0
+        for index in self.get_acknowledged_chunks(obj):
+            if index != next_index:
+                break
+            next_index += 1
+        return next_index
@@ -0,0 +1,151 @@
+# farm/signals.py
+import threading
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+
+from . import boundaries, caching, containment, digests
+from .changes import ENTITY_TYPES, owner_id, record_changes
+from .models import Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion
+
+
+def _deleting_farm(origin):
+    return isinstance(origin, Farm) or (isinstance(origin, QuerySet) and origin.model is Farm)
+
+
+def tracked_in_bulk(queryset):
+    """
+    Mark ``queryset`` for a ``delete()`` whose caller records the change log,
+    digests and ring refresh of the deleted rows (cascades included) itself.
+
+    The receivers below skip the rows of such a delete instead of handling
+    them one by one.
+    """
+    queryset._tracked_in_bulk = True
+    return queryset
+
+
+def _tracked_in_bulk(origin):
+    return isinstance(origin, QuerySet) and getattr(origin, '_tracked_in_bulk', False)
+
+
+def record_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    user_id = owner_id(instance)
+    record_changes(user_id, ENTITY_TYPES[sender], [instance.pk], 'upsert')
+    caching.invalidate(user_id, [ENTITY_TYPES[sender]])
+
+
+def record_delete(sender, instance, origin=None, **kwargs):
+    # A farm tombstone already removes the farm's whole subtree on the device,
+    # so rows cascading from a farm delete don't need one of their own.
+    if (_deleting_farm(origin) and sender is not Farm) or _tracked_in_bulk(origin):
+        return
+    user_id = owner_id(instance)
+    record_changes(user_id, ENTITY_TYPES[sender], [instance.pk], 'delete')
+    # A delete also cascades to, or clears references (SET_NULL) in, other
+    # collections without signals of its own
+    caching.invalidate(user_id)
+
+
+def stash_detached_points(sender, instance, origin=None, **kwargs):
+    # Deleting a suggestion clears it from the observation points referencing
+    # it (SET_NULL) with an UPDATE that sends no signals; remember those points
+    if _deleting_farm(origin):
+        instance._detached_points = []
+    else:
+        instance._detached_points = list(
+            ObservationPoint.objects.filter(inspection_suggestion=instance).values_list('id', 'farm__user_id')
+        )
+
+
+def refresh_detached_points(sender, instance, **kwargs):
+    points = getattr(instance, '_detached_points', [])
+    if not points:
+        return
+    point_ids = [pk for pk, _ in points]
+    before = digests.row_states(ObservationPoint, point_ids)
+    ObservationPoint.refresh_content_hashes(ObservationPoint.objects.filter(id__in=point_ids))
+    digests.track(ObservationPoint, before, digests.row_states(ObservationPoint, point_ids))
+    by_user = {}
+    for pk, user_id in points:
+        by_user.setdefault(user_id, []).append(pk)
+    for user_id, ids in by_user.items():
+        record_changes(user_id, ENTITY_TYPES[ObservationPoint], ids, 'upsert')
+        caching.invalidate(user_id, [ENTITY_TYPES[ObservationPoint]])
+
+
+def stash_digest_state(sender, instance, raw=False, **kwargs):
+    # The row as stored before this save, to XOR out of its farm digest
+    if raw or instance.pk is None:
+        instance._digest_before = {}
+    else:
+        instance._digest_before = digests.row_states(sender, [instance.pk])
+
+
+def track_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_digest_before', {})
+    digests.track(sender, before, {instance.pk: digests.row_state(instance)})
+
+
+def track_delete(sender, instance, origin=None, **kwargs):
+    # The farm's digest row goes with the farm
+    if _deleting_farm(origin) or _tracked_in_bulk(origin):
+        return
+    digests.track(sender, {instance.pk: digests.row_state(instance)}, {})
+
+
+def classify_point(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    containment.classify_points([instance])
+
+
+# Farms whose rings were edited by single saves in the current transaction.
+# Those left over by a rolled back transaction are refreshed with the next
+# batch, which finds nothing to change for them.
+_changed_rings = threading.local()
+
+
+def _refresh_rings():
+    farm_ids = getattr(_changed_rings, 'farm_ids', set())
+    _changed_rings.farm_ids = set()
+    if not farm_ids:
+        return
+    with transaction.atomic():
+        boundaries.refresh_geometry(farm_ids)
+        containment.classify_farms(farm_ids)
+
+
+def ring_changed(sender, instance, raw=False, origin=None, **kwargs):
+    # A farm delete takes its points along
+    if raw or _deleting_farm(origin) or _tracked_in_bulk(origin):
+        return
+    # Refreshed once per farm when the transaction commits, however many of
+    # its points were saved or deleted (QuerySet deletes included): the first
+    # callback to run takes every pending farm
+    if not hasattr(_changed_rings, 'farm_ids'):
+        _changed_rings.farm_ids = set()
+    _changed_rings.farm_ids.add(instance.farm_id)
+    transaction.on_commit(_refresh_rings)
+
+
+for model in ENTITY_TYPES:
+    post_save.connect(record_save, sender=model, dispatch_uid=f'farm_changes_save_{model.__name__}')
+    post_delete.connect(record_delete, sender=model, dispatch_uid=f'farm_changes_delete_{model.__name__}')
+
+for model in digests.COLLECTIONS:
+    pre_save.connect(stash_digest_state, sender=model, dispatch_uid=f'farm_digests_pre_save_{model.__name__}')
+    post_save.connect(track_save, sender=model, dispatch_uid=f'farm_digests_save_{model.__name__}')
+    post_delete.connect(track_delete, sender=model, dispatch_uid=f'farm_digests_delete_{model.__name__}')
+
+pre_delete.connect(stash_detached_points, sender=InspectionSuggestion, dispatch_uid='farm_detached_points_pre')
+post_delete.connect(refresh_detached_points, sender=InspectionSuggestion, dispatch_uid='farm_detached_points')
+
+post_save.connect(classify_point, sender=ObservationPoint, dispatch_uid='farm_containment_point')
+post_save.connect(ring_changed, sender=BoundaryPoint, dispatch_uid='farm_ring_save')
+post_delete.connect(ring_changed, sender=BoundaryPoint, dispatch_uid='farm_ring_delete')
@@ -0,0 +1,65 @@
+# farm/snapshots.py
+"""
+Full snapshots of a user's farms, for bootstrapping a device.
+
+A snapshot is one farm (or every farm of the user) with all its boundary
+points, observation points, inspection suggestions and observations. The rows
+are loaded with one query per collection whatever the number of farms, and the
+response carries a strong ``ETag`` made from the user's collection versions
+(see ``caching``), so a device that already holds the current snapshot gets a
+bodiless ``304 Not Modified`` without the snapshot being loaded.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+from . import caching
+from .changes import ENTITY_TYPES
+from .models import BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation
+
+
+HIERARCHY = (
+    Prefetch('boundary_points', queryset=BoundaryPoint.objects.order_by('id')),
+    Prefetch('observation_points', queryset=ObservationPoint.objects.order_by('id')),
+    Prefetch('inspection_suggestions', queryset=InspectionSuggestion.objects.order_by('id')),
+    Prefetch('observations', queryset=InspectionObservation.objects.order_by('id')),
+)
+
+
+def with_hierarchy(queryset):
+    """
+    Prefetch every collection of the farms in ``queryset``, in a stable order.
+    """
+    return queryset.order_by('id').prefetch_related(*HIERARCHY)
+
+
+def body_etag(data):
+    """
+    Strong ETag of a response body.
+    """
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return quote_etag(hashlib.sha256(body.encode()).hexdigest())
+
+
+def etag_response(request, build):
+    """
+    Respond with ``build()`` and its strong ETag, or 304 if the client's copy is current.
+
+    The ETag is derived from the user's collection versions, the URL and the
+    media type, which together determine the rendered body, so ``build`` is
+    only called when the snapshot has to be sent. Without a shared cache there
+    are no versions to answer from, and the ETag is the hash of the body.
+    """
+    if settings.RESPONSE_CACHE_SHARED:
+        tag = caching.etag(caching.version_digest(request, ENTITY_TYPES.values()), weak=False)
+        response = caching.not_modified(request, tag)
+        return response or Response(build(), headers={'ETag': tag})
+
+    data = build()
+    tag = body_etag(data)
+    return caching.not_modified(request, tag) or Response(data, headers={'ETag': tag})
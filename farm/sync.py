@@ -0,0 +1,864 @@
+# farm/sync.py
+"""
+Set-based sync engine used by the bulk sync endpoints.
+
+Rows are validated one by one in Python, but every lookup is done with a single
+``id__in`` query per entity type and every write goes through
+``bulk_create(update_conflicts=True)`` in chunks, so the number of queries grows
+with the number of entity types in the payload rather than with its row count.
+"""
+import itertools
+import uuid
+from graphlib import TopologicalSorter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import boundaries, caching, containment, digests, idempotency, mobile_ids, signals
+from .changes import ENTITY_MODELS, ENTITY_TYPES, record_changes
+from .mobile_ids import as_mobile_id
+from .models import Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation
+
+
+ENTITY_KEYS = (
+    'farms',
+    'boundary_points',
+    'observation_points',
+    'inspection_suggestions',
+    'inspection_observations',
+)
+
+
+# Foreign keys of each collection, by payload field, and the collection they refer to
+REFERENCES = {
+    'boundary_points': {'farm_id': 'farms'},
+    'observation_points': {'farm_id': 'farms', 'inspection_suggestion_id': 'inspection_suggestions'},
+    'inspection_suggestions': {'property_location': 'farms'},
+    'inspection_observations': {'farm': 'farms', 'inspection': 'inspection_suggestions'},
+}
+
+# Parents before children, ties broken by ENTITY_KEYS order
+SYNC_ORDER = tuple(
+    TopologicalSorter({key: tuple(REFERENCES.get(key, {}).values()) for key in ENTITY_KEYS}).static_order()
+)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _row_id(row, field='id'):
+    return row.get(field) if isinstance(row, dict) else None
+
+
+def _is_temp_id(value):
+    """
+    Client-side temporary ids are negative; server ids never are.
+    """
+    pk = as_mobile_id(value)
+    return pk is not None and pk < 0
+
+
+def _as_uid(value):
+    """
+    Return ``value`` as a UUID, or None if it is not one.
+    """
+    if isinstance(value, uuid.UUID):
+        return value
+    if not isinstance(value, str):
+        return None
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        return None
+
+
+def _failed(mobile_id, message):
+    return {
+        'mobile_id': mobile_id,
+        'status': 'failed',
+        'message': message
+    }
+
+
+def coerce_fields(instance, field_names):
+    """
+    Convert the raw payload values on ``instance`` to their Python types.
+
+    This is the part of ``Model.full_clean`` that would otherwise surface as a
+    database error halfway through a bulk insert: type conversion, NULL checks
+    and max_length. Blank strings are accepted, as they were by the per-row
+    ``update_or_create`` path this engine replaces.
+    """
+    errors = {}
+    for name in field_names:
+        field = instance._meta.get_field(name)
+        try:
+            value = field.to_python(getattr(instance, field.attname))
+            if value is None and not field.null:
+                raise ValidationError(field.error_messages['null'], code='null')
+            if value not in field.empty_values:
+                field.run_validators(value)
+        except ValidationError as e:
+            errors[name] = e.error_list
+        else:
+            setattr(instance, field.attname, value)
+    if errors:
+        raise ValidationError(errors)
+
+
+class BulkSyncEngine:
+    """
+    Upsert a full sync payload for one user.
+
+    ``run`` returns the same per-row ``results`` structure the endpoint has
+    always returned: one entry per incoming row, in input order, with either
+    ``server_id`` and ``created``/``updated``/``unchanged`` or ``failed`` and a
+    message.
+    """
+
+    def __init__(self, user, batch_size=None, fan_out=False, device='', commit_every=0):
+        self.user = user
+        self.batch_size = batch_size or settings.SYNC_BATCH_SIZE
+        # With commit_every, run() is not wrapped in a transaction: every chunk
+        # of that many rows commits on its own
+        self.commit_every = commit_every
+        if commit_every:
+            self.batch_size = min(self.batch_size, commit_every)
+        # Copy written suggestions onto their farms' observation points, as
+        # the inspection suggestion sync endpoint does
+        self.fan_out = fan_out
+        # Temporary (negative) ids are remembered per device, like mobile ids
+        self.device = device
+        self.temp_ids = {key: {} for key in ENTITY_KEYS}
+        self.uid_ids = {key: {} for key in ENTITY_KEYS}
+        # Keys new rows of run_mobile are inserted under -> the device's id for them
+        self.mobile_keys = {key: {} for key in ENTITY_KEYS}
+
+    def run(self, data):
+        """
+        Sync every collection of ``data``, parents before the children that reference them.
+
+        Rows the device created offline may use negative temporary ids, both as
+        their own ``id`` and in references to each other. Each temporary id is
+        replaced by the server id its row was inserted under before any row
+        referencing it is written, so a new farm hierarchy uploads in one
+        request. The assignment is stored, so a retry or a later upload that
+        still uses the temporary id resolves to the same row.
+
+        Rows may instead carry a client-generated ``uid`` and leave out ``id``;
+        they are matched on ``uid``, and references may use a parent's uid in
+        place of its id.
+        """
+        if self.commit_every:
+            return self._run(data)
+        with transaction.atomic():
+            return self._run(data)
+
+    def _run(self, data):
+        rows = {key: list(data.get(key, [])) for key in ENTITY_KEYS}
+        self._load_temp_ids(rows)
+        self._load_uids(rows)
+
+        results = {}
+        farm_ids = None
+        for entity in SYNC_ORDER:
+            resolved = [self._resolve_row(entity, row) for row in rows[entity]]
+            if entity == 'farms':
+                results[entity] = self.sync_farms(resolved)
+                continue
+
+            if farm_ids is None:
+                # Every child entity is scoped to one of the user's farms;
+                # resolve all of them at once now that the farms are written.
+                referenced = [
+                    self._resolve(_row_id(row, field), 'farms')
+                    for child, fields in REFERENCES.items()
+                    for field, target in fields.items() if target == 'farms'
+                    for row in rows[child]
+                ]
+                farm_ids = self._owned_ids(Farm.objects.filter(user=self.user), referenced)
+            results[entity] = getattr(self, f'sync_{entity}')(resolved, farm_ids)
+
+        # Report rows by the id the device sent, not the one it resolved to
+        for entity, entity_rows in rows.items():
+            for row, result in zip(entity_rows, results[entity]):
+                if _is_temp_id(_row_id(row)) or _as_uid(_row_id(row, 'uid')) is not None:
+                    result['mobile_id'] = row.get('id')
+        return results
+
+    def run_mobile(self, entity, rows):
+        """
+        Sync rows of one collection keyed by the ids the device assigned them.
+
+        This is what the per-entity sync endpoints do: every row's ``id`` is a
+        mobile id, looked up in the device's ``MobileIdMapping`` entries rather
+        than taken as a server id. Rows with an unknown mobile id are inserted
+        and their mapping remembered with their chunk; results report the
+        mobile id the row was sent with. References (``farm_id``,
+        ``property_location``, ...) are server ids.
+        """
+        if self.commit_every:
+            return self._run_mobile(entity, rows)
+        with transaction.atomic():
+            return self._run_mobile(entity, rows)
+
+    def _run_mobile(self, entity, rows):
+        known = mobile_ids.resolve(self.user, self.device, entity, [_row_id(row) for row in rows])
+        insert_keys = itertools.count(-1, -1)
+        new_keys = {}
+        resolved = []
+        for row in rows:
+            if isinstance(row, dict):
+                mobile_id = as_mobile_id(row.get('id'))
+                row = dict(row, mobile_id=mobile_id)
+                if mobile_id in known:
+                    row['id'] = known[mobile_id]
+                else:
+                    # Rows repeating a new mobile id share its insert key and collapse into one
+                    row['id'] = new_keys.get(mobile_id) if mobile_id is not None else None
+                    if row['id'] is None:
+                        row['id'] = next(insert_keys)
+                        self.mobile_keys[entity][row['id']] = mobile_id
+                        if mobile_id is not None:
+                            new_keys[mobile_id] = row['id']
+            resolved.append(row)
+
+        if entity == 'farms':
+            results = self.sync_farms(resolved)
+        else:
+            referenced = [
+                _row_id(row, field) for row in resolved
+                for field, target in REFERENCES[entity].items() if target == 'farms'
+            ]
+            farm_ids = self._owned_ids(Farm.objects.filter(user=self.user), referenced)
+            results = getattr(self, f'sync_{entity}')(resolved, farm_ids)
+        for row, result in zip(rows, results):
+            result['mobile_id'] = _row_id(row)
+        return results
+
+    def _resolve(self, value, entity):
+        """
+        Return the server id of ``entity``'s temporary id or uid ``value``, or ``value`` itself.
+        """
+        if _is_temp_id(value):
+            return self.temp_ids[entity].get(as_mobile_id(value), value)
+        uid = _as_uid(value)
+        if uid is not None:
+            return self.uid_ids[entity].get(uid, value)
+        return value
+
+    def _resolve_row(self, entity, row):
+        if not isinstance(row, dict):
+            return row
+        row = dict(row)
+        uid = _as_uid(row.get('uid'))
+        if uid is not None and row.get('id') is None:
+            # Keyed by uid alone: the row holding it, or None to insert a new one
+            row['id'] = self.uid_ids[entity].get(uid)
+        for field, target in (('id', entity), *REFERENCES.get(entity, {}).items()):
+            if field in row:
+                row[field] = self._resolve(row[field], target)
+        return row
+
+    def _load_temp_ids(self, rows):
+        """
+        Look up the temporary ids in ``rows`` that earlier requests already assigned.
+        """
+        wanted = {key: set() for key in ENTITY_KEYS}
+        for entity, entity_rows in rows.items():
+            for row in entity_rows:
+                for field, target in (('id', entity), *REFERENCES.get(entity, {}).items()):
+                    value = _row_id(row, field)
+                    if _is_temp_id(value) and as_mobile_id(value) not in self.temp_ids[target]:
+                        wanted[target].add(as_mobile_id(value))
+        for entity, mapping in mobile_ids.resolve_many(self.user, self.device, wanted).items():
+            self.temp_ids[entity].update(mapping)
+
+    def _load_uids(self, rows):
+        """
+        Look up the server ids of the uids in ``rows``, one query per entity type.
+
+        Uids are looked up across all users; rows and references resolving to
+        another user's records fail the ownership checks like plain ids do.
+        """
+        wanted = {key: set() for key in ENTITY_KEYS}
+        for entity, entity_rows in rows.items():
+            for row in entity_rows:
+                for field, target in (('uid', entity), *REFERENCES.get(entity, {}).items()):
+                    uid = _as_uid(_row_id(row, field))
+                    if uid is not None:
+                        wanted[target].add(uid)
+        for entity, uids in wanted.items():
+            if uids:
+                self.uid_ids[entity].update(
+                    ENTITY_MODELS[entity].objects.filter(uid__in=uids).values_list('uid', 'id')
+                )
+
+    def _coerce(self, instance, row, field_names):
+        """
+        ``coerce_fields`` for a sync row, including its ``uid`` if it sent one.
+
+        A row keyed by a uid that is not known yet has no id until it is inserted.
+        """
+        if row.get('uid') is not None:
+            instance.uid = row['uid']
+            field_names = ['uid', *field_names]
+            if instance.id is None:
+                field_names.remove('id')
+        coerce_fields(instance, field_names)
+
+    # 1) Farms
+    def sync_farms(self, rows):
+        results = [None] * len(rows)
+        pending = []
+        for index, row in enumerate(rows):
+            try:
+                farm = Farm(
+                    id=row['id'],
+                    name=row['name'],
+                    size=row['size'],
+                    plant_type=row['plant_type'],
+                    user=self.user,
+                )
+                self._coerce(farm, row, ['id', 'name', 'size', 'plant_type'])
+            except Exception as e:
+                results[index] = _failed(_row_id(row), str(e))
+                continue
+            pending.append((index, row['id'], farm))
+
+        owners, hashes = self._owners(Farm.objects.all(), 'user_id', pending)
+        pending = self._reject_foreign(pending, owners, results, 'Farm')
+
+        self._upsert(Farm, pending, ['name', 'size', 'plant_type'], hashes, results)
+        return results
+
+    # 2) Boundary Points
+    def sync_boundary_points(self, rows, farm_ids):
+        results = [None] * len(rows)
+        pending = []
+        for index, row in enumerate(rows):
+            try:
+                farm_id = as_mobile_id(row['farm_id'])
+                if farm_id not in farm_ids:
+                    results[index] = _failed(row.get('id'), f"Farm {row.get('farm_id')} not found")
+                    continue
+                point = BoundaryPoint(
+                    id=row['id'],
+                    farm_id=farm_id,
+                    latitude=row['latitude'],
+                    longitude=row['longitude'],
+                    description=row.get('description', ''),
+                )
+                self._coerce(point, row, ['id', 'latitude', 'longitude', 'description'])
+            except Exception as e:
+                results[index] = _failed(_row_id(row), str(e))
+                continue
+            pending.append((index, row['id'], point))
+
+        owners, hashes = self._owners(BoundaryPoint.objects.all(), 'farm__user_id', pending)
+        pending = self._reject_foreign(pending, owners, results, 'Boundary point')
+        self._upsert(BoundaryPoint, pending, ['farm', 'latitude', 'longitude', 'description'], hashes, results)
+        return results
+
+    # 3) Observation Points
+    def sync_observation_points(self, rows, farm_ids):
+        referenced = [_row_id(row, 'inspection_suggestion_id') for row in rows]
+        suggestion_ids = self._owned_ids(InspectionSuggestion.objects.filter(user=self.user), referenced)
+
+        results = [None] * len(rows)
+        pending = []
+        for index, row in enumerate(rows):
+            try:
+                farm_id = as_mobile_id(row['farm_id'])
+                if farm_id not in farm_ids:
+                    results[index] = _failed(row.get('id'), f"Farm {row.get('farm_id')} not found")
+                    continue
+                suggestion_id = as_mobile_id(row.get('inspection_suggestion_id'))
+                point = ObservationPoint(
+                    id=row['id'],
+                    farm_id=farm_id,
+                    latitude=row['latitude'],
+                    longitude=row['longitude'],
+                    observation_status=row.get('observation_status', 'Nil'),
+                    name=row.get('name', ''),
+                    segment=row.get('segment', 0),
+                    inspection_suggestion_id=suggestion_id if suggestion_id in suggestion_ids else None,
+                    confidence_level=row.get('confidence_level'),
+                    target_entity=row.get('target_entity'),
+                    mobile_id=as_mobile_id(row.get('mobile_id')),
+                    last_synced=timezone.now(),
+                    sync_status='synced',
+                )
+                self._coerce(point, row, [
+                    'id', 'latitude', 'longitude', 'observation_status', 'name', 'segment',
+                    'confidence_level', 'target_entity',
+                ])
+            except Exception as e:
+                results[index] = _failed(_row_id(row), str(e))
+                continue
+            pending.append((index, row['id'], point))
+
+        owners, hashes = self._owners(ObservationPoint.objects.all(), 'farm__user_id', pending)
+        pending = self._reject_foreign(pending, owners, results, 'Observation point')
+        self._upsert(ObservationPoint, pending, [
+            'farm', 'latitude', 'longitude', 'observation_status', 'name', 'segment',
+            'inspection_suggestion', 'confidence_level', 'target_entity', 'last_synced', 'sync_status',
+        ], hashes, results)
+        return results
+
+    # 4) Inspection Suggestions
+    def sync_inspection_suggestions(self, rows, farm_ids):
+        results = [None] * len(rows)
+        pending = []
+        for index, row in enumerate(rows):
+            try:
+                farm_id = as_mobile_id(row['property_location'])
+                if farm_id not in farm_ids:
+                    results[index] = _failed(row.get('id'), f"Farm {row.get('property_location')} not found")
+                    continue
+                suggestion = InspectionSuggestion(
+                    id=row['id'],
+                    property_location_id=farm_id,
+                    target_entity=row['target_entity'],
+                    confidence_level=row['confidence_level'],
+                    area_size=row.get('area_size', 0),
+                    density_of_plant=row.get('density_of_plant', 0),
+                    user=self.user,
+                    mobile_id=as_mobile_id(row.get('mobile_id')),
+                    last_synced=timezone.now(),
+                    sync_status='synced',
+                )
+                self._coerce(suggestion, row, [
+                    'id', 'target_entity', 'confidence_level', 'area_size', 'density_of_plant',
+                ])
+            except Exception as e:
+                results[index] = _failed(_row_id(row), str(e))
+                continue
+            pending.append((index, row['id'], suggestion))
+
+        # Suggestions are matched on (id, property_location): an id that already
+        # exists on another farm cannot be moved by a sync.
+        locations, hashes = self._owners(InspectionSuggestion.objects.all(), 'property_location_id', pending)
+        kept = []
+        for index, mobile_id, suggestion in pending:
+            location = locations.get(suggestion.id)
+            if location is not None and location != suggestion.property_location_id:
+                results[index] = _failed(
+                    mobile_id,
+                    f"Inspection suggestion {mobile_id} belongs to a different farm"
+                )
+            else:
+                kept.append((index, mobile_id, suggestion))
+        pending = kept
+
+        self._upsert(InspectionSuggestion, pending, [
+            'target_entity', 'confidence_level', 'area_size', 'density_of_plant', 'user', 'last_synced',
+            'sync_status',
+        ], hashes, results)
+        if self.fan_out:
+            fan_out_suggestions(self.user.id, [
+                suggestion for index, _, suggestion in pending
+                if results[index]['status'] in ('created', 'updated')
+            ])
+        return results
+
+    # 5) Inspection Observations
+    def sync_inspection_observations(self, rows, farm_ids):
+        referenced = [_row_id(row, 'inspection') for row in rows]
+        suggestion_ids = self._owned_ids(InspectionSuggestion.objects.filter(user=self.user), referenced)
+
+        results = [None] * len(rows)
+        pending = []
+        for index, row in enumerate(rows):
+            try:
+                farm_id = as_mobile_id(row['farm'])
+                if farm_id not in farm_ids:
+                    results[index] = _failed(row.get('id'), 'Farm matching query does not exist.')
+                    continue
+                suggestion_id = as_mobile_id(row['inspection'])
+                if suggestion_id not in suggestion_ids:
+                    results[index] = _failed(
+                        row.get('id'), 'InspectionSuggestion matching query does not exist.'
+                    )
+                    continue
+                observation = InspectionObservation(
+                    id=row['id'],
+                    date=row['date'],
+                    inspection_id=suggestion_id,
+                    farm_id=farm_id,
+                    confidence=row.get('confidence', ''),
+                    plant_per_section=row.get('plant_per_section', ''),
+                    status=row.get('status', ''),
+                    target_entity=row.get('target_entity'),
+                    severity=row.get('severity'),
+                    user=self.user,
+                )
+                self._coerce(observation, row, [
+                    'id', 'date', 'confidence', 'plant_per_section', 'status', 'target_entity', 'severity',
+                ])
+            except Exception as e:
+                results[index] = _failed(_row_id(row), str(e))
+                continue
+            pending.append((index, row['id'], observation))
+
+        owners, hashes = self._owners(InspectionObservation.objects.all(), 'user_id', pending)
+        pending = self._reject_foreign(pending, owners, results, 'Inspection observation')
+        self._upsert(InspectionObservation, pending, [
+            'date', 'inspection', 'farm', 'confidence', 'plant_per_section', 'status',
+            'target_entity', 'severity', 'updated_at',
+        ], hashes, results)
+        return results
+
+    def _owned_ids(self, queryset, referenced):
+        """
+        Return the subset of ``referenced`` primary keys present in ``queryset``.
+        """
+        ids = {pk for pk in map(as_mobile_id, referenced) if pk is not None}
+        if not ids:
+            return set()
+        return set(queryset.filter(id__in=ids).values_list('id', flat=True))
+
+    def _owners(self, queryset, owner_field, pending):
+        """
+        Look up the already-existing rows in ``pending``.
+
+        Returns ``(owners, hashes)``: their ids mapped to ``owner_field`` and to
+        their stored ``content_hash``.
+        """
+        ids = {obj.id for _, _, obj in pending if obj.id is not None}
+        owners, hashes = {}, {}
+        if not ids:
+            return owners, hashes
+        for pk, owner, digest in queryset.filter(id__in=ids).values_list('id', owner_field, 'content_hash'):
+            owners[pk] = owner
+            hashes[pk] = digest
+        return owners, hashes
+
+    def _reject_foreign(self, pending, owners, results, label):
+        """
+        Fail rows whose id already exists under another user.
+        """
+        kept = []
+        for index, mobile_id, obj in pending:
+            owner = owners.get(obj.id)
+            if owner is not None and owner != self.user.id:
+                results[index] = _failed(mobile_id, f"{label} {mobile_id} not found")
+            else:
+                kept.append((index, mobile_id, obj))
+        return kept
+
+    def _upsert(self, model, pending, update_fields, hashes, results):
+        """
+        Write ``pending`` rows with ``bulk_create(update_conflicts=True)``.
+
+        ``hashes`` maps the ids of existing rows to their stored content hash;
+        a row whose hash matches is reported as ``unchanged`` and not written.
+        Rows repeating an id already seen in the batch collapse into the last
+        one, matching what sequential ``update_or_create`` calls would leave
+        behind. A chunk that fails at the database is retried row by row inside
+        savepoints so one bad row only fails itself.
+
+        Rows without a server id yet (temporary ids, new uids) are inserted and
+        reported with the id they were given; created rows also report their uid.
+        """
+        latest = {}
+        current = dict(hashes)
+        for index, mobile_id, obj in pending:
+            key = obj.uid if obj.id is None else obj.id
+            obj.refresh_derived_fields()
+            digest = obj.content_hash
+            if current.get(key) == digest:
+                status = 'unchanged'
+            else:
+                status = 'updated' if key in current else 'created'
+            current[key] = digest
+            results[index] = {
+                'mobile_id': mobile_id,
+                'server_id': obj.id,
+                'status': status
+            }
+            if status == 'created':
+                results[index]['uid'] = str(obj.uid)
+            latest.setdefault(key, [None, []])
+            latest[key][0] = obj
+            latest[key][1].append((index, mobile_id))
+
+        entries = [
+            (key, obj, rows) for key, (obj, rows) in latest.items() if obj.content_hash != hashes.get(obj.id)
+        ]
+        tracked = model in digests.COLLECTIONS
+        before = digests.row_states(model, [obj.id for _, obj, _ in entries if obj.id in hashes]) if tracked else {}
+
+        # Rows with a temporary id or a new uid get their server id on insert
+        for _, obj, _ in entries:
+            if obj.id is not None and obj.id < 0:
+                obj.id = None
+
+        for chunk in _chunks(entries, self.batch_size):
+            # A chunk commits together with its change log, digest and id
+            # mapping entries, so a sync that stops halfway leaves them consistent
+            with transaction.atomic():
+                idempotency.hold_lease()
+                written = self._write_chunk(model, chunk, update_fields, results)
+                self._record_written(model, written, before, results)
+
+    def _write_chunk(self, model, chunk, update_fields, results):
+        """
+        Upsert one chunk of entries, falling back to one savepoint per row if it fails.
+        """
+        try:
+            with transaction.atomic():
+                self._bulk_upsert(model, [obj for _, obj, _ in chunk], update_fields)
+            return chunk
+        except DatabaseError:
+            pass
+
+        written = []
+        for key, obj, rows in chunk:
+            try:
+                with transaction.atomic():
+                    self._bulk_upsert(model, [obj], update_fields)
+                written.append((key, obj, rows))
+            except DatabaseError as e:
+                for index, mobile_id in rows:
+                    results[index] = _failed(mobile_id, str(e))
+        return written
+
+    def _record_written(self, model, written, before, results):
+        entity_type = ENTITY_TYPES[model]
+        mobile_keys = self.mobile_keys[entity_type]
+        assigned = {}
+        for key, obj, rows in written:
+            if key != obj.id:
+                # Inserted under a temporary id, a new uid or a run_mobile insert key
+                for index, _ in rows:
+                    results[index]['server_id'] = obj.id
+                self.uid_ids[entity_type][obj.uid] = obj.id
+                if key in mobile_keys:
+                    if mobile_keys[key] is not None:
+                        assigned[mobile_keys[key]] = obj.id
+                elif not isinstance(key, uuid.UUID):
+                    self.temp_ids[entity_type][key] = obj.id
+                    assigned[key] = obj.id
+        mobile_ids.remember(self.user, self.device, entity_type, assigned)
+
+        # bulk_create doesn't send post_save, so feed the change log and the
+        # farm digests here
+        record_changes(self.user.id, entity_type, [obj.id for _, obj, _ in written])
+        caching.invalidate(self.user.id, [entity_type])
+        if model in digests.COLLECTIONS:
+            digests.track(
+                model,
+                {obj.id: before[obj.id] for _, obj, _ in written if obj.id in before},
+                {obj.id: digests.row_state(obj) for _, obj, _ in written},
+            )
+        # Nor are the points classified against their farm's boundary ring, or
+        # the ring's geometry cached
+        if model is ObservationPoint:
+            containment.classify_points([obj for _, obj, _ in written])
+        elif model is BoundaryPoint:
+            farm_ids = {obj.farm_id for _, obj, _ in written}
+            boundaries.refresh_geometry(farm_ids)
+            containment.classify_farms(farm_ids)
+
+    def _bulk_upsert(self, model, objs, update_fields):
+        model.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=[*update_fields, *model.DERIVED_FIELDS],
+        )
+
+
+def fan_out_suggestions(user_id, suggestions):
+    """
+    Copy the last of ``suggestions`` written for each farm onto the farm's observation points.
+
+    ``suggestions`` are in write order. Earlier suggestions for the same farm
+    would be overwritten anyway, so each affected farm gets exactly one
+    ``UPDATE`` however many of its suggestions the batch wrote.
+    """
+    latest = {}
+    for suggestion in suggestions:
+        latest[suggestion.property_location_id] = suggestion
+    if not latest:
+        return
+
+    point_ids = list(ObservationPoint.objects.filter(farm_id__in=latest).values_list('id', flat=True))
+    if not point_ids:
+        return
+    before = digests.row_states(ObservationPoint, point_ids)
+    now = timezone.now()
+    for farm_id, suggestion in latest.items():
+        ObservationPoint.objects.filter(farm_id=farm_id).update(
+            inspection_suggestion=suggestion,
+            target_entity=suggestion.target_entity,
+            confidence_level=suggestion.confidence_level,
+            last_synced=now,
+            sync_status='synced'
+        )
+
+    ObservationPoint.refresh_content_hashes(ObservationPoint.objects.filter(id__in=point_ids))
+    digests.track(ObservationPoint, before, digests.row_states(ObservationPoint, point_ids))
+    record_changes(user_id, ENTITY_TYPES[ObservationPoint], point_ids)
+    caching.invalidate(user_id, [ENTITY_TYPES[ObservationPoint]])
+
+
+def _delete_sections(farm, points):
+    # The tombstones of the surplus ring points, and of the observations
+    # recorded against them as sections (which the foreign key cascades to),
+    # are logged in bulk rather than by the per-row delete signals. The caller
+    # folds the points out of the farm digest and refreshes the ring.
+    ids = [point.id for point in points]
+    record_changes(farm.user_id, ENTITY_TYPES[BoundaryPoint], ids, 'delete')
+
+    rows = list(
+        InspectionObservation.objects.filter(section_id__in=ids).values_list('id', 'user_id', 'farm_id', 'content_hash')
+    )
+    if rows:
+        by_user = {}
+        for pk, user_id, _, _ in rows:
+            by_user.setdefault(user_id, []).append(pk)
+        for user_id, observation_ids in by_user.items():
+            record_changes(user_id, ENTITY_TYPES[InspectionObservation], observation_ids, 'delete')
+            caching.invalidate(user_id, [ENTITY_TYPES[InspectionObservation]])
+        digests.track(
+            InspectionObservation, {pk: (farm_id, digest) for pk, _, farm_id, digest in rows}, {}
+        )
+
+    signals.tracked_in_bulk(BoundaryPoint.objects.filter(id__in=ids)).delete()
+
+
+def replace_boundary(farm, vertices):
+    """
+    Make ``vertices`` the boundary ring of ``farm`` in one diff pass.
+
+    Existing points are matched to the new ring by position (their id order).
+    The first ones are updated in place, keeping their ids and the inspection
+    observations recorded against them as sections; surplus ones are deleted
+    and the remaining vertices bulk inserted after them. Call it inside a
+    transaction holding a lock on the farm.
+
+    Returns the ring's points in order and the created/updated/unchanged/deleted counts.
+    """
+    existing = list(BoundaryPoint.objects.filter(farm=farm).order_by('id'))
+    kept, surplus = existing[:len(vertices)], existing[len(vertices):]
+    before = {point.id: digests.row_state(point) for point in kept}
+
+    updated = []
+    for point, vertex in zip(kept, vertices):
+        stored = point.content_hash
+        point.latitude = vertex['latitude']
+        point.longitude = vertex['longitude']
+        point.description = vertex.get('description', '')
+        if point.refresh_content_hash() != stored:
+            updated.append(point)
+    BoundaryPoint.objects.bulk_update(
+        updated, ['latitude', 'longitude', 'description', 'content_hash'], batch_size=settings.SYNC_BATCH_SIZE
+    )
+
+    created = [
+        BoundaryPoint(
+            farm=farm,
+            latitude=vertex['latitude'],
+            longitude=vertex['longitude'],
+            description=vertex.get('description', ''),
+        )
+        for vertex in vertices[len(kept):]
+    ]
+    for point in created:
+        point.refresh_content_hash()
+    BoundaryPoint.objects.bulk_create(created, batch_size=settings.SYNC_BATCH_SIZE)
+
+    written = updated + created
+    record_changes(farm.user_id, ENTITY_TYPES[BoundaryPoint], [point.id for point in written])
+    if surplus:
+        _delete_sections(farm, surplus)
+    caching.invalidate(farm.user_id, [ENTITY_TYPES[BoundaryPoint]])
+    digests.track(
+        BoundaryPoint,
+        {point.id: before[point.id] for point in updated} | {point.id: digests.row_state(point) for point in surplus},
+        {point.id: digests.row_state(point) for point in written},
+    )
+    boundaries.refresh_geometry([farm.id])
+    containment.classify_farms([farm.id])
+    counts = {
+        'created': len(created),
+        'updated': len(updated),
+        'unchanged': len(kept) - len(updated),
+        'deleted': len(surplus),
+    }
+    return kept + created, counts
+
+
+def stream_sync(user, records, batch_size=None, device=''):
+    """
+    Apply NDJSON sync records in bounded batches, yielding one result per record.
+
+    ``records`` is the ``(line_number, record, error)`` iterator produced by
+    ``NDJSONParser``. Each record is a row of one of the ``ENTITY_KEYS``
+    collections, named by its ``entity`` key. Every batch is written and
+    committed on its own, so memory and lock hold time are bounded by the batch
+    size rather than by the size of the upload. Parents must appear in an
+    earlier or the same batch as the children that reference them.
+    """
+    engine = BulkSyncEngine(user, batch_size, device=device)
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) >= engine.batch_size:
+            yield from _apply_stream_batch(engine, batch)
+            batch = []
+    if batch:
+        yield from _apply_stream_batch(engine, batch)
+
+
+def _apply_stream_batch(engine, batch):
+    results = [None] * len(batch)
+    payload = {key: [] for key in ENTITY_KEYS}
+    positions = {key: [] for key in ENTITY_KEYS}
+
+    for position, (number, record, error) in enumerate(batch):
+        entity = record.get('entity') if isinstance(record, dict) else None
+        if error is None and entity not in payload:
+            error = f"Unknown entity {entity!r}; expected one of {', '.join(ENTITY_KEYS)}"
+        if error is not None:
+            results[position] = dict(_failed(_row_id(record), error), entity=entity)
+            continue
+        payload[entity].append({k: v for k, v in record.items() if k != 'entity'})
+        positions[entity].append(position)
+
+    with transaction.atomic():
+        synced = engine.run(payload)
+
+    for entity, entity_positions in positions.items():
+        for position, result in zip(entity_positions, synced[entity]):
+            results[position] = dict(result, entity=entity)
+
+    for (number, _, _), result in zip(batch, results):
+        result['line'] = number
+        yield result
+
+
+def sync_in_batches(user, data, batch_size=None, on_progress=None, device=''):
+    """
+    Apply a full sync payload one batch at a time, each in its own transaction.
+
+    Returns the same ``results`` structure as ``BulkSyncEngine.run``.
+    ``on_progress(rows_done)`` is called after every committed batch.
+    """
+    engine = BulkSyncEngine(user, batch_size, device=device)
+    results = {key: [] for key in ENTITY_KEYS}
+    done = 0
+    for key in SYNC_ORDER:
+        for chunk in _chunks(list(data.get(key, [])), engine.batch_size):
+            with transaction.atomic():
+                results[key].extend(engine.run({key: chunk})[key])
+            done += len(chunk)
+            if on_progress is not None:
+                on_progress(done)
+    return results
@@ -1,4 +1,5 @@
 import pytest
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework.test import APIClient
 import factory
@@ -8,11 +9,25 @@ from django.utils import timezone
 from datetime import timedelta
 
 from accounts.models import User
+from farm import caching
 from farm.models import Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation
 
 fake = Faker()
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Reset the throttle counters and cached responses, which outlive the rolled-back test data."""
+    cache.clear()
+    caching.local_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(settings):
+    """The test run is a single process, so its local memory cache is shared by every writer."""
+    settings.RESPONSE_CACHE_SHARED = True
+
+
 @pytest.fixture
 def api_client():
     """Return an API client for testing."""
@@ -210,3 +225,13 @@ def inspection_observation_detail_url(inspection_observation):
 @pytest.fixture
 def sync_data_url():
     return reverse('sync-data')
+
+
+@pytest.fixture
+def changes_url():
+    return reverse('changes')
+
+
+@pytest.fixture
+def digest_url():
+    return reverse('digest')
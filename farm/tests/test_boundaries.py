@@ -0,0 +1,160 @@
+import json
+
+import pytest
+from django.urls import reverse
+from farm import boundaries
+from farm.geometry import ring_geometry
+from farm.models import BoundaryPoint, ChangeLogEntry, Farm
+from farm.tests.conftest import BoundaryPointFactory, FarmFactory, ObservationPointFactory
+
+pytestmark = [pytest.mark.django_db]
+
+# A 0.001 x 0.001 degree square at the equator, counter-clockwise; its sides are about 111.2 m
+SQUARE = [(0.0, 0.0), (0.0, 0.001), (0.001, 0.001), (0.001, 0.0)]
+
+
+def _ring(farm, ring=SQUARE):
+    return [BoundaryPointFactory(farm=farm, latitude=latitude, longitude=longitude) for latitude, longitude in ring]
+
+
+def _geometry(farm):
+    return Farm.objects.get(id=farm.id).geometry
+
+
+class TestRingGeometry:
+    """Test the geometry derived from a boundary ring."""
+
+    def test_square(self):
+        """Test the bbox, area, centroid and perimeter of a square."""
+        geometry = ring_geometry(SQUARE)
+
+        assert geometry['bbox'] == {
+            'min_latitude': 0, 'min_longitude': 0, 'max_latitude': 0.001, 'max_longitude': 0.001
+        }
+        assert geometry['area_m2'] == pytest.approx(111.2 ** 2, rel=1e-3)
+        assert geometry['perimeter_m'] == pytest.approx(4 * 111.2, rel=1e-3)
+        assert geometry['centroid'] == pytest.approx({'latitude': 0.0005, 'longitude': 0.0005})
+
+    def test_centroid_of_concave_ring(self):
+        """Test that the centroid is that of the enclosed area, not the mean of the vertices."""
+        # An L: the square without its top-right quarter, and an extra vertex on one side
+        ring = [(0.0, 0.0), (0.0, 0.001), (0.0005, 0.001), (0.0005, 0.0005), (0.001, 0.0005), (0.001, 0.0),
+                (0.0005, 0.0)]
+
+        centroid = ring_geometry(ring)['centroid']
+
+        # Three quarters: the centre of mass is 5/12 of the way along each axis
+        assert centroid == pytest.approx({'latitude': 0.001 * 5 / 12, 'longitude': 0.001 * 5 / 12}, rel=1e-3)
+
+    def test_degenerate_rings(self):
+        """Test that rings enclosing nothing have no area or perimeter, and their mean as centroid."""
+        assert ring_geometry([])['centroid'] is None
+        two = ring_geometry(SQUARE[:2])
+
+        assert (two['area_m2'], two['perimeter_m']) == (0.0, 0.0)
+        assert two['centroid'] == pytest.approx({'latitude': 0.0, 'longitude': 0.0005})
+
+
+class TestFarmGeometry:
+    """Test that Farm.geometry follows the farm's boundary points."""
+
+    def test_saved_points(self, farm, django_capture_on_commit_callbacks):
+        """Test that saving boundary points caches the farm's ring and its geometry on commit."""
+        assert _geometry(farm) is None
+
+        with django_capture_on_commit_callbacks(execute=True):
+            _ring(farm)
+            assert _geometry(farm) is None
+
+        geometry = _geometry(farm)
+        assert geometry['polygon'] == [list(point) for point in SQUARE]
+        assert geometry['area_m2'] == pytest.approx(111.2 ** 2, rel=1e-3)
+
+    def test_deleted_points(self, farm, django_capture_on_commit_callbacks):
+        """Test that deleting boundary points refreshes the cache, down to nothing."""
+        with django_capture_on_commit_callbacks(execute=True):
+            corners = _ring(farm)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            corners[3].delete()
+        assert _geometry(farm)['area_m2'] == pytest.approx(111.2 ** 2 / 2, rel=1e-3)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            for point in corners[:3]:
+                point.delete()
+        assert _geometry(farm) is None
+
+    def test_queryset_delete(self, farm, django_capture_on_commit_callbacks):
+        """Test that a bulk delete of a farm's boundary points clears its geometry and reclassifies its points."""
+        with django_capture_on_commit_callbacks(execute=True):
+            _ring(farm)
+            point = ObservationPointFactory(farm=farm, latitude=0.0005, longitude=0.0005)
+        point.refresh_from_db()
+        assert point.inside_boundary is True
+
+        with django_capture_on_commit_callbacks(execute=True):
+            BoundaryPoint.objects.filter(farm=farm).delete()
+
+        assert _geometry(farm) is None
+        point.refresh_from_db()
+        assert point.inside_boundary is None
+
+    def test_refreshed_once_per_transaction(self, farm, django_capture_on_commit_callbacks, monkeypatch):
+        """Test that a transaction saving a whole ring refreshes the farm once, not once per point."""
+        other = FarmFactory(user=farm.user)
+        refreshed = []
+        refresh_geometry = boundaries.refresh_geometry
+
+        def counting_refresh(farm_ids):
+            refreshed.append(set(farm_ids))
+            return refresh_geometry(farm_ids)
+
+        monkeypatch.setattr(boundaries, 'refresh_geometry', counting_refresh)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            _ring(farm)
+            _ring(other)
+
+        assert len(refreshed) == 1 and {farm.id, other.id} <= refreshed[0]
+        assert _geometry(other)['polygon'] == [list(point) for point in SQUARE]
+
+    def test_replace_boundary(self, authenticated_client, farm_detail_url, farm):
+        """Test that the boundary sync refreshes the geometry rendered with the farm."""
+        client, user = authenticated_client
+        assert client.get(farm_detail_url).data['geometry'] is None
+
+        client.post(
+            reverse('boundary-point-sync'),
+            data=json.dumps({'farm_id': farm.id, 'boundary_points': [
+                {'latitude': latitude, 'longitude': longitude} for latitude, longitude in SQUARE
+            ]}),
+            content_type='application/json',
+        )
+
+        geometry = client.get(farm_detail_url).data['geometry']
+        assert geometry['polygon'] == [list(point) for point in SQUARE]
+        assert geometry['perimeter_m'] == pytest.approx(4 * 111.2, rel=1e-3)
+
+    def test_bulk_sync(self, authenticated_client, sync_data_url, farms_url, farm):
+        """Test that boundary points written by the bulk sync refresh the geometry of the farm list."""
+        client, user = authenticated_client
+        client.get(farms_url)
+
+        client.post(sync_data_url, data=json.dumps({
+            'boundary_points': [
+                {'id': 1000 + index, 'farm_id': farm.id, 'latitude': latitude, 'longitude': longitude}
+                for index, (latitude, longitude) in enumerate(SQUARE)
+            ],
+        }), content_type='application/json')
+
+        [item] = client.get(farms_url).data['results']
+        assert item['geometry']['centroid'] == pytest.approx({'latitude': 0.0005, 'longitude': 0.0005})
+
+    def test_unchanged_ring(self, farm, django_capture_on_commit_callbacks):
+        """Test that a refresh leaving the geometry as it was writes and logs nothing."""
+        with django_capture_on_commit_callbacks(execute=True):
+            _ring(farm)
+        logged = ChangeLogEntry.objects.filter(entity_type='farms').count()
+
+        assert boundaries.refresh_geometry([farm.id]) == 0
+        assert ChangeLogEntry.objects.filter(entity_type='farms').count() == logged
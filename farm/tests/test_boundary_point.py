@@ -1,7 +1,12 @@
 import pytest
 import json
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from rest_framework import status
-from farm.models import BoundaryPoint
+from farm import digests
+from farm.models import BoundaryPoint, ChangeLogEntry, FarmDigest, InspectionObservation
+from farm.tests.conftest import FarmFactory, InspectionObservationFactory
 from accounts.tests.utils import phone_number_json_dumps
 
 pytestmark = [pytest.mark.django_db]
@@ -33,12 +38,12 @@ class TestBoundaryPointViewSet:
         response = client.get(boundary_points_url)
         
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]['id'] == boundary_point.id
-        assert response.data[0]['farm'] == boundary_point.farm.id
-        assert float(response.data[0]['latitude']) == float(boundary_point.latitude)
-        assert float(response.data[0]['longitude']) == float(boundary_point.longitude)
-        assert response.data[0]['description'] == boundary_point.description
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['id'] == boundary_point.id
+        assert response.data['results'][0]['farm'] == boundary_point.farm.id
+        assert float(response.data['results'][0]['latitude']) == float(boundary_point.latitude)
+        assert float(response.data['results'][0]['longitude']) == float(boundary_point.longitude)
+        assert response.data['results'][0]['description'] == boundary_point.description
     
     def test_list_boundary_points_unauthenticated(self, api_client, boundary_points_url):
         """Test listing boundary points when unauthenticated."""
@@ -180,3 +185,125 @@ class TestBoundaryPointViewSet:
         
         # Check that the boundary point was not deleted from the database
         assert BoundaryPoint.objects.filter(id=boundary_point.id).exists()
+
+
+class TestBoundaryPointSync:
+    """Test replacing a farm's boundary ring in one request."""
+
+    def sync(self, client, farm, vertices):
+        return client.post(
+            reverse('boundary-point-sync'),
+            data=json.dumps({'farm_id': farm.id, 'boundary_points': vertices}),
+            content_type='application/json'
+        )
+
+    def square(self, size=0.001, points_per_side=1):
+        """Vertices of a square of ``size`` degrees at the equator, counter-clockwise."""
+        corners = [(0, 0), (0, size), (size, size), (size, 0)]
+        vertices = []
+        for (lat1, lng1), (lat2, lng2) in zip(corners, corners[1:] + corners[:1]):
+            for step in range(points_per_side):
+                fraction = step / points_per_side
+                vertices.append({
+                    'latitude': lat1 + (lat2 - lat1) * fraction,
+                    'longitude': lng1 + (lng2 - lng1) * fraction,
+                })
+        return vertices
+
+    def test_replace_boundary(self, authenticated_client, farm):
+        """Test that a whole ring is stored in order and its geometry returned."""
+        client, user = authenticated_client
+
+        response = self.sync(client, farm, self.square())
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 4
+        ids = [point['id'] for point in response.data['boundary_points']]
+        assert ids == list(BoundaryPoint.objects.filter(farm=farm).order_by('id').values_list('id', flat=True))
+        assert response.data['bbox'] == {
+            'min_latitude': 0, 'min_longitude': 0, 'max_latitude': 0.001, 'max_longitude': 0.001
+        }
+        # 0.001 degrees is about 111.2 m at the equator
+        assert response.data['area_m2'] == pytest.approx(111.2 ** 2, rel=1e-3)
+
+    def test_replace_keeps_matching_points(self, authenticated_client, farm, inspection_observation):
+        """Test that a smaller ring updates points in place and drops the surplus."""
+        client, user = authenticated_client
+        section = inspection_observation.section
+        first = self.sync(client, farm, self.square(points_per_side=2))
+        ids = [point['id'] for point in first.data['boundary_points']]
+
+        response = self.sync(client, farm, self.square(size=0.002))
+
+        assert ids[0] == section.id
+        # The corner at the origin is the same in both squares
+        assert (response.data['updated'], response.data['unchanged'], response.data['deleted']) == (3, 1, 4)
+        assert [point['id'] for point in response.data['boundary_points']] == ids[:4]
+        assert InspectionObservation.objects.filter(id=inspection_observation.id).exists()
+
+    def test_replace_boundary_query_count(self, authenticated_client, farm):
+        """Test that the number of queries does not grow with the ring size."""
+        client, user = authenticated_client
+        other_farm = FarmFactory(user=user)
+
+        with CaptureQueriesContext(connection) as small:
+            self.sync(client, farm, self.square(points_per_side=2))
+        with CaptureQueriesContext(connection) as large:
+            self.sync(client, other_farm, self.square(points_per_side=25))
+
+        assert len(large) == len(small)
+
+    def test_shrinking_ring_query_count(self, authenticated_client, farm):
+        """Test that deleting the surplus of a shrinking ring takes as many queries for 4 points as for 40."""
+        client, user = authenticated_client
+        other_farm = FarmFactory(user=user)
+        self.sync(client, farm, self.square(points_per_side=2))
+        self.sync(client, other_farm, self.square(points_per_side=11))
+
+        with CaptureQueriesContext(connection) as small:
+            self.sync(client, farm, self.square())
+        with CaptureQueriesContext(connection) as large:
+            self.sync(client, other_farm, self.square())
+
+        assert len(large) == len(small)
+        assert BoundaryPoint.objects.filter(farm=other_farm).count() == 4
+
+    def test_surplus_deletes_are_logged(self, authenticated_client, farm):
+        """Test that surplus points and the observations on them leave tombstones and the digest in step."""
+        client, user = authenticated_client
+        ids = [point['id'] for point in self.sync(client, farm, self.square(points_per_side=2)).data['boundary_points']]
+        observation = InspectionObservationFactory(
+            farm=farm, user=user, inspection__property_location=farm, inspection__user=user,
+            section=BoundaryPoint.objects.get(id=ids[-1]),
+        )
+
+        self.sync(client, farm, self.square())
+
+        assert not InspectionObservation.objects.filter(id=observation.id).exists()
+        tombstones = ChangeLogEntry.objects.filter(operation='delete')
+        assert set(tombstones.filter(entity_type='boundary_points').values_list('object_id', flat=True)) == set(ids[4:])
+        assert list(tombstones.filter(entity_type='inspection_observations').values_list('object_id', flat=True)) == [
+            observation.id
+        ]
+        stored = FarmDigest.objects.get(farm=farm)
+        digests.rebuild([farm.id])
+        rebuilt = FarmDigest.objects.get(farm=farm)
+        assert [getattr(stored, name) for name in digests.COLLECTION_NAMES] == [
+            getattr(rebuilt, name) for name in digests.COLLECTION_NAMES
+        ]
+
+    def test_sections_are_the_only_dependent_rows(self):
+        """Test that only observations depend on boundary points, as the surplus delete logs no other rows."""
+        relations = [(rel.related_model, rel.field.name) for rel in BoundaryPoint._meta.related_objects]
+
+        assert relations == [(InspectionObservation, 'section')]
+
+    def test_replace_boundary_of_other_users_farm(self, authenticated_client):
+        """Test that another user's farm cannot be given a boundary."""
+        client, user = authenticated_client
+        farm = FarmFactory()
+
+        response = self.sync(client, farm, self.square())
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert not BoundaryPoint.objects.filter(farm=farm).exists()
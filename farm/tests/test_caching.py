@@ -0,0 +1,179 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from farm import caching
+from farm.models import Farm
+from farm.tests.conftest import UserFactory, FarmFactory
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _farm_queries(queries, table):
+    return [q for q in queries if f'"{table}"' in q['sql']]
+
+
+class TestResponseCache:
+    """Test the per-user cache of the list and retrieve responses."""
+
+    def test_repeated_list_is_cached(self, authenticated_client, farms_url, farm):
+        """Test that an unchanged list is served without reading the farms again."""
+        client, user = authenticated_client
+        first = client.get(farms_url)
+
+        with CaptureQueriesContext(connection) as queries:
+            second = client.get(farms_url)
+
+        assert second.status_code == 200
+        assert second.data == first.data
+        assert not _farm_queries(queries, 'farm_farm')
+
+    def test_shared_cache_tier(self, authenticated_client, farm_detail_url, farm):
+        """Test that a response missing from the process's LRU is read from the shared cache."""
+        client, user = authenticated_client
+        first = client.get(farm_detail_url)
+        caching.local_cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            second = client.get(farm_detail_url)
+
+        assert second.data == first.data
+        assert not _farm_queries(queries, 'farm_farm')
+
+    def test_save_invalidates(self, authenticated_client, farms_url, farm_detail_url, farm):
+        """Test that a write through the API is visible to the next read."""
+        client, user = authenticated_client
+        client.get(farms_url)
+        client.get(farm_detail_url)
+
+        client.patch(farm_detail_url, {'name': 'Renamed'}, format='json')
+
+        assert client.get(farms_url).data['results'][0]['name'] == 'Renamed'
+        assert client.get(farm_detail_url).data['name'] == 'Renamed'
+
+    def test_bulk_sync_invalidates(self, authenticated_client, observation_points_url, farm):
+        """Test that rows written by the bulk sync are visible to the next read."""
+        client, user = authenticated_client
+        assert client.get(observation_points_url).data['results'] == []
+
+        client.post(
+            reverse('observation-point-sync'),
+            data=json.dumps({'observation_points': [
+                {'id': 1, 'farm_id': farm.id, 'latitude': 1.5, 'longitude': 2.5, 'name': 'Gate', 'segment': 3},
+            ]}),
+            content_type='application/json',
+        )
+
+        assert [item['name'] for item in client.get(observation_points_url).data['results']] == ['Gate']
+
+    def test_expansion_invalidated_by_related_collection(self, authenticated_client, observation_points_url,
+                                                         observation_point, farm):
+        """Test that an expanded response is refreshed when the expanded collection changes."""
+        client, user = authenticated_client
+        client.get(observation_points_url, {'expand': 'farm'})
+
+        farm.name = 'Renamed'
+        farm.save()
+
+        response = client.get(observation_points_url, {'expand': 'farm'})
+        assert response.data['results'][0]['farm']['name'] == 'Renamed'
+
+    def test_delete_invalidates_other_collections(self, authenticated_client, observation_point_detail_url,
+                                                   observation_point, inspection_suggestion):
+        """Test that a delete clearing references in another collection refreshes it."""
+        client, user = authenticated_client
+        assert client.get(observation_point_detail_url).data['inspection_suggestion'] == inspection_suggestion.id
+
+        inspection_suggestion.delete()
+
+        assert client.get(observation_point_detail_url).data['inspection_suggestion'] is None
+
+    def test_per_user(self, authenticated_client, farms_url, farm):
+        """Test that users never get each other's cached responses."""
+        client, user = authenticated_client
+        client.get(farms_url)
+        other = UserFactory()
+        other_client = APIClient()
+        other_client.force_authenticate(user=other)
+
+        assert other_client.get(farms_url).data['results'] == []
+
+    def test_version_bumped_again_on_commit(self, user, django_capture_on_commit_callbacks):
+        """Test that a write bumps the version at once and again when it commits."""
+        key = caching._version_key(user.id, 'farms')
+        [before] = caching._versions([key])
+
+        with django_capture_on_commit_callbacks(execute=True):
+            FarmFactory(user=user)
+            [during] = caching._versions([key])
+        [after] = caching._versions([key])
+
+        assert before < during < after
+
+    def test_disabled(self, authenticated_client, farms_url, farm, settings):
+        """Test that a zero timeout turns the cache off."""
+        client, user = authenticated_client
+        settings.RESPONSE_CACHE_TIMEOUT = 0
+        client.get(farms_url)
+        Farm.objects.filter(id=farm.id).update(name='Changed behind the signals')
+
+        assert client.get(farms_url).data['results'][0]['name'] == 'Changed behind the signals'
+
+    def test_process_local_cache(self, authenticated_client, farms_url, farm, settings):
+        """Test that a cache not shared between processes turns off both the cache and the ETags."""
+        client, user = authenticated_client
+        settings.RESPONSE_CACHE_SHARED = False
+        first = client.get(farms_url)
+        Farm.objects.filter(id=farm.id).update(name='Changed by another process')
+
+        second = client.get(farms_url)
+
+        assert 'ETag' not in first and 'ETag' not in second
+        assert second.data['results'][0]['name'] == 'Changed by another process'
+
+
+class TestLRUCache:
+    """Test the in-process LRU tier."""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used entry is evicted first."""
+        lru = caching.LRUCache(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        assert (lru.get('a'), lru.get('b'), lru.get('c')) == (1, None, 3)
+
+
+class TestConditionalGet:
+    """Test the ETags of the list and retrieve responses."""
+
+    def test_not_modified(self, authenticated_client, farms_url, farm, settings):
+        """Test that a current ETag gets a 304 without reading the farms, even uncached."""
+        client, user = authenticated_client
+        settings.RESPONSE_CACHE_TIMEOUT = 0
+        tag = client.get(farms_url)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(farms_url, HTTP_IF_NONE_MATCH=tag)
+
+        assert response.status_code == 304
+        assert response['ETag'] == tag
+        assert not _farm_queries(queries, 'farm_farm')
+
+    def test_write_changes_etag(self, authenticated_client, farm_detail_url, farm):
+        """Test that a write makes the previous ETag stale."""
+        client, user = authenticated_client
+        tag = client.get(farm_detail_url)['ETag']
+
+        client.patch(farm_detail_url, {'name': 'Renamed'}, format='json')
+        response = client.get(farm_detail_url, HTTP_IF_NONE_MATCH=tag)
+
+        assert response.status_code == 200
+        assert response['ETag'] != tag
+        assert response.data['name'] == 'Renamed'
+
@@ -0,0 +1,177 @@
+import pytest
+import json
+from rest_framework import status
+from django.urls import reverse
+from farm import digests
+from farm.models import ChangeLogEntry, FarmDigest, ObservationPoint
+from farm.tests.conftest import FarmFactory, ObservationPointFactory
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestChangeLog:
+    """Test that writes to farm data feed the change log."""
+
+    def test_sequence_is_monotonic_per_user(self, farm, observation_point):
+        """Test that each user's changes get consecutive sequence numbers."""
+        other_farm = FarmFactory()
+
+        seqs = list(ChangeLogEntry.objects.filter(user=farm.user).order_by('seq').values_list('seq', flat=True))
+        assert seqs == list(range(1, len(seqs) + 1))
+        assert ChangeLogEntry.objects.get(user=other_farm.user).seq == 1
+
+    def test_delete_records_tombstone(self, observation_point):
+        """Test that deleting a record appends a delete entry."""
+        point_id = observation_point.id
+        user = observation_point.farm.user
+        observation_point.delete()
+
+        entry = ChangeLogEntry.objects.filter(user=user).order_by('-seq').first()
+        assert (entry.entity_type, entry.object_id, entry.operation) == ('observation_points', point_id, 'delete')
+
+    def test_farm_delete_does_not_tombstone_children(self, farm, observation_point):
+        """Test that a cascading farm delete only logs the farm tombstone."""
+        farm.delete()
+
+        deletes = ChangeLogEntry.objects.filter(user=farm.user, operation='delete')
+        assert list(deletes.values_list('entity_type', flat=True)) == ['farms']
+
+    def test_suggestion_delete_updates_points(self, farm, inspection_suggestion, observation_point):
+        """Test that deleting a suggestion logs, rehashes and re-digests the points it is cleared from."""
+        inspection_suggestion.delete()
+
+        entry = ChangeLogEntry.objects.filter(user=farm.user, entity_type='observation_points').order_by('-seq')[0]
+        assert (entry.object_id, entry.operation) == (observation_point.id, 'upsert')
+        observation_point.refresh_from_db()
+        assert observation_point.inspection_suggestion_id is None
+        assert observation_point.content_hash == observation_point.compute_content_hash(observation_point.__dict__)
+        incremental = FarmDigest.objects.filter(farm=farm).values(*digests.COLLECTION_NAMES).get()
+        digests.rebuild([farm.id])
+        assert FarmDigest.objects.filter(farm=farm).values(*digests.COLLECTION_NAMES).get() == incremental
+
+
+class TestChangeFeedAPIView:
+    """Test the change feed endpoint."""
+
+    def test_changes_since_cursor(self, authenticated_client, changes_url, farm, observation_point):
+        """Test pulling the full feed and then only what changed after the cursor."""
+        client, user = authenticated_client
+
+        response = client.get(changes_url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['has_more'] is False
+        entities = {(c['entity'], c['id']) for c in response.data['changes']}
+        assert ('farms', farm.id) in entities
+        assert ('observation_points', observation_point.id) in entities
+        cursor = response.data['cursor']
+
+        observation_point.name = 'Renamed'
+        observation_point.save()
+        observation_point.save()
+
+        response = client.get(changes_url, {'since': cursor})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['changes']) == 1
+        change = response.data['changes'][0]
+        assert change['op'] == 'upsert'
+        assert change['data']['name'] == 'Renamed'
+        assert response.data['cursor'] == cursor + 2
+
+    def test_changes_limit_and_tombstones(self, authenticated_client, changes_url, farm):
+        """Test paging through the feed with a limit and receiving tombstones."""
+        client, user = authenticated_client
+        points = ObservationPointFactory.create_batch(3, farm=farm, inspection_suggestion=None)
+        start = ChangeLogEntry.objects.filter(user=user).order_by('-seq').values_list('seq', flat=True)[3]
+        deleted_id = points[0].id
+        points[0].delete()
+
+        response = client.get(changes_url, {'since': start, 'limit': 2})
+
+        assert response.data['has_more'] is True
+        assert len(response.data['changes']) == 2
+
+        response = client.get(changes_url, {'since': response.data['cursor'], 'limit': 2})
+
+        assert response.data['has_more'] is False
+        assert response.data['changes'][-1] == {
+            'seq': response.data['cursor'],
+            'entity': 'observation_points',
+            'id': deleted_id,
+            'op': 'delete',
+        }
+
+    def test_changes_are_scoped_to_user(self, authenticated_client, changes_url):
+        """Test that another user's changes are not returned."""
+        client, user = authenticated_client
+        FarmFactory()
+
+        response = client.get(changes_url)
+
+        assert response.data['changes'] == []
+        assert response.data['cursor'] == 0
+
+    def test_changes_invalid_cursor(self, authenticated_client, changes_url):
+        """Test that a malformed cursor is rejected."""
+        client, user = authenticated_client
+
+        response = client.get(changes_url, {'since': 'yesterday'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_changes_include_bulk_sync(self, authenticated_client, changes_url, sync_data_url, farm):
+        """Test that rows written by the bulk sync engine show up in the feed."""
+        client, user = authenticated_client
+        cursor = client.get(changes_url).data['cursor']
+
+        client.post(
+            sync_data_url,
+            data=json.dumps({'boundary_points': [
+                {'id': 77, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0}
+            ]}),
+            content_type='application/json'
+        )
+
+        response = client.get(changes_url, {'since': cursor})
+
+        # The farm's cached boundary geometry changed with it
+        assert [(c['entity'], c['id']) for c in response.data['changes']] == [
+            ('boundary_points', 77), ('farms', farm.id)
+        ]
+
+    def test_changes_unauthenticated(self, api_client, changes_url):
+        """Test that the feed requires authentication."""
+        response = api_client.get(changes_url)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestPendingSync:
+    """Test the pending_sync actions driven by the change feed cursor."""
+
+    def test_observation_points_pending_sync(self, authenticated_client, observation_point):
+        """Test that only observation points changed after the cursor are returned."""
+        client, user = authenticated_client
+        url = reverse('observation-point-pending-sync')
+
+        response = client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [p['id'] for p in response.data] == [observation_point.id]
+        cursor = response['X-Change-Cursor']
+
+        response = client.get(url, {'since': cursor})
+        assert response.data == []
+
+        ObservationPoint.objects.get(id=observation_point.id).save()
+        response = client.get(url, {'since': cursor})
+        assert [p['id'] for p in response.data] == [observation_point.id]
+
+    def test_inspection_suggestions_pending_sync_invalid_cursor(self, authenticated_client, inspection_suggestion):
+        """Test that a malformed cursor is rejected."""
+        client, user = authenticated_client
+
+        response = client.get(reverse('inspection-suggestion-pending-sync'), {'since': '-1'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,194 @@
+import json
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from farm import containment
+from farm.geometry import points_in_ring
+from farm.models import BoundaryPoint, ChangeLogEntry, ObservationPoint
+from farm.tests.conftest import FarmFactory, BoundaryPointFactory, ObservationPointFactory
+
+pytestmark = [pytest.mark.django_db]
+
+# A 1 x 1 degree square, counter-clockwise
+SQUARE = [(0.0, 0.0), (0.0, 1.0), (1.0, 1.0), (1.0, 0.0)]
+
+
+def _ring(farm, ring=SQUARE):
+    return [BoundaryPointFactory(farm=farm, latitude=latitude, longitude=longitude) for latitude, longitude in ring]
+
+
+def _flags(points):
+    return list(
+        ObservationPoint.objects.filter(id__in=[point.id for point in points])
+        .order_by('id').values_list('inside_boundary', flat=True)
+    )
+
+
+class TestPointsInRing:
+    """Test the vectorized ray casting."""
+
+    def test_square(self):
+        """Test that points inside and outside a square are told apart."""
+        inside = points_in_ring(SQUARE, [0.5, 0.5, 1.5, -0.1], [0.5, 0.99, 0.5, 0.5])
+
+        assert inside.tolist() == [True, True, False, False]
+
+    def test_concave(self):
+        """Test that the notch of a concave ring is outside it."""
+        # An L: the unit square without its top-right quarter
+        ring = [(0.0, 0.0), (0.0, 1.0), (0.5, 1.0), (0.5, 0.5), (1.0, 0.5), (1.0, 0.0)]
+
+        inside = points_in_ring(ring, [0.25, 0.75, 0.75], [0.75, 0.25, 0.75])
+
+        assert inside.tolist() == [True, True, False]
+
+    def test_matches_point_by_point(self):
+        """Test that the vectorized pass agrees with classifying points one at a time."""
+        rng = np.random.default_rng(0)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 40))
+        radii = rng.uniform(0.5, 1.0, 40)
+        ring = list(zip(radii * np.sin(angles), radii * np.cos(angles)))
+        latitudes, longitudes = rng.uniform(-1, 1, (2, 500))
+
+        together = points_in_ring(ring, latitudes, longitudes)
+
+        one_by_one = [points_in_ring(ring, [lat], [lon])[0] for lat, lon in zip(latitudes, longitudes)]
+        assert together.tolist() == one_by_one
+        assert 0 < together.sum() < 500
+
+    def test_too_few_vertices(self):
+        """Test that fewer than three vertices enclose nothing."""
+        assert points_in_ring(SQUARE[:2], [0.0], [0.5]).tolist() == [False]
+
+
+class TestClassification:
+    """Test that ObservationPoint.inside_boundary follows the points and the rings."""
+
+    def test_saved_point(self, farm):
+        """Test that a saved point is classified."""
+        _ring(farm)
+
+        inside = ObservationPointFactory(farm=farm, latitude=0.5, longitude=0.5)
+        outside = ObservationPointFactory(farm=farm, latitude=2.0, longitude=0.5)
+
+        assert (inside.inside_boundary, outside.inside_boundary) == (True, False)
+        assert _flags([inside, outside]) == [True, False]
+
+    def test_without_ring(self, farm):
+        """Test that the points of a farm without a ring are unclassified."""
+        BoundaryPointFactory(farm=farm, latitude=0.0, longitude=0.0)
+
+        point = ObservationPointFactory(farm=farm, latitude=0.5, longitude=0.5)
+
+        assert _flags([point]) == [None]
+
+    def test_moved_point(self, farm):
+        """Test that a point moved out of the ring is reclassified."""
+        _ring(farm)
+        point = ObservationPointFactory(farm=farm, latitude=0.5, longitude=0.5)
+
+        point.longitude = 3.0
+        point.save()
+
+        assert _flags([point]) == [False]
+
+    def test_ring_edit(self, farm, django_capture_on_commit_callbacks):
+        """Test that editing or deleting a boundary point reclassifies the farm's points on commit."""
+        corners = _ring(farm)
+        point = ObservationPointFactory(farm=farm, latitude=0.9, longitude=0.9)
+
+        # Pull the far corner in, leaving the point outside
+        with django_capture_on_commit_callbacks(execute=True):
+            corners[2].latitude = corners[2].longitude = 0.5
+            corners[2].save()
+            assert _flags([point]) == [True]
+        assert _flags([point]) == [False]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            corners[2].delete()
+        assert _flags([point]) == [False]
+        with django_capture_on_commit_callbacks(execute=True):
+            corners[0].delete()
+        assert _flags([point]) == [None]
+
+    def test_replace_boundary(self, authenticated_client, observation_points_url, farm):
+        """Test that replacing a ring reclassifies, logs and refreshes the farm's points."""
+        client, user = authenticated_client
+        points = [
+            ObservationPointFactory(farm=farm, latitude=0.5, longitude=0.5),
+            ObservationPointFactory(farm=farm, latitude=1.5, longitude=1.5),
+        ]
+        assert [item['inside_boundary'] for item in client.get(observation_points_url).data['results']] == [None, None]
+        logged = ChangeLogEntry.objects.filter(entity_type='observation_points').count()
+
+        client.post(
+            reverse('boundary-point-sync'),
+            data=json.dumps({'farm_id': farm.id, 'boundary_points': [
+                {'latitude': latitude, 'longitude': longitude} for latitude, longitude in SQUARE
+            ]}),
+            content_type='application/json',
+        )
+
+        assert _flags(points) == [True, False]
+        assert ChangeLogEntry.objects.filter(entity_type='observation_points').count() == logged + 2
+        items = client.get(observation_points_url).data['results']
+        assert [item['inside_boundary'] for item in items] == [True, False]
+
+    def test_bulk_sync(self, authenticated_client, sync_data_url, farm):
+        """Test that rings and points written by the bulk sync are classified."""
+        client, user = authenticated_client
+        outside = ObservationPointFactory(farm=farm, latitude=2.0, longitude=2.0)
+
+        response = client.post(sync_data_url, data=json.dumps({
+            'boundary_points': [
+                {'id': 1000 + index, 'farm_id': farm.id, 'latitude': latitude, 'longitude': longitude}
+                for index, (latitude, longitude) in enumerate(SQUARE, start=1)
+            ],
+            'observation_points': [
+                {'id': 1000, 'farm_id': farm.id, 'latitude': 0.5, 'longitude': 0.5, 'segment': 1},
+            ],
+        }), content_type='application/json')
+
+        assert response.status_code == 200
+        [synced] = ObservationPoint.objects.exclude(id=outside.id)
+        assert (synced.inside_boundary, _flags([outside])) == (True, [False])
+
+
+class TestClassifyCommand:
+    """Test the classify_observation_points management command."""
+
+    def test_reclassifies(self, farm):
+        """Test that stale flags are fixed, farm by farm or all at once."""
+        _ring(farm)
+        other = FarmFactory(user=farm.user)
+        _ring(other)
+        points = [
+            ObservationPointFactory(farm=farm, latitude=0.5, longitude=0.5),
+            ObservationPointFactory(farm=other, latitude=0.5, longitude=0.5),
+        ]
+        ObservationPoint.objects.update(inside_boundary=None)
+
+        call_command('classify_observation_points', farm=[farm.id])
+        assert _flags(points) == [True, None]
+
+        call_command('classify_observation_points')
+        assert _flags(points) == [True, True]
+
+    def test_batches_writes(self, farm, settings):
+        """Test that flipped flags are written in batches of SYNC_BATCH_SIZE ids."""
+        settings.SYNC_BATCH_SIZE = 2
+        _ring(farm)
+        points = ObservationPointFactory.create_batch(5, farm=farm, latitude=0.5, longitude=0.5)
+        BoundaryPoint.objects.filter(farm=farm).update(latitude=F('latitude') + 5)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert containment.classify_farms([farm.id]) == 5
+
+        updates = [q for q in queries if q['sql'].startswith('UPDATE "farm_observationpoint"')]
+        assert len(updates) == 3
+        assert _flags(points) == [False] * 5
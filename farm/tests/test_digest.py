@@ -0,0 +1,151 @@
+import pytest
+import json
+from rest_framework import status
+from django.urls import reverse
+from farm import digests
+from farm.models import FarmDigest, ObservationPoint
+from farm.tests.conftest import BoundaryPointFactory, ObservationPointFactory
+
+pytestmark = [pytest.mark.django_db]
+
+
+def stored(farm):
+    return FarmDigest.objects.filter(farm=farm).values(*digests.COLLECTION_NAMES).get()
+
+
+def rebuilt(farm):
+    FarmDigest.objects.filter(farm=farm).delete()
+    digests.rebuild([farm.id])
+    return stored(farm)
+
+
+class TestFarmDigest:
+    """Test that the stored farm digests follow every kind of write."""
+
+    def test_incremental_digest_matches_rebuild(self, farm, boundary_point, observation_point,
+                                                inspection_observation):
+        """Test that digests maintained on save and delete equal a full recompute."""
+        observation_point.name = 'Renamed'
+        observation_point.save()
+        BoundaryPointFactory(farm=farm).delete()
+        ObservationPointFactory(farm=farm)
+
+        incremental = stored(farm)
+        assert incremental['observation_points'] != FarmDigest.EMPTY
+        assert incremental == rebuilt(farm)
+
+    def test_rebuild_repairs_existing_row(self, farm, boundary_point, observation_point):
+        """Test that a rebuild overwrites a stale stored digest in place."""
+        expected = stored(farm)
+        FarmDigest.objects.filter(farm=farm).update(boundary_points=FarmDigest.EMPTY)
+        digest_id = FarmDigest.objects.get(farm=farm).id
+
+        digests.rebuild([farm.id])
+
+        assert stored(farm) == expected
+        assert FarmDigest.objects.get(farm=farm).id == digest_id
+
+    def test_bulk_sync_updates_digest(self, authenticated_client, sync_data_url, farm, boundary_point):
+        """Test that rows written by the bulk sync engine are folded into the digest."""
+        client, user = authenticated_client
+        before = stored(farm)
+
+        data = {
+            'boundary_points': [
+                {'id': boundary_point.id, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0},
+                {'id': 777, 'farm_id': farm.id, 'latitude': 3.0, 'longitude': 4.0},
+            ]
+        }
+        client.post(sync_data_url, data=json.dumps(data), content_type='application/json')
+
+        after = stored(farm)
+        assert after['boundary_points'] != before['boundary_points']
+        assert after == rebuilt(farm)
+
+    def test_unchanged_sync_keeps_digest(self, authenticated_client, sync_data_url, farm, boundary_point):
+        """Test that re-sending an identical row leaves the digest as it was."""
+        client, user = authenticated_client
+        boundary_point.refresh_from_db()
+        before = stored(farm)
+
+        data = {
+            'boundary_points': [{
+                'id': boundary_point.id,
+                'farm_id': farm.id,
+                'latitude': boundary_point.latitude,
+                'longitude': boundary_point.longitude,
+                'description': boundary_point.description,
+            }]
+        }
+        client.post(sync_data_url, data=json.dumps(data), content_type='application/json')
+
+        assert stored(farm) == before
+
+    def test_suggestion_fan_out_updates_digest(self, authenticated_client, farm, inspection_suggestion,
+                                              observation_point):
+        """Test that observation points rewritten by a suggestion sync are folded into the digest."""
+        client, user = authenticated_client
+        data = {
+            'inspection_suggestions': [{
+                'id': 9001,
+                'target_entity': 'Aphids',
+                'confidence_level': 'Low',
+                'property_location': farm.id,
+                'area_size': 1.5,
+                'density_of_plant': 3,
+            }]
+        }
+        client.post(
+            reverse('inspection-suggestion-sync'), data=json.dumps(data), content_type='application/json'
+        )
+
+        assert ObservationPoint.objects.get(id=observation_point.id).target_entity == 'Aphids'
+        assert stored(farm) == rebuilt(farm)
+
+
+class TestDigestAPIView:
+    """Test the digest endpoints."""
+
+    def test_digest_tree(self, authenticated_client, digest_url, farm, boundary_point):
+        """Test that the user digest changes when a farm subtree changes and only that farm differs."""
+        client, user = authenticated_client
+
+        response = client.get(digest_url)
+
+        assert response.status_code == status.HTTP_200_OK
+        [node] = response.data['farms']
+        assert node['id'] == farm.id
+        assert set(node['collections']) == set(digests.COLLECTION_NAMES)
+
+        boundary_point.latitude += 1
+        boundary_point.save()
+        changed = client.get(digest_url).data
+
+        assert changed['digest'] != response.data['digest']
+        [changed_node] = changed['farms']
+        assert changed_node['digest'] != node['digest']
+        differing = {
+            name for name in digests.COLLECTION_NAMES
+            if changed_node['collections'][name] != node['collections'][name]
+        }
+        assert differing == {'boundary_points'}
+
+    def test_farm_digest_with_leaves(self, authenticated_client, farm, boundary_point):
+        """Test that a farm's digest can be expanded down to its row hashes."""
+        client, user = authenticated_client
+        url = reverse('farm-digest', kwargs={'pk': farm.id})
+
+        response = client.get(url, {'collection': 'boundary_points'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['rows'] == [[boundary_point.id, boundary_point.content_hash]]
+        assert response.data['digest'] == client.get(reverse('digest')).data['farms'][0]['digest']
+
+        response = client.get(url, {'collection': 'nope'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_digest_unauthenticated(self, api_client, digest_url):
+        """Test that the digest requires authentication."""
+        response = api_client.get(digest_url)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -1,7 +1,12 @@
 import pytest
 import json
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from rest_framework import status
+from farm import caching
 from farm.models import Farm
+from farm.tests.conftest import BoundaryPointFactory, FarmFactory, ObservationPointFactory
 from accounts.tests.utils import phone_number_json_dumps
 
 pytestmark = [pytest.mark.django_db]
@@ -34,12 +39,12 @@ class TestFarmViewSet:
         response = client.get(farms_url)
         
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]['id'] == farm.id
-        assert response.data[0]['name'] == farm.name
-        assert response.data[0]['size'] == farm.size
-        assert response.data[0]['plant_type'] == farm.plant_type
-        assert response.data[0]['user'] == user.id
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['id'] == farm.id
+        assert response.data['results'][0]['name'] == farm.name
+        assert response.data['results'][0]['size'] == farm.size
+        assert response.data['results'][0]['plant_type'] == farm.plant_type
+        assert response.data['results'][0]['user'] == user.id
     
     def test_list_farms_unauthenticated(self, api_client, farms_url):
         """Test listing farms when unauthenticated."""
@@ -140,6 +145,24 @@ class TestFarmViewSet:
         assert farm.size == data['size']
         assert farm.plant_type == data['plant_type']
     
+    def test_internal_fields_are_read_only(self, authenticated_client, farm_detail_url, farm):
+        """Test that the content hash, uid and geometry cannot be written by a client."""
+        client, user = authenticated_client
+        before = Farm.objects.values('content_hash', 'uid', 'geometry').get(id=farm.id)
+
+        response = client.patch(
+            farm_detail_url,
+            data=json.dumps({
+                'content_hash': '0' * 64,
+                'uid': '00000000-0000-7000-8000-000000000000',
+                'geometry': {'polygon': []},
+            }),
+            content_type='application/json'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Farm.objects.values('content_hash', 'uid', 'geometry').get(id=farm.id) == before
+
     def test_update_farm_unauthenticated(self, api_client, farm_detail_url, farm):
         """Test updating a farm when unauthenticated."""
         data = {
@@ -179,3 +202,157 @@ class TestFarmViewSet:
         
         # Check that the farm was not deleted from the database
         assert Farm.objects.filter(id=farm.id).exists()
+
+    def test_sync_farms(self, authenticated_client):
+        """Test the farm bulk sync reports created, updated and unchanged farms."""
+        client, user = authenticated_client
+        url = reverse('farm-sync')
+
+        data = {
+            'farms': [
+                {'id': 1, 'name': 'South Field', 'size': 8, 'plant_type': 'Beans'},
+                {'id': 2, 'name': 'North Field', 'size': 12, 'plant_type': 'Maize'},
+            ]
+        }
+        response = client.post(url, data=json.dumps(data), content_type='application/json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [r['status'] for r in response.data['results']] == ['created', 'created']
+        assert [r['mobile_id'] for r in response.data['results']] == [1, 2]
+        server_id = response.data['results'][0]['server_id']
+
+        data['farms'][0]['name'] = 'Renamed Farm'
+        response = client.post(url, data=json.dumps(data), content_type='application/json')
+
+        assert [r['status'] for r in response.data['results']] == ['updated', 'unchanged']
+        assert response.data['results'][0]['server_id'] == server_id
+        assert Farm.objects.get(id=server_id).name == 'Renamed Farm'
+        assert Farm.objects.filter(user=user).count() == 2
+
+    def test_sync_farms_ids_are_mobile_ids(self, authenticated_client):
+        """Test that farm sync ids are never taken as server ids, neither new nor another user's."""
+        client, user = authenticated_client
+        other_farm = FarmFactory()
+        data = {
+            'farms': [
+                {'id': 987654, 'name': 'North Field', 'size': 12, 'plant_type': 'Maize'},
+                {'id': other_farm.id, 'name': 'South Field', 'size': 8, 'plant_type': 'Beans'},
+            ]
+        }
+
+        response = client.post(reverse('farm-sync'), data=json.dumps(data), content_type='application/json')
+
+        assert [r['status'] for r in response.data['results']] == ['created', 'created']
+        server_ids = [r['server_id'] for r in response.data['results']]
+        assert 987654 not in server_ids and other_farm.id not in server_ids
+        assert not Farm.objects.filter(id=987654).exists()
+        other_farm.refresh_from_db()
+        assert other_farm.name != 'South Field'
+
+
+class TestFarmSnapshot:
+    """Test the farm snapshot endpoints."""
+
+    def test_snapshot(self, authenticated_client, farm, inspection_observation, observation_point):
+        """Test that a snapshot contains the farm's whole hierarchy."""
+        client, user = authenticated_client
+
+        response = client.get(reverse('farm-snapshot', kwargs={'pk': farm.pk}))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['id'] == farm.id
+        assert [p['id'] for p in response.data['boundary_points']] == [inspection_observation.section_id]
+        assert [p['id'] for p in response.data['observation_points']] == [observation_point.id]
+        assert [s['id'] for s in response.data['inspection_suggestions']] == [inspection_observation.inspection_id]
+        assert [o['id'] for o in response.data['observations']] == [inspection_observation.id]
+
+    def test_snapshot_not_modified(self, authenticated_client, farm, boundary_point):
+        """Test that a current ETag gets a 304 and a change gets a new snapshot."""
+        client, user = authenticated_client
+        url = reverse('farm-snapshot', kwargs={'pk': farm.pk})
+        etag = client.get(url)['ETag']
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+
+        boundary_point.latitude = 1.25
+        boundary_point.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    @pytest.mark.parametrize('shared', [True, False])
+    def test_snapshot_strong_etag(self, authenticated_client, farm, boundary_point, settings, shared):
+        """Test that snapshots carry a strong ETag, from versions or, without a shared cache, from the body."""
+        client, user = authenticated_client
+        settings.RESPONSE_CACHE_SHARED = shared
+        url = reverse('farm-snapshot', kwargs={'pk': farm.pk})
+        etag = client.get(url)['ETag']
+
+        assert not etag.startswith('W/')
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+        Farm.objects.filter(id=farm.id).update(name='Changed')
+        if shared:
+            caching.invalidate(user.id, ['farms'])
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_snapshot_query_count(self, authenticated_client, user):
+        """Test that the user snapshot uses a fixed number of queries."""
+        client, _ = authenticated_client
+        url = reverse('farm-snapshots')
+        farm = FarmFactory(user=user)
+        BoundaryPointFactory(farm=farm)
+        ObservationPointFactory(farm=farm)
+
+        with CaptureQueriesContext(connection) as one:
+            client.get(url)
+        for _ in range(3):
+            farm = FarmFactory(user=user)
+            BoundaryPointFactory.create_batch(5, farm=farm)
+            ObservationPointFactory.create_batch(5, farm=farm)
+        with CaptureQueriesContext(connection) as many:
+            response = client.get(url)
+
+        assert len(response.data) == 4
+        assert len(many) == len(one)
+
+    def test_snapshot_other_users_farm(self, authenticated_client):
+        """Test that another user's farm has no snapshot."""
+        client, user = authenticated_client
+
+        response = client.get(reverse('farm-snapshot', kwargs={'pk': FarmFactory().pk}))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestFarmPagination:
+    """Test keyset pagination of the farm list."""
+
+    def test_pages_follow_created_at_and_id(self, authenticated_client, user, farms_url):
+        """Test that following next links returns every farm once, ties on created_at included."""
+        client, _ = authenticated_client
+        farms = FarmFactory.create_batch(5, user=user)
+        # Same creation time for all but the first, so the id breaks the tie
+        Farm.objects.filter(id__in=[farm.id for farm in farms[1:]]).update(created_at=farms[1].created_at)
+
+        seen = []
+        url = f'{farms_url}?page_size=2'
+        while url:
+            response = client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data['results']) <= 2
+            seen.extend(farm['id'] for farm in response.data['results'])
+            url = response.data['next']
+
+        assert seen == [farm.id for farm in farms]
+
+    def test_invalid_cursor(self, authenticated_client, farms_url):
+        """Test that a cursor that does not decode is rejected."""
+        client, user = authenticated_client
+
+        response = client.get(f'{farms_url}?cursor=not-a-cursor')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
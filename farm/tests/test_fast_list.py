@@ -0,0 +1,95 @@
+import json
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+from backend.pagination import KeysetPagination
+from farm.listing import field_plan
+from farm.models import BoundaryPoint, ObservationPoint
+from farm.serializers import (
+    FarmSerializer, BoundaryPointSerializer, ObservationPointSerializer,
+    InspectionSuggestionSerializer, InspectionObservationSerializer
+)
+from farm.tests.conftest import ObservationPointFactory
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestFastList:
+    """Test that the list fast path renders exactly what the serializers render."""
+
+    @pytest.mark.parametrize('url_fixture, serializer_class', [
+        ('farms_url', FarmSerializer),
+        ('boundary_points_url', BoundaryPointSerializer),
+        ('observation_points_url', ObservationPointSerializer),
+        ('inspection_suggestions_url', InspectionSuggestionSerializer),
+        ('inspection_observations_url', InspectionObservationSerializer),
+    ])
+    def test_same_output_as_serializer(self, request, authenticated_client, inspection_observation,
+                                       observation_point, url_fixture, serializer_class):
+        """Test every list endpoint against its serializer."""
+        client, user = authenticated_client
+        url = request.getfixturevalue(url_fixture)
+        model = serializer_class.Meta.model
+
+        response = client.get(url)
+
+        instances = model.objects.order_by('timestamp' if model is BoundaryPoint else 'created_at', 'id')
+        expected = serializer_class(instances, many=True, context={'request': response.wsgi_request}).data
+        assert response.data['results'] == expected
+
+    def test_file_urls(self, authenticated_client, observation_points_url, farm):
+        """Test that image fields render as absolute URLs, as the serializer does."""
+        client, user = authenticated_client
+        point = ObservationPointFactory(farm=farm, image='observation_images/leaf.jpg')
+
+        response = client.get(observation_points_url)
+
+        [item] = response.data['results']
+        assert item['image'] == response.wsgi_request.build_absolute_uri(point.image.url)
+
+    def test_query_count(self, authenticated_client, observation_points_url, farm):
+        """Test that a page is read with a single query whatever its size."""
+        client, user = authenticated_client
+        ObservationPointFactory.create_batch(20, farm=farm)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(observation_points_url)
+
+        assert len(response.data['results']) == 20
+        assert len([q for q in queries if 'farm_observationpoint' in q['sql']]) == 1
+
+    def test_unsupported_serializer_has_no_plan(self):
+        """Test that serializers with computed fields fall back to the regular path."""
+        class WithMethodField(serializers.ModelSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta:
+                model = ObservationPoint
+                fields = ['id', 'label']
+
+            def get_label(self, obj):
+                return str(obj)
+
+        request = APIRequestFactory().get('/')
+        assert field_plan(WithMethodField(context={'request': request})) is None
+        assert field_plan(ObservationPointSerializer(context={'request': request})) is not None
+
+    def test_stream(self, authenticated_client, observation_points_url, farm, monkeypatch):
+        """Test that ?stream=true returns the whole list as one streamed JSON array."""
+        client, user = authenticated_client
+        monkeypatch.setattr(KeysetPagination, 'page_size', 2)
+        points = ObservationPointFactory.create_batch(5, farm=farm)
+
+        response = client.get(observation_points_url, {'stream': 'true'})
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'] == 'application/json'
+        data = json.loads(b''.join(response.streaming_content))
+        expected = ObservationPointSerializer(
+            sorted(points, key=lambda point: (point.created_at, point.id)), many=True,
+            context={'request': response.wsgi_request}
+        ).data
+        assert data == json.loads(json.dumps(expected))
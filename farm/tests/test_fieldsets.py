@@ -0,0 +1,111 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from farm.tests.conftest import FarmFactory, BoundaryPointFactory, ObservationPointFactory
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _selects(queries, table):
+    return [q['sql'] for q in queries if q['sql'].startswith('SELECT') and f'FROM "{table}"' in q['sql']]
+
+
+class TestSparseFields:
+    """Test the ?fields= query parameter."""
+
+    def test_list(self, authenticated_client, observation_points_url, observation_point):
+        """Test that a list renders and reads only the requested fields."""
+        client, user = authenticated_client
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(observation_points_url, {'fields': 'id,latitude,longitude,observation_status'})
+
+        assert response.status_code == 200
+        [item] = response.data['results']
+        assert item == {
+            'id': observation_point.id,
+            'latitude': float(observation_point.latitude),
+            'longitude': float(observation_point.longitude),
+            'observation_status': observation_point.observation_status,
+        }
+        [sql] = _selects(queries, 'farm_observationpoint')
+        assert '"image"' not in sql
+
+    def test_retrieve(self, authenticated_client, observation_point_detail_url, observation_point):
+        """Test that a retrieve defers the columns it does not render."""
+        client, user = authenticated_client
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(observation_point_detail_url, {'fields': 'id,name'})
+
+        assert response.data == {'id': observation_point.id, 'name': observation_point.name}
+        [sql] = _selects(queries, 'farm_observationpoint')
+        assert '"image"' not in sql and '"latitude"' not in sql
+
+    def test_unknown_fields_ignored(self, authenticated_client, farms_url, farm):
+        """Test that unknown names are ignored."""
+        client, user = authenticated_client
+
+        response = client.get(farms_url, {'fields': 'id,bogus'})
+
+        assert response.data['results'] == [{'id': farm.id}]
+
+    def test_writes_render_all_fields(self, authenticated_client, farm_detail_url, farm):
+        """Test that the parameters only apply to reads."""
+        client, user = authenticated_client
+
+        response = client.patch(f'{farm_detail_url}?fields=id', {'name': 'Renamed'}, format='json')
+
+        assert response.status_code == 200
+        assert response.data['name'] == 'Renamed'
+        assert 'size' in response.data
+
+
+class TestExpand:
+    """Test the ?expand= query parameter."""
+
+    def test_expand_foreign_key(self, authenticated_client, observation_points_url, observation_point, farm):
+        """Test that an expanded relation is rendered as the related row, with a join."""
+        client, user = authenticated_client
+        ObservationPointFactory.create_batch(3, farm=FarmFactory(user=user))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(observation_points_url, {'expand': 'farm', 'fields': 'id,farm'})
+
+        items = response.data['results']
+        assert len(items) == 4
+        assert items[0] == {'id': observation_point.id, 'farm': {**items[0]['farm'], 'id': farm.id, 'name': farm.name}}
+        assert len(_selects(queries, 'farm_observationpoint')) == 1
+        assert not _selects(queries, 'farm_farm')
+
+    def test_expand_collection(self, authenticated_client, farms_url):
+        """Test that expanded collections are prefetched whatever the number of rows."""
+        client, user = authenticated_client
+        farms = FarmFactory.create_batch(3, user=user)
+        for farm in farms:
+            BoundaryPointFactory.create_batch(2, farm=farm)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(farms_url, {'expand': 'boundary_points', 'fields': 'id,name'})
+
+        items = response.data['results']
+        assert [set(item) for item in items] == [{'id', 'name', 'boundary_points'}] * 3
+        assert [len(item['boundary_points']) for item in items] == [2, 2, 2]
+        assert len(_selects(queries, 'farm_boundarypoint')) == 1
+
+    def test_without_expand(self, authenticated_client, boundary_points_url, boundary_point, farm):
+        """Test that relations are rendered as ids unless expanded."""
+        client, user = authenticated_client
+
+        response = client.get(boundary_points_url)
+
+        assert response.data['results'][0]['farm'] == farm.id
+
+    def test_expand_after_plain_list(self, authenticated_client, observation_points_url, observation_point, farm):
+        """Test that a list without expansions does not leave its plan to an expanded one."""
+        client, user = authenticated_client
+        client.get(observation_points_url)
+
+        response = client.get(observation_points_url, {'expand': 'farm'})
+
+        assert response.data['results'][0]['farm']['id'] == farm.id
@@ -0,0 +1,126 @@
+import json
+import random
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from farm import geohash
+from farm.models import ObservationPoint
+from farm.tests.conftest import ObservationPointFactory
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestGeohash:
+    """Test the geohash encoding and bounding-box covers."""
+
+    def test_encode(self):
+        """Test a known geohash."""
+        assert geohash.encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+
+    def test_ranges_merge_adjacent_cells(self):
+        """Test that adjacent cells become one range and the last cell is open-ended."""
+        assert geohash.ranges(['u4pb', 'u4pc', 'u4pf', 'zzzz']) == [('u4pb', 'u4pd'), ('u4pf', 'u4pg'), ('zzzz', None)]
+
+    @pytest.mark.parametrize('bbox', [
+        (151.1, -33.9, 151.3, -33.8),
+        (-0.5, 51.2, 0.3, 51.7),
+        (-180, -90, 180, 90),
+        (179.0, -17.0, -179.0, -16.0),
+    ])
+    def test_cover_contains_the_box(self, bbox):
+        """Test that every point of the box falls in one of the covering cells."""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        boxes = [bbox] if min_lon <= max_lon else [(min_lon, min_lat, 180, max_lat), (-180, min_lat, max_lon, max_lat)]
+        rng = random.Random(7)
+        for low_lon, low_lat, high_lon, high_lat in boxes:
+            cells = geohash.cover(low_lat, low_lon, high_lat, high_lon)
+            assert len(cells) <= geohash.MAX_CELLS or len(cells[0]) == 1
+            corners = [(low_lat, low_lon), (low_lat, high_lon), (high_lat, low_lon), (high_lat, high_lon)]
+            samples = [(rng.uniform(low_lat, high_lat), rng.uniform(low_lon, high_lon)) for _ in range(200)]
+            for latitude, longitude in corners + samples:
+                point = geohash.encode(latitude, longitude)
+                assert any(point.startswith(cell) for cell in cells)
+
+
+class TestObservationPointGeohash:
+    """Test that the geohash column follows the point's position."""
+
+    def test_save(self, farm):
+        """Test that saving a point, with or without update_fields, refreshes its geohash."""
+        point = ObservationPointFactory(farm=farm, latitude=-33.86, longitude=151.21)
+        assert point.geohash == geohash.encode(-33.86, 151.21)
+
+        point.latitude, point.longitude = 51.5, -0.12
+        point.save(update_fields=['latitude', 'longitude'])
+
+        point.refresh_from_db()
+        assert point.geohash == geohash.encode(51.5, -0.12)
+
+    def test_sync(self, authenticated_client, farm):
+        """Test that points written by the bulk sync get their geohash."""
+        client, user = authenticated_client
+
+        client.post(
+            reverse('observation-point-sync'),
+            data=json.dumps({'observation_points': [
+                {'id': 1, 'farm_id': farm.id, 'latitude': 1.5, 'longitude': 2.5, 'name': 'Gate', 'segment': 3},
+            ]}),
+            content_type='application/json',
+        )
+
+        point = ObservationPoint.objects.get(farm=farm)
+        assert point.geohash == geohash.encode(1.5, 2.5)
+
+
+class TestBoundingBoxFilter:
+    """Test the ?bbox= filter of the observation point list."""
+
+    def test_same_as_exact_filter(self, authenticated_client, observation_points_url, farm):
+        """Test that the filter returns exactly the points inside the box."""
+        client, user = authenticated_client
+        rng = random.Random(11)
+        points = [ObservationPointFactory(farm=farm, latitude=round(rng.uniform(-36, -32), 5),
+                                          longitude=round(rng.uniform(149, 153), 5)) for _ in range(30)]
+        points += [ObservationPointFactory(farm=farm, latitude=-17.0, longitude=longitude)
+                   for longitude in (179.5, -179.5, 178.0)]
+
+        for bbox in [(150.0, -35.0, 152.0, -33.0), (151.2, -33.9, 152.5, -33.0), (179.0, -18.0, -179.0, -16.0)]:
+            min_lon, min_lat, max_lon, max_lat = bbox
+
+            def inside(point):
+                latitude, longitude = float(point.latitude), float(point.longitude)
+                if min_lon <= max_lon:
+                    in_lon = min_lon <= longitude <= max_lon
+                else:
+                    in_lon = longitude >= min_lon or longitude <= max_lon
+                return min_lat <= latitude <= max_lat and in_lon
+
+            response = client.get(observation_points_url, {'bbox': ','.join(map(str, bbox)), 'page_size': 1000})
+
+            assert response.status_code == status.HTTP_200_OK
+            expected = sorted(point.id for point in points if inside(point))
+            assert expected
+            assert sorted(item['id'] for item in response.data['results']) == expected
+
+    def test_uses_geohash_ranges(self, authenticated_client, observation_points_url, farm):
+        """Test that the query reads geohash ranges."""
+        client, user = authenticated_client
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(observation_points_url, {'bbox': '151.2,-33.9,151.25,-33.85'})
+
+        [sql] = [q['sql'] for q in queries if 'FROM "farm_observationpoint"' in q['sql']]
+        assert '"geohash" >=' in sql
+
+    @pytest.mark.parametrize('bbox', ['1,2,3', 'a,b,c,d', '0,10,1,5', '0,0,200,1', 'nan,0,1,1'])
+    def test_invalid(self, authenticated_client, observation_points_url, bbox):
+        """Test that malformed boxes are rejected."""
+        client, user = authenticated_client
+
+        response = client.get(observation_points_url, {'bbox': bbox})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'bbox' in response.data
@@ -0,0 +1,192 @@
+import pytest
+import json
+from datetime import timedelta
+from django.utils import timezone
+from rest_framework import status
+from farm import digests
+from farm.models import BoundaryPoint, IdempotencyRecord
+from farm.tests.conftest import UserFactory
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _post(client, url, data, key):
+    return client.post(
+        url,
+        data=json.dumps(data),
+        content_type='application/json',
+        HTTP_IDEMPOTENCY_KEY=key
+    )
+
+
+class TestIdempotencyKey:
+    """Test Idempotency-Key handling on the sync endpoints."""
+
+    def test_retry_replays_stored_response(self, authenticated_client, sync_data_url, farm):
+        """Test that a retry returns the first response without touching the farm tables."""
+        client, user = authenticated_client
+        data = {'boundary_points': [{'id': 1, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0}]}
+
+        first = _post(client, sync_data_url, data, 'retry-1')
+        BoundaryPoint.objects.filter(id=1).delete()
+        second = _post(client, sync_data_url, data, 'retry-1')
+
+        assert first.status_code == second.status_code == status.HTTP_200_OK
+        assert second['Idempotency-Replayed'] == 'true'
+        assert second.data == first.data
+        assert not BoundaryPoint.objects.filter(id=1).exists()
+
+    def test_key_reused_for_different_request(self, authenticated_client, sync_data_url, farm):
+        """Test that a key cannot be reused with a different body."""
+        client, user = authenticated_client
+
+        _post(client, sync_data_url, {'farms': []}, 'reused')
+        response = _post(client, sync_data_url, {'boundary_points': []}, 'reused')
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_expired_key_runs_again(self, authenticated_client, sync_data_url, farm):
+        """Test that a key past its TTL is treated as new."""
+        client, user = authenticated_client
+        data = {'boundary_points': [{'id': 1, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0}]}
+
+        _post(client, sync_data_url, data, 'expired')
+        IdempotencyRecord.objects.filter(key='expired').update(expires_at=timezone.now() - timedelta(seconds=1))
+        BoundaryPoint.objects.filter(id=1).delete()
+        response = _post(client, sync_data_url, data, 'expired')
+
+        assert 'Idempotency-Replayed' not in response
+        assert BoundaryPoint.objects.filter(id=1).exists()
+
+    def test_in_flight_duplicate_times_out(self, authenticated_client, sync_data_url, settings):
+        """Test that a duplicate of a request still in progress gets 409 after waiting."""
+        client, user = authenticated_client
+        settings.IDEMPOTENCY_WAIT_TIMEOUT = 0.2
+
+        response = _post(client, sync_data_url, {'farms': []}, 'in-flight')
+        record = IdempotencyRecord.objects.get(key='in-flight')
+        record.state = 'in_progress'
+        record.save()
+        response = _post(client, sync_data_url, {'farms': []}, 'in-flight')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_keys_are_scoped_to_user(self, authenticated_client, sync_data_url, farm):
+        """Test that another user's key does not collide."""
+        client, user = authenticated_client
+        IdempotencyRecord.objects.create(
+            user=UserFactory(), key='shared', request_digest='x', expires_at=timezone.now() + timedelta(hours=1)
+        )
+
+        response = _post(client, sync_data_url, {'farms': []}, 'shared')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'Idempotency-Replayed' not in response
+
+    def test_entity_sync_action_is_idempotent(self, authenticated_client, farm):
+        """Test that the per-entity sync actions honour the key too."""
+        from django.urls import reverse
+        client, user = authenticated_client
+        url = reverse('inspection-suggestion-sync')
+        data = {'inspection_suggestions': [{
+            'id': 555, 'property_location': farm.id, 'target_entity': 'Aphid',
+            'confidence_level': 'High', 'area_size': 1.0, 'density_of_plant': 2,
+        }]}
+
+        first = _post(client, url, data, 'entity-sync')
+        second = _post(client, url, data, 'entity-sync')
+
+        assert first.data['created'] == 1
+        assert second.data == first.data
+        assert second['Idempotency-Replayed'] == 'true'
+
+    def test_abandoned_claim_is_taken_over(self, authenticated_client, sync_data_url, farm, settings):
+        """Test that a retry takes over a key whose worker died before releasing it."""
+        client, user = authenticated_client
+        settings.IDEMPOTENCY_WAIT_TIMEOUT = 5
+        data = {'boundary_points': [{'id': 1, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0}]}
+        _post(client, sync_data_url, data, 'abandoned')
+        BoundaryPoint.objects.filter(id=1).delete()
+        IdempotencyRecord.objects.filter(key='abandoned').update(
+            state='in_progress', claimed_at=timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_LEASE_TIMEOUT + 1)
+        )
+
+        response = _post(client, sync_data_url, data, 'abandoned')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'Idempotency-Replayed' not in response
+        assert BoundaryPoint.objects.filter(id=1).exists()
+        assert IdempotencyRecord.objects.get(key='abandoned').state == 'completed'
+
+    def test_lost_lease_rolls_back(self, authenticated_client, sync_data_url, farm, monkeypatch):
+        """Test that a request whose key was taken over meanwhile does not keep its writes."""
+        from farm import idempotency
+        client, user = authenticated_client
+        # As seen once another request took the key over and renewed its lease
+        monkeypatch.setattr(
+            idempotency, '_held',
+            lambda record: IdempotencyRecord.objects.filter(pk=record.pk, claimed_at=record.claimed_at).none(),
+        )
+        data = {'boundary_points': [{'id': 1, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0}]}
+
+        response = _post(client, sync_data_url, data, 'lost')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not BoundaryPoint.objects.filter(id=1).exists()
+        assert IdempotencyRecord.objects.get(key='lost').state == 'in_progress'
+
+    def test_chunked_request_commits_per_chunk(self, authenticated_client, sync_data_url, farm, settings,
+                                               monkeypatch):
+        """Test that with SYNC_COMMIT_EVERY a keyed request commits chunk by chunk and a retry completes it."""
+        client, user = authenticated_client
+        settings.SYNC_COMMIT_EVERY = 2
+        track = digests.track
+        calls = []
+
+        def track_then_crash(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            track(*args)
+
+        monkeypatch.setattr(digests, 'track', track_then_crash)
+        data = {'boundary_points': [
+            {'id': i, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': float(i)} for i in range(1, 6)
+        ]}
+
+        with pytest.raises(RuntimeError):
+            _post(client, sync_data_url, data, 'chunked')
+
+        assert sorted(BoundaryPoint.objects.filter(farm=farm).values_list('id', flat=True)) == [1, 2]
+        assert not IdempotencyRecord.objects.filter(key='chunked').exists()
+
+        response = _post(client, sync_data_url, data, 'chunked')
+
+        assert [row['status'] for row in response.data['results']['boundary_points']] == [
+            'unchanged', 'unchanged', 'created', 'created', 'created'
+        ]
+        assert IdempotencyRecord.objects.get(key='chunked').state == 'completed'
+        assert _post(client, sync_data_url, data, 'chunked')['Idempotency-Replayed'] == 'true'
+
+    def test_chunked_request_stops_when_taken_over(self, authenticated_client, sync_data_url, farm, settings,
+                                                   monkeypatch):
+        """Test that a chunked request whose key is taken over writes no further chunk."""
+        client, user = authenticated_client
+        settings.SYNC_COMMIT_EVERY = 2
+        track = digests.track
+
+        def track_then_take_over(*args):
+            track(*args)
+            # A retry takes the key over once the first chunk is written
+            IdempotencyRecord.objects.filter(key='taken').update(claimed_at=timezone.now() + timedelta(seconds=1))
+
+        monkeypatch.setattr(digests, 'track', track_then_take_over)
+        data = {'boundary_points': [
+            {'id': i, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': float(i)} for i in range(1, 6)
+        ]}
+
+        response = _post(client, sync_data_url, data, 'taken')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert sorted(BoundaryPoint.objects.filter(farm=farm).values_list('id', flat=True)) == [1, 2]
+        assert IdempotencyRecord.objects.get(key='taken').state == 'in_progress'
@@ -39,18 +39,18 @@ class TestInspectionObservationViewSet:
         response = client.get(inspection_observations_url)
         
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]['id'] == inspection_observation.id
-        assert response.data[0]['date'] is not None
-        assert response.data[0]['inspection'] == inspection_observation.inspection.id
-        assert response.data[0]['confidence'] == inspection_observation.confidence
-        assert response.data[0]['section'] == inspection_observation.section.id
-        assert response.data[0]['farm'] == inspection_observation.farm.id
-        assert str(response.data[0]['plant_per_section']) == str(inspection_observation.plant_per_section)
-        assert response.data[0]['status'] == inspection_observation.status
-        assert response.data[0]['target_entity'] == inspection_observation.target_entity
-        assert response.data[0]['severity'] == inspection_observation.severity
-        assert response.data[0]['user'] == user.id
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['id'] == inspection_observation.id
+        assert response.data['results'][0]['date'] is not None
+        assert response.data['results'][0]['inspection'] == inspection_observation.inspection.id
+        assert response.data['results'][0]['confidence'] == inspection_observation.confidence
+        assert response.data['results'][0]['section'] == inspection_observation.section.id
+        assert response.data['results'][0]['farm'] == inspection_observation.farm.id
+        assert str(response.data['results'][0]['plant_per_section']) == str(inspection_observation.plant_per_section)
+        assert response.data['results'][0]['status'] == inspection_observation.status
+        assert response.data['results'][0]['target_entity'] == inspection_observation.target_entity
+        assert response.data['results'][0]['severity'] == inspection_observation.severity
+        assert response.data['results'][0]['user'] == user.id
     
     def test_list_inspection_observations_unauthenticated(self, api_client, inspection_observations_url):
         """Test listing inspection observations when unauthenticated."""
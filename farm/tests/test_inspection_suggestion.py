@@ -1,7 +1,12 @@
 import pytest
 import json
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from rest_framework import status
-from farm.models import InspectionSuggestion
+from farm.models import InspectionSuggestion, ObservationPoint
+from farm.sync import BulkSyncEngine
+from farm.tests.conftest import FarmFactory, ObservationPointFactory
 from accounts.tests.utils import phone_number_json_dumps
 
 pytestmark = [pytest.mark.django_db]
@@ -36,14 +41,14 @@ class TestInspectionSuggestionViewSet:
         response = client.get(inspection_suggestions_url)
         
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]['id'] == inspection_suggestion.id
-        assert response.data[0]['target_entity'] == inspection_suggestion.target_entity
-        assert response.data[0]['confidence_level'] == inspection_suggestion.confidence_level
-        assert response.data[0]['property_location'] == inspection_suggestion.property_location.id
-        assert response.data[0]['area_size'] == inspection_suggestion.area_size
-        assert response.data[0]['density_of_plant'] == inspection_suggestion.density_of_plant
-        assert response.data[0]['user'] == user.id
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['id'] == inspection_suggestion.id
+        assert response.data['results'][0]['target_entity'] == inspection_suggestion.target_entity
+        assert response.data['results'][0]['confidence_level'] == inspection_suggestion.confidence_level
+        assert response.data['results'][0]['property_location'] == inspection_suggestion.property_location.id
+        assert response.data['results'][0]['area_size'] == inspection_suggestion.area_size
+        assert response.data['results'][0]['density_of_plant'] == inspection_suggestion.density_of_plant
+        assert response.data['results'][0]['user'] == user.id
     
     def test_list_inspection_suggestions_unauthenticated(self, api_client, inspection_suggestions_url):
         """Test listing inspection suggestions when unauthenticated."""
@@ -198,3 +203,58 @@ class TestInspectionSuggestionViewSet:
         
         # Check that the inspection suggestion was not deleted from the database
         assert InspectionSuggestion.objects.filter(id=inspection_suggestion.id).exists()
+
+
+class TestInspectionSuggestionFanOut:
+    """Test that synced suggestions are copied onto their farms' observation points."""
+
+    def suggestion(self, id, farm, target):
+        return {
+            'id': id,
+            'target_entity': target,
+            'confidence_level': 'High',
+            'property_location': farm.id,
+            'area_size': 10.0,
+            'density_of_plant': 4,
+        }
+
+    def test_sync_updates_each_farm_once(self, authenticated_client, user):
+        """Test that the last suggestion per farm wins and each farm's points are updated once."""
+        client, user = authenticated_client
+        farm, other_farm = FarmFactory(user=user), FarmFactory(user=user)
+        points = ObservationPointFactory.create_batch(3, farm=farm, inspection_suggestion=None)
+        other_point = ObservationPointFactory(farm=other_farm, inspection_suggestion=None)
+
+        data = {
+            'inspection_suggestions': [
+                *(self.suggestion(100 + i, farm, f'Pest {i}') for i in range(5)),
+                self.suggestion(200, other_farm, 'Blight'),
+            ]
+        }
+        with CaptureQueriesContext(connection) as captured:
+            response = client.post(
+                reverse('inspection-suggestion-sync'), data=json.dumps(data), content_type='application/json'
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 6
+        server_ids = [r['server_id'] for r in response.data['results']]
+        fan_out_updates = [
+            q for q in captured.captured_queries
+            if q['sql'].startswith('UPDATE "farm_observationpoint"') and '"target_entity"' in q['sql']
+        ]
+        assert len(fan_out_updates) == 2
+        for point in points:
+            point.refresh_from_db()
+            assert (point.inspection_suggestion_id, point.target_entity) == (server_ids[4], 'Pest 4')
+        other_point.refresh_from_db()
+        assert (other_point.inspection_suggestion_id, other_point.target_entity) == (server_ids[5], 'Blight')
+        assert other_point.content_hash == other_point.refresh_content_hash()
+
+    def test_engine_fan_out_is_opt_in(self, user, farm, observation_point):
+        """Test that BulkSyncEngine only fans suggestions out when asked to."""
+        BulkSyncEngine(user).run({'inspection_suggestions': [self.suggestion(300, farm, 'Mites')]})
+        assert ObservationPoint.objects.get(id=observation_point.id).target_entity != 'Mites'
+
+        BulkSyncEngine(user, fan_out=True).run({'inspection_suggestions': [self.suggestion(301, farm, 'Mites')]})
+        assert ObservationPoint.objects.get(id=observation_point.id).inspection_suggestion_id == 301
@@ -0,0 +1,78 @@
+import datetime
+import decimal
+import uuid
+from io import BytesIO
+
+import pytest
+from rest_framework.exceptions import ParseError
+from backend.parsers import ORJSONParser
+from backend.renderers import ORJSONRenderer, iter_json_array
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestORJSONRenderer:
+    """Test the orjson renderer."""
+
+    def test_native_types(self):
+        """Test that floats, datetimes, UUIDs and Decimals render like DRF's encoder."""
+        uid = uuid.UUID('01890a5d-ac96-774b-bcce-b302099a8057')
+        data = {
+            'latitude': -33.8688,
+            'timestamp': datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+            'uid': uid,
+            'amount': decimal.Decimal('1.5'),
+            1: 'non-string key',
+        }
+
+        content = ORJSONRenderer().render(data)
+
+        assert content == (
+            b'{"latitude":-33.8688,"timestamp":"2025-01-02T03:04:05Z",'
+            b'"uid":"01890a5d-ac96-774b-bcce-b302099a8057","amount":1.5,"1":"non-string key"}'
+        )
+
+    def test_escapes_line_separators(self):
+        """Test that U+2028 and U+2029 are escaped, as DRF does."""
+        assert ORJSONRenderer().render({'text': 'a b c'}) == b'{"text":"a\\u2028b\\u2029c"}'
+
+    def test_indent(self):
+        """Test that a requested indent pretty-prints the output."""
+        content = ORJSONRenderer().render({'a': 1}, 'application/json; indent=4')
+
+        assert content == b'{\n  "a": 1\n}'
+
+    def test_none(self):
+        """Test that no data renders an empty body."""
+        assert ORJSONRenderer().render(None) == b''
+
+    @pytest.mark.parametrize('items, chunk_size, expected', [
+        ([], 2, [b'[]']),
+        ([1, 2, 3], 2, [b'[1,2', b',3', b']']),
+        ([1, 2], 2, [b'[1,2', b']']),
+    ])
+    def test_iter_json_array(self, items, chunk_size, expected):
+        """Test that arrays are streamed in chunks of encoded items."""
+        assert list(iter_json_array(iter(items), chunk_size)) == expected
+
+
+class TestORJSONParser:
+    """Test the orjson parser."""
+
+    def test_parse(self):
+        """Test that a JSON body is parsed."""
+        assert ORJSONParser().parse(BytesIO('{"name": "Farm é"}'.encode())) == {'name': 'Farm é'}
+
+    @pytest.mark.parametrize('body', [b'{"name": ', b'{"value": NaN}'])
+    def test_invalid(self, body):
+        """Test that malformed JSON and non-finite constants are rejected."""
+        with pytest.raises(ParseError):
+            ORJSONParser().parse(BytesIO(body))
+
+    def test_api_uses_orjson(self, authenticated_client, farms_url):
+        """Test that API responses are rendered by the project renderer."""
+        client, user = authenticated_client
+
+        response = client.get(farms_url)
+
+        assert isinstance(response.accepted_renderer, ORJSONRenderer)
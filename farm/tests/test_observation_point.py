@@ -1,7 +1,10 @@
 import pytest
 import json
+from django.urls import reverse
 from rest_framework import status
-from farm.models import ObservationPoint
+from farm import mobile_ids
+from farm.models import MobileIdMapping, ObservationPoint
+from farm.tests.conftest import ObservationPointFactory
 from accounts.tests.utils import phone_number_json_dumps
 
 pytestmark = [pytest.mark.django_db]
@@ -39,17 +42,17 @@ class TestObservationPointViewSet:
         response = client.get(observation_points_url)
         
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]['id'] == observation_point.id
-        assert response.data[0]['farm'] == observation_point.farm.id
-        assert float(response.data[0]['latitude']) == float(observation_point.latitude)
-        assert float(response.data[0]['longitude']) == float(observation_point.longitude)
-        assert response.data[0]['observation_status'] == observation_point.observation_status
-        assert response.data[0]['segment'] == observation_point.segment
-        assert response.data[0]['inspection_suggestion'] == observation_point.inspection_suggestion.id
-        assert response.data[0]['confidence_level'] == observation_point.confidence_level
-        assert response.data[0]['target_entity'] == observation_point.target_entity
-        assert 'image' in response.data[0]
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['id'] == observation_point.id
+        assert response.data['results'][0]['farm'] == observation_point.farm.id
+        assert float(response.data['results'][0]['latitude']) == float(observation_point.latitude)
+        assert float(response.data['results'][0]['longitude']) == float(observation_point.longitude)
+        assert response.data['results'][0]['observation_status'] == observation_point.observation_status
+        assert response.data['results'][0]['segment'] == observation_point.segment
+        assert response.data['results'][0]['inspection_suggestion'] == observation_point.inspection_suggestion.id
+        assert response.data['results'][0]['confidence_level'] == observation_point.confidence_level
+        assert response.data['results'][0]['target_entity'] == observation_point.target_entity
+        assert 'image' in response.data['results'][0]
     
     def test_list_observation_points_unauthenticated(self, api_client, observation_points_url):
         """Test listing observation points when unauthenticated."""
@@ -274,3 +277,119 @@ class TestObservationPointViewSet:
         
         # Check that the observation point was not deleted from the database
         assert ObservationPoint.objects.filter(id=observation_point.id).exists()
+
+
+class TestObservationPointSync:
+    """Test the observation point bulk sync endpoint."""
+
+    def sync(self, client, points, device=None):
+        headers = {'HTTP_X_DEVICE_ID': device} if device else {}
+        return client.post(
+            reverse('observation-point-sync'),
+            data=json.dumps({'observation_points': points}),
+            content_type='application/json',
+            **headers
+        )
+
+    def point(self, farm, name='Gate', mobile_id=1):
+        return {
+            'id': mobile_id,
+            'farm_id': farm.id,
+            'latitude': 1.5,
+            'longitude': 2.5,
+            'name': name,
+            'segment': 3,
+        }
+
+    def test_mobile_ids_are_scoped_per_device(self, authenticated_client, farm):
+        """Test that two devices can use the same local id without colliding."""
+        client, user = authenticated_client
+
+        first = self.sync(client, [self.point(farm, 'Gate')], device='phone-a')
+        second = self.sync(client, [self.point(farm, 'Well')], device='phone-b')
+
+        assert first.data['created'] == 1
+        assert second.data['created'] == 1
+        assert first.data['results'][0]['server_id'] != second.data['results'][0]['server_id']
+        assert MobileIdMapping.objects.filter(user=user, mobile_id=1).count() == 2
+
+    def test_resync_from_same_device_updates(self, authenticated_client, farm):
+        """Test that a device's ids resolve to the records it created before."""
+        client, user = authenticated_client
+        created = self.sync(client, [self.point(farm, 'Gate', mobile_id=i) for i in range(5)], device='phone-a')
+        server_ids = [r['server_id'] for r in created.data['results']]
+
+        response = self.sync(client, [self.point(farm, 'Renamed', mobile_id=i) for i in range(5)], device='phone-a')
+
+        assert [r['status'] for r in response.data['results']] == ['updated'] * 5
+        assert [r['server_id'] for r in response.data['results']] == server_ids
+        assert set(ObservationPoint.objects.filter(farm=farm).values_list('name', flat=True)) == {'Renamed'}
+
+    def test_repeated_mobile_id_in_one_request(self, authenticated_client, farm):
+        """Test that rows repeating a new mobile id write one point, left as the last row has it."""
+        client, user = authenticated_client
+
+        response = self.sync(client, [
+            self.point(farm, 'Gate', mobile_id=1), self.point(farm, 'Well', mobile_id=1),
+            self.point(farm, 'Barn', mobile_id=2),
+        ], device='phone-a')
+
+        results = response.data['results']
+        assert [(r['mobile_id'], r['status']) for r in results] == [(1, 'created'), (1, 'updated'), (2, 'created')]
+        assert results[0]['server_id'] == results[1]['server_id'] != results[2]['server_id']
+        assert ObservationPoint.objects.get(id=results[0]['server_id']).name == 'Well'
+        assert set(MobileIdMapping.objects.filter(user=user).values_list('mobile_id', flat=True)) == {1, 2}
+
+    def test_other_users_mobile_ids_are_not_matched(self, authenticated_client, farm):
+        """Test that a mapping made for another user is never used."""
+        client, user = authenticated_client
+        foreign_point = ObservationPointFactory()
+        MobileIdMapping.objects.create(
+            user=foreign_point.farm.user, entity_type='observation_points', mobile_id=42,
+            server_id=foreign_point.id
+        )
+
+        response = self.sync(client, [self.point(farm, mobile_id=42)])
+
+        assert response.data['created'] == 1
+        assert response.data['results'][0]['server_id'] != foreign_point.id
+
+    def test_legacy_mappings_move_to_device(self, authenticated_client, farm):
+        """Test that a mapping stored before device ids is resolved, then kept, by the first device using it."""
+        client, user = authenticated_client
+        legacy = self.sync(client, [self.point(farm, 'Gate')])
+        server_id = legacy.data['results'][0]['server_id']
+
+        response = self.sync(client, [self.point(farm, 'Renamed')], device='phone-a')
+
+        assert response.data['results'][0]['status'] == 'updated'
+        assert response.data['results'][0]['server_id'] == server_id
+        mapping = MobileIdMapping.objects.get(user=user, mobile_id=1)
+        assert (mapping.device, mapping.server_id) == ('phone-a', server_id)
+        assert self.sync(client, [self.point(farm, 'Well')], device='phone-b').data['created'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_commit_every_keeps_committed_chunks(self, authenticated_client, farm, settings, monkeypatch):
+        """Test that with SYNC_COMMIT_EVERY the chunks written before a crash stay committed."""
+        client, user = authenticated_client
+        settings.SYNC_COMMIT_EVERY = 2
+        remember = mobile_ids.remember
+        calls = []
+
+        def remember_then_crash(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            remember(*args)
+
+        monkeypatch.setattr(mobile_ids, 'remember', remember_then_crash)
+
+        with pytest.raises(RuntimeError):
+            self.sync(client, [self.point(farm, mobile_id=i) for i in range(5)], device='phone-a')
+
+        # The first chunk and its id mappings survive; a re-upload updates them
+        assert ObservationPoint.objects.filter(farm=farm).count() == 2
+        assert set(MobileIdMapping.objects.filter(user=user).values_list('mobile_id', flat=True)) == {0, 1}
+        monkeypatch.setattr(mobile_ids, 'remember', remember)
+        response = self.sync(client, [self.point(farm, mobile_id=i) for i in range(5)], device='phone-a')
+        assert [r['status'] for r in response.data['results']] == ['unchanged'] * 2 + ['created'] * 3
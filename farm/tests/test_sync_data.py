@@ -1,7 +1,13 @@
+import gzip
 import pytest
 import json
+import uuid
 from rest_framework import status
-from farm.models import Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation
+from farm import digests
+from farm.models import (
+    Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation, uuid7,
+)
+from farm.tests.conftest import FarmFactory, InspectionSuggestionFactory
 from accounts.tests.utils import phone_number_json_dumps
 
 pytestmark = [pytest.mark.django_db]
@@ -171,3 +177,386 @@ class TestSyncDataAPIView:
         )
         
         assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_sync_data_query_count_independent_of_rows(self, authenticated_client, sync_data_url, farm,
+                                                       django_assert_max_num_queries):
+        """Test that a large payload is written with a bounded number of queries."""
+        client, user = authenticated_client
+
+        data = {
+            'boundary_points': [
+                {
+                    'id': 1000 + i,
+                    'farm_id': farm.id,
+                    'latitude': 37.0 + i / 1000,
+                    'longitude': -122.0,
+                }
+                for i in range(300)
+            ],
+            'observation_points': [
+                {
+                    'id': 2000 + i,
+                    'farm_id': farm.id,
+                    'latitude': 37.0,
+                    'longitude': -122.0 + i / 1000,
+                    'segment': i % 10,
+                }
+                for i in range(300)
+            ]
+        }
+
+        # A few of them classify the observation points against the farm's boundary
+        # ring and refresh the ring's cached geometry
+        with django_assert_max_num_queries(65):
+            response = client.post(
+                sync_data_url,
+                data=json.dumps(data),
+                content_type='application/json'
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data['results']
+        assert [r['status'] for r in results['boundary_points']] == ['created'] * 300
+        assert [r['server_id'] for r in results['observation_points']] == [2000 + i for i in range(300)]
+        assert BoundaryPoint.objects.filter(farm=farm).count() == 300
+        assert ObservationPoint.objects.filter(farm=farm).count() == 300
+
+    def test_sync_data_per_row_failures(self, authenticated_client, sync_data_url, farm):
+        """Test that invalid rows fail on their own without affecting the rest of the batch."""
+        client, user = authenticated_client
+
+        data = {
+            'boundary_points': [
+                {'id': 1, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0},
+                {'id': 2, 'farm_id': farm.id, 'latitude': 'north', 'longitude': 2.0},
+                {'id': 3, 'farm_id': 424242, 'latitude': 1.0, 'longitude': 2.0},
+                {'id': 1, 'farm_id': farm.id, 'latitude': 5.0, 'longitude': 6.0},
+            ]
+        }
+
+        response = client.post(
+            sync_data_url,
+            data=json.dumps(data),
+            content_type='application/json'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data['results']['boundary_points']
+        assert [r['status'] for r in results] == ['created', 'failed', 'failed', 'updated']
+        assert results[2]['message'] == 'Farm 424242 not found'
+        point = BoundaryPoint.objects.get(id=1)
+        assert (point.latitude, point.longitude) == (5.0, 6.0)
+        assert not BoundaryPoint.objects.filter(id__in=[2, 3]).exists()
+
+    def test_sync_data_cannot_take_over_other_users_farm(self, authenticated_client, sync_data_url):
+        """Test that a farm id owned by another user is rejected instead of being reassigned."""
+        from farm.tests.conftest import FarmFactory
+
+        client, user = authenticated_client
+        other_farm = FarmFactory()
+
+        data = {
+            'farms': [
+                {
+                    'id': other_farm.id,
+                    'name': 'Hijacked',
+                    'size': 1.0,
+                    'plant_type': 'Wheat'
+                }
+            ]
+        }
+
+        response = client.post(
+            sync_data_url,
+            data=json.dumps(data),
+            content_type='application/json'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results']['farms'][0]['status'] == 'failed'
+        other_farm.refresh_from_db()
+        assert other_farm.name != 'Hijacked'
+        assert other_farm.user != user
+
+    def test_sync_data_ndjson_stream(self, authenticated_client, sync_data_url, farm, settings):
+        """Test that an NDJSON upload is applied in batches and answered line by line."""
+        client, user = authenticated_client
+        settings.SYNC_BATCH_SIZE = 3
+
+        lines = [
+            json.dumps({'entity': 'farms', 'id': 5000, 'name': 'Stream Farm', 'size': 10, 'plant_type': 'Rice'}),
+            '',
+            json.dumps({'entity': 'boundary_points', 'id': 1, 'farm_id': 5000, 'latitude': 1.0, 'longitude': 2.0}),
+            '{not json',
+            json.dumps({'entity': 'unknown', 'id': 7}),
+        ]
+        lines += [
+            json.dumps({'entity': 'boundary_points', 'id': 10 + i, 'farm_id': farm.id,
+                        'latitude': 1.0, 'longitude': 2.0})
+            for i in range(5)
+        ]
+
+        response = client.post(
+            sync_data_url,
+            data='\n'.join(lines) + '\n',
+            content_type='application/x-ndjson'
+        )
+        body = b''.join(response.streaming_content).decode()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        results = [json.loads(line) for line in body.splitlines()]
+        assert results[-1]['status'] == 'success'
+        results = results[:-1]
+        assert [r['line'] for r in results] == [1, 3, 4, 5, 6, 7, 8, 9, 10]
+        assert [r['status'] for r in results] == ['created', 'created', 'failed', 'failed'] + ['created'] * 5
+        assert results[0]['entity'] == 'farms'
+        assert results[2]['message'].startswith('Invalid JSON')
+        assert Farm.objects.filter(id=5000, user=user).exists()
+        assert BoundaryPoint.objects.filter(farm=farm).count() == 5
+
+    def test_sync_data_skips_unchanged_rows(self, authenticated_client, sync_data_url, changes_url, farm):
+        """Test that a re-sync of identical rows reports them as unchanged and writes nothing."""
+        client, user = authenticated_client
+
+        data = {
+            'farms': [
+                {'id': farm.id, 'name': farm.name, 'size': farm.size, 'plant_type': farm.plant_type}
+            ],
+            'boundary_points': [
+                {'id': 1, 'farm_id': farm.id, 'latitude': 1, 'longitude': 2.5, 'description': 'Gate'}
+            ]
+        }
+        first = client.post(sync_data_url, data=json.dumps(data), content_type='application/json')
+        assert first.data['results']['farms'][0]['status'] == 'unchanged'
+        assert first.data['results']['boundary_points'][0]['status'] == 'created'
+
+        cursor = client.get(changes_url).data['cursor']
+        data['boundary_points'].append(
+            {'id': 2, 'farm_id': farm.id, 'latitude': 3.0, 'longitude': 4.0, 'description': ''}
+        )
+        second = client.post(sync_data_url, data=json.dumps(data), content_type='application/json')
+
+        assert second.status_code == status.HTTP_200_OK
+        assert [r['status'] for r in second.data['results']['boundary_points']] == ['unchanged', 'created']
+        changes = client.get(changes_url, {'since': cursor}).data['changes']
+        # The new point also changes the farm's cached boundary geometry
+        assert [(c['entity'], c['id']) for c in changes] == [('boundary_points', 2), ('farms', farm.id)]
+
+        data['boundary_points'][0]['description'] = 'North gate'
+        third = client.post(sync_data_url, data=json.dumps(data), content_type='application/json')
+        assert [r['status'] for r in third.data['results']['boundary_points']] == ['updated', 'unchanged']
+        assert BoundaryPoint.objects.get(id=1).description == 'North gate'
+
+    def test_sync_data_temporary_ids(self, authenticated_client, sync_data_url):
+        """Test that a hierarchy created offline with temporary ids uploads in one request."""
+        client, user = authenticated_client
+
+        data = {
+            'farms': [{'id': -1, 'name': 'Offline Farm', 'size': 10.0, 'plant_type': 'Maize'}],
+            'boundary_points': [{'id': -1, 'farm_id': -1, 'latitude': 1.0, 'longitude': 2.0}],
+            'observation_points': [{
+                'id': -1,
+                'farm_id': -1,
+                'latitude': 1.0,
+                'longitude': 2.0,
+                'segment': 1,
+                'inspection_suggestion_id': -2,
+            }],
+            'inspection_suggestions': [{
+                'id': -2,
+                'target_entity': 'Aphids',
+                'confidence_level': 'High',
+                'property_location': -1,
+                'area_size': 1.0,
+                'density_of_plant': 2,
+            }],
+            'inspection_observations': [{
+                'id': -1,
+                'date': '2025-05-14T12:00:00Z',
+                'inspection': -2,
+                'farm': -1,
+                'confidence': 'High',
+                'plant_per_section': '5',
+                'status': 'Completed',
+            }],
+        }
+
+        response = client.post(sync_data_url, data=json.dumps(data), content_type='application/json',
+                               HTTP_X_DEVICE_ID='phone-a')
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data['results']
+        for entity, rows in results.items():
+            assert [(r['status'], r['mobile_id']) for r in rows] == [('created', data[entity][0]['id'])], entity
+        farm = Farm.objects.get(id=results['farms'][0]['server_id'], user=user)
+        suggestion = InspectionSuggestion.objects.get(id=results['inspection_suggestions'][0]['server_id'])
+        point = ObservationPoint.objects.get(id=results['observation_points'][0]['server_id'])
+        observation = InspectionObservation.objects.get(id=results['inspection_observations'][0]['server_id'])
+        assert suggestion.property_location == farm
+        assert (point.farm, point.inspection_suggestion) == (farm, suggestion)
+        assert (observation.farm, observation.inspection) == (farm, suggestion)
+        assert BoundaryPoint.objects.filter(farm=farm).count() == 1
+
+        # A retry resolves the same temporary ids to the rows created above
+        retry = client.post(sync_data_url, data=json.dumps(data), content_type='application/json',
+                            HTTP_X_DEVICE_ID='phone-a')
+
+        for entity, rows in retry.data['results'].items():
+            assert [(r['status'], r['server_id']) for r in rows] == [
+                ('unchanged', results[entity][0]['server_id'])
+            ], entity
+        assert Farm.objects.filter(user=user).count() == 1
+
+    def test_sync_data_suggestion_cannot_change_farm(self, authenticated_client, sync_data_url, farm):
+        """Test that only the suggestions moved to another farm fail, the rest of the batch is written."""
+        client, user = authenticated_client
+        other_farm = FarmFactory(user=user)
+        moved, kept = InspectionSuggestionFactory.create_batch(2, property_location=farm, user=user)
+        rows = [
+            {'id': suggestion.id, 'target_entity': 'Mites', 'confidence_level': 'High', 'property_location': location}
+            for suggestion, location in [(moved, other_farm.id), (kept, farm.id)]
+        ]
+
+        response = client.post(sync_data_url, data=json.dumps({'inspection_suggestions': rows}),
+                               content_type='application/json')
+
+        assert [r['status'] for r in response.data['results']['inspection_suggestions']] == ['failed', 'updated']
+        assert InspectionSuggestion.objects.get(id=moved.id).property_location_id == farm.id
+        assert InspectionSuggestion.objects.get(id=kept.id).target_entity == 'Mites'
+
+    def test_sync_data_unknown_temporary_id_fails(self, authenticated_client, sync_data_url):
+        """Test that a reference to a temporary id nobody assigned fails its row."""
+        client, user = authenticated_client
+
+        data = {'boundary_points': [{'id': -1, 'farm_id': -7, 'latitude': 1.0, 'longitude': 2.0}]}
+        response = client.post(sync_data_url, data=json.dumps(data), content_type='application/json')
+
+        [result] = response.data['results']['boundary_points']
+        assert (result['status'], result['message']) == ('failed', 'Farm -7 not found')
+
+    def test_sync_data_client_uids(self, authenticated_client, sync_data_url):
+        """Test that rows keyed by client-generated uids insert once and then update in place."""
+        client, user = authenticated_client
+        farm_uid, suggestion_uid, point_uid = (str(uuid7()) for _ in range(3))
+
+        data = {
+            'farms': [{'uid': farm_uid, 'name': 'Offline Farm', 'size': 10.0, 'plant_type': 'Maize'}],
+            'inspection_suggestions': [{
+                'uid': suggestion_uid,
+                'target_entity': 'Aphids',
+                'confidence_level': 'High',
+                'property_location': farm_uid,
+                'area_size': 1.0,
+                'density_of_plant': 2,
+            }],
+            'observation_points': [{
+                'uid': point_uid,
+                'farm_id': farm_uid,
+                'latitude': 1.0,
+                'longitude': 2.0,
+                'segment': 1,
+                'inspection_suggestion_id': suggestion_uid,
+            }],
+        }
+
+        response = client.post(sync_data_url, data=json.dumps(data), content_type='application/json')
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data['results']
+        farm = Farm.objects.get(uid=farm_uid, user=user)
+        suggestion = InspectionSuggestion.objects.get(uid=suggestion_uid)
+        point = ObservationPoint.objects.get(uid=point_uid)
+        assert [(r['status'], r['server_id'], r['uid']) for r in results['farms']] == [
+            ('created', farm.id, farm_uid)
+        ]
+        assert suggestion.property_location == farm
+        assert (point.farm, point.inspection_suggestion) == (farm, suggestion)
+
+        # Sending the same uids again updates the rows they were inserted as
+        data['farms'][0]['name'] = 'Renamed Farm'
+        retry = client.post(sync_data_url, data=json.dumps(data), content_type='application/json')
+
+        statuses = {
+            entity: [(r['status'], r['server_id']) for r in rows] for entity, rows in retry.data['results'].items()
+        }
+        assert statuses['farms'] == [('updated', farm.id)]
+        assert statuses['inspection_suggestions'] == [('unchanged', suggestion.id)]
+        assert statuses['observation_points'] == [('unchanged', point.id)]
+        assert Farm.objects.get(id=farm.id).name == 'Renamed Farm'
+
+    def test_server_generated_uids_are_time_ordered(self, farm):
+        """Test that rows created on the server get version 7 uids that sort by creation time."""
+        assert farm.uid.version == 7
+        assert uuid7(1_000) < uuid7(2_000)
+        assert uuid.UUID(str(uuid7())).variant == uuid.RFC_4122
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sync_data_commit_every(self, authenticated_client, sync_data_url, farm, settings, monkeypatch):
+        """Test that with SYNC_COMMIT_EVERY each chunk commits with its digest update."""
+        client, user = authenticated_client
+        settings.SYNC_COMMIT_EVERY = 2
+        track = digests.track
+        calls = []
+
+        def track_then_crash(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            track(*args)
+
+        monkeypatch.setattr(digests, 'track', track_then_crash)
+        data = {'boundary_points': [
+            {'id': i, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': float(i)} for i in range(1, 6)
+        ]}
+
+        with pytest.raises(RuntimeError):
+            client.post(sync_data_url, data=json.dumps(data), content_type='application/json')
+
+        assert sorted(BoundaryPoint.objects.filter(farm=farm).values_list('id', flat=True)) == [1, 2]
+        stored = digests.farm_node(farm)
+        digests.rebuild([farm.id])
+        assert digests.farm_node(farm) == stored
+
+    def test_sync_data_columnar_gzip_results(self, authenticated_client, sync_data_url, farm):
+        """Test that results can be requested as gzipped parallel arrays."""
+        client, user = authenticated_client
+        data = {'boundary_points': [
+            {'id': 1, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0},
+            {'id': 2, 'farm_id': 999999, 'latitude': 1.0, 'longitude': 2.0},
+        ]}
+
+        response = client.post(f'{sync_data_url}?results=columnar', data=json.dumps(data),
+                               content_type='application/json', HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Encoding'] == 'gzip'
+        body = json.loads(gzip.decompress(response.content))
+        points = body['results']['boundary_points']
+        assert points['mobile_id'] == [1, 2]
+        assert points['server_id'] == [1, None]
+        assert [points['statuses'][code] for code in points['status']] == ['created', 'failed']
+        assert points['messages'] == {'1': 'Farm 999999 not found'}
+        assert body['results']['farms']['status'] == []
+
+    @pytest.mark.parametrize('accept_encoding, compressed', [
+        ('gzip;q=0', False),
+        ('x-gzip', False),
+        ('br, gzip;q=0.5', True),
+        ('*', True),
+        ('*, gzip;q=0', False),
+        ('', False),
+    ])
+    def test_sync_data_gzip_negotiation(self, authenticated_client, sync_data_url, farm, accept_encoding,
+                                        compressed):
+        """Test that gzip is only used when Accept-Encoding gives it a non-zero q-value."""
+        client, user = authenticated_client
+        data = {'boundary_points': [
+            {'id': i, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0} for i in range(1, 20)
+        ]}
+
+        response = client.post(sync_data_url, data=json.dumps(data), content_type='application/json',
+                               HTTP_ACCEPT_ENCODING=accept_encoding)
+
+        assert response.has_header('Content-Encoding') == compressed
+        assert 'Accept-Encoding' in response['Vary']
@@ -0,0 +1,133 @@
+import pytest
+import json
+import threading
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from farm.jobs import claim_next_job, requeue_stale_jobs, work
+from farm.models import BoundaryPoint, Farm, SyncJob
+from farm.tests.conftest import UserFactory
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _enqueue(client, url, data, **headers):
+    return client.post(
+        url,
+        data=json.dumps(data),
+        content_type='application/json',
+        HTTP_PREFER='respond-async',
+        **headers
+    )
+
+
+class TestSyncJobs:
+    """Test asynchronous sync jobs."""
+
+    def test_enqueue_returns_accepted(self, authenticated_client, sync_data_url, farm):
+        """Test that an async sync is queued without touching the farm tables."""
+        client, user = authenticated_client
+        data = {'boundary_points': [{'id': 1, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0}]}
+
+        response = _enqueue(client, sync_data_url, data)
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job = SyncJob.objects.get(id=response.data['job_id'])
+        assert job.status == 'queued'
+        assert job.total_rows == 1
+        assert response['Location'] == response.data['status_url']
+        assert not BoundaryPoint.objects.filter(id=1).exists()
+
+    def test_worker_processes_job(self, authenticated_client, sync_data_url, farm, settings):
+        """Test that the worker command applies the payload and stores per-record results."""
+        client, user = authenticated_client
+        settings.SYNC_BATCH_SIZE = 2
+        data = {'boundary_points': [
+            {'id': i, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0} for i in range(1, 6)
+        ] + [{'id': 6, 'farm_id': 999999, 'latitude': 1.0, 'longitude': 2.0}]}
+        job_id = _enqueue(client, sync_data_url, data).data['job_id']
+
+        call_command('process_sync_jobs', workers=1, once=True)
+
+        response = client.get(reverse('sync-job-detail', kwargs={'pk': job_id}))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == 'succeeded'
+        assert response.data['processed_rows'] == response.data['total_rows'] == 6
+        statuses = [r['status'] for r in response.data['results']['boundary_points']]
+        assert statuses == ['created'] * 5 + ['failed']
+        assert BoundaryPoint.objects.filter(farm=farm).count() == 5
+
+    def test_temporary_ids_are_scoped_to_device(self, authenticated_client, sync_data_url):
+        """Test that queued jobs resolve temporary ids under the device that sent them."""
+        client, user = authenticated_client
+        data = {
+            'farms': [{'id': -1, 'name': 'Offline Farm', 'size': 10.0, 'plant_type': 'Maize'}],
+            'boundary_points': [{'id': -1, 'farm_id': -1, 'latitude': 1.0, 'longitude': 2.0}],
+        }
+        jobs = [
+            _enqueue(client, sync_data_url, data, HTTP_X_DEVICE_ID=device).data['job_id']
+            for device in ['phone-a', 'phone-b', 'phone-a']
+        ]
+
+        call_command('process_sync_jobs', workers=1, once=True)
+
+        results = [SyncJob.objects.get(id=job_id).results for job_id in jobs]
+        farms = [result['farms'][0]['server_id'] for result in results]
+        assert farms[0] != farms[1] and farms[2] == farms[0]
+        assert [result['farms'][0]['status'] for result in results] == ['created', 'created', 'unchanged']
+        assert Farm.objects.filter(user=user).count() == 2
+        assert BoundaryPoint.objects.filter(farm_id=farms[1]).count() == 1
+
+    def test_job_is_claimed_once(self, authenticated_client, sync_data_url):
+        """Test that a claimed job is not handed to a second worker."""
+        client, user = authenticated_client
+        _enqueue(client, sync_data_url, {'farms': []})
+
+        assert claim_next_job('a') is not None
+        assert claim_next_job('b') is None
+
+    def test_stale_running_job_is_requeued(self, authenticated_client, sync_data_url):
+        """Test that a job abandoned by a dead worker goes back in the queue."""
+        client, user = authenticated_client
+        job_id = _enqueue(client, sync_data_url, {'farms': []}).data['job_id']
+        claim_next_job('dead-worker')
+
+        assert requeue_stale_jobs(-1) == 1
+        assert SyncJob.objects.get(id=job_id).status == 'queued'
+
+    def test_worker_loop_requeues_stale_jobs(self, authenticated_client, sync_data_url):
+        """Test that a running worker requeues, then runs, a job abandoned by another one."""
+        client, user = authenticated_client
+        job_id = _enqueue(client, sync_data_url, {'farms': []}).data['job_id']
+        claim_next_job('dead-worker')
+
+        work('live-worker', threading.Event(), once=True, stale_after=-1)
+
+        job = SyncJob.objects.get(id=job_id)
+        assert (job.status, job.worker) == ('succeeded', 'live-worker')
+
+    def test_jobs_are_scoped_to_user(self, authenticated_client):
+        """Test that another user's job cannot be polled."""
+        client, user = authenticated_client
+        job = SyncJob.objects.create(user=UserFactory(), payload={})
+
+        response = client.get(reverse('sync-job-detail', kwargs={'pk': job.pk}))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_enqueue_rejects_non_object(self, authenticated_client, sync_data_url):
+        """Test that only a JSON object can be queued."""
+        client, user = authenticated_client
+
+        response = _enqueue(client, sync_data_url, [1, 2])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_enqueue_rejects_non_list_entities(self, authenticated_client, sync_data_url):
+        """Test that entity keys holding anything but a list are rejected before a job is queued."""
+        client, user = authenticated_client
+
+        response = _enqueue(client, sync_data_url, {'farms': 5})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not SyncJob.objects.exists()
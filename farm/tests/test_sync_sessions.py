@@ -0,0 +1,127 @@
+import pytest
+import json
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from farm.models import BoundaryPoint, SyncSession
+from farm.tests.conftest import UserFactory
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _chunk_url(session_id, index):
+    return reverse('sync-session-chunk', kwargs={'pk': session_id, 'index': index})
+
+
+def _put_chunk(client, session_id, index, data):
+    return client.put(_chunk_url(session_id, index), data=json.dumps(data), content_type='application/json')
+
+
+def _points(farm, ids):
+    return {'boundary_points': [
+        {'id': i, 'farm_id': farm.id, 'latitude': 1.0, 'longitude': 2.0} for i in ids
+    ]}
+
+
+class TestSyncSessions:
+    """Test chunked, resumable sync sessions."""
+
+    def test_open_upload_and_commit(self, authenticated_client, farm):
+        """Test the full open -> chunks -> commit flow."""
+        client, user = authenticated_client
+
+        response = client.post(reverse('sync-session-list'), {'total_chunks': 2}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        session_id = response.data['id']
+        assert response.data['next_chunk'] == 0
+
+        response = _put_chunk(client, session_id, 0, _points(farm, [1, 2]))
+        assert response.status_code == status.HTTP_200_OK
+        assert [r['status'] for r in response.data['results']['boundary_points']] == ['created', 'created']
+
+        response = client.post(reverse('sync-session-commit', kwargs={'pk': session_id}))
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data['missing_chunks'] == [1]
+
+        _put_chunk(client, session_id, 1, _points(farm, [3]))
+        response = client.post(reverse('sync-session-commit', kwargs={'pk': session_id}))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == 'committed'
+        assert response.data['summary'] == {
+            'farms': {}, 'boundary_points': {'created': 3}, 'observation_points': {},
+            'inspection_suggestions': {}, 'inspection_observations': {},
+        }
+        assert BoundaryPoint.objects.filter(farm=farm).count() == 3
+
+    def test_resume_after_dropped_connection(self, authenticated_client, farm):
+        """Test that the session reports where to resume and re-sent chunks are not re-applied."""
+        client, user = authenticated_client
+        session = SyncSession.objects.create(user=user)
+
+        first = _put_chunk(client, session.id, 0, _points(farm, [1]))
+        _put_chunk(client, session.id, 2, _points(farm, [3]))
+        BoundaryPoint.objects.filter(id=1).delete()
+
+        response = client.get(reverse('sync-session-detail', kwargs={'pk': session.id}))
+        assert response.data['acknowledged_chunks'] == [0, 2]
+        assert response.data['next_chunk'] == 1
+
+        replay = _put_chunk(client, session.id, 0, _points(farm, [1]))
+        assert replay.data['replayed'] is True
+        assert replay.data['results'] == first.data['results']
+        assert not BoundaryPoint.objects.filter(id=1).exists()
+
+    def test_chunk_with_different_content_conflicts(self, authenticated_client, farm):
+        """Test that an applied chunk index cannot be reused for other rows."""
+        client, user = authenticated_client
+        session = SyncSession.objects.create(user=user)
+        _put_chunk(client, session.id, 0, _points(farm, [1]))
+
+        response = _put_chunk(client, session.id, 0, _points(farm, [2]))
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_committed_session_rejects_new_chunks(self, authenticated_client, farm):
+        """Test that no chunks can be added after commit."""
+        client, user = authenticated_client
+        session = SyncSession.objects.create(user=user, status='committed')
+
+        response = _put_chunk(client, session.id, 0, _points(farm, [1]))
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_chunk_out_of_range(self, authenticated_client, farm):
+        """Test that chunk indexes are bounded by total_chunks."""
+        client, user = authenticated_client
+        session = SyncSession.objects.create(user=user, total_chunks=1)
+
+        response = _put_chunk(client, session.id, 1, _points(farm, [1]))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_sessions_are_scoped_to_user(self, authenticated_client, farm):
+        """Test that another user's session cannot be used."""
+        client, user = authenticated_client
+        session = SyncSession.objects.create(user=UserFactory())
+
+        response = _put_chunk(client, session.id, 0, _points(farm, [1]))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_list_query_count(self, authenticated_client, farm):
+        """Test that listing sessions reads their chunks in one query, however many sessions there are."""
+        client, user = authenticated_client
+        for session_id in [SyncSession.objects.create(user=user).id for _ in range(2)]:
+            _put_chunk(client, session_id, 0, _points(farm, [session_id * 10]))
+
+        with CaptureQueriesContext(connection) as few:
+            client.get(reverse('sync-session-list'))
+        for session_id in [SyncSession.objects.create(user=user).id for _ in range(3)]:
+            _put_chunk(client, session_id, 1, _points(farm, [session_id * 10 + 1]))
+        with CaptureQueriesContext(connection) as many:
+            response = client.get(reverse('sync-session-list'))
+
+        assert len(many) == len(few)
+        assert [item['next_chunk'] for item in response.data['results']] == [0, 0, 0, 1, 1]
@@ -8,8 +8,12 @@ router.register(r'boundary-points', views.BoundaryPointViewSet, basename='bounda
 router.register(r'observation-points', views.ObservationPointViewSet, basename='observation-point')
 router.register(r'inspection-suggestions', views.InspectionSuggestionViewSet, basename='inspection-suggestion')
 router.register(r'inspection-observations', views.InspectionObservationViewSet, basename='inspection-observation')
+router.register(r'sync-jobs', views.SyncJobViewSet, basename='sync-job')
+router.register(r'sync-sessions', views.SyncSessionViewSet, basename='sync-session')
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('sync-data/', views.SyncDataAPIView.as_view(), name='sync-data')
+    path('sync-data/', views.SyncDataAPIView.as_view(), name='sync-data'),
+    path('changes/', views.ChangeFeedAPIView.as_view(), name='changes'),
+    path('digest/', views.DigestAPIView.as_view(), name='digest'),
 ]
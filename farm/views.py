@@ -1,19 +1,86 @@
 # api/views.py
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation
+from rest_framework.settings import api_settings
+from .models import (
+    Farm, BoundaryPoint, ObservationPoint, InspectionSuggestion, InspectionObservation, SyncJob, SyncSession,
+    SyncSessionChunk,
+)
+from .caching import CachedResponseMixin
+from .changes import (
+    ENTITY_MODELS, changes_since, changed_ids, current_cursor, parse_cursor
+)
+from . import digests
+from . import geometry
+from .idempotency import idempotent, request_digest
+from .jobs import enqueue_sync_job
+from .fieldsets import SparseQuerysetMixin
+from .filters import BoundingBoxFilter
+from .listing import FastListMixin
+from . import mobile_ids
+from . import snapshots
+from .parsers import NDJSONParser
+from .results import compact_results
+from .sync import ENTITY_KEYS, BulkSyncEngine, replace_boundary, stream_sync
 from farm.serializers import (
     FarmSerializer, BoundaryPointSerializer, ObservationPointSerializer,
-    InspectionSuggestionSerializer, InspectionObservationSerializer, ObservationPointBulkSyncSerializer,
-    InspectionSuggestionBulkSyncSerializer
+    InspectionSuggestionSerializer, InspectionObservationSerializer, FarmBulkSyncSerializer,
+    BoundaryPointBulkSyncSerializer, ObservationPointBulkSyncSerializer, InspectionSuggestionBulkSyncSerializer,
+    FarmSnapshotSerializer, SyncJobSerializer, SyncSessionSerializer
 )
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework.decorators import action
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from backend.renderers import dumps
+
+
+
+def pending_sync_response(viewset, request, entity_type):
+    """
+    List the viewset's rows changed since the ``since`` cursor.
+
+    The cursor is read before the rows, so a write racing with this request is
+    delivered again on the next call rather than missed.
+    """
+    try:
+        since = parse_cursor(request.query_params.get('since'))
+    except ValueError:
+        return Response(
+            {'error': 'Invalid since cursor. Use the X-Change-Cursor value of the previous response'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    cursor = current_cursor(request.user)
+    queryset = viewset.filter_queryset(viewset.get_queryset())
+    if since is not None:
+        queryset = queryset.filter(id__in=changed_ids(request.user, entity_type, since))
 
+    serializer = viewset.get_serializer(queryset, many=True)
+    response = Response(serializer.data)
+    response['X-Change-Cursor'] = str(cursor)
+    return response
+
+
+def sync_response(results):
+    """
+    Answer a per-entity sync with its per-row ``results`` and their counts by status.
+    """
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+    for result in results:
+        counts[result['status']] += 1
+    return Response({
+        'status': 'success',
+        **counts,
+        'results': results
+    })
 
 
 @extend_schema(
@@ -21,7 +88,7 @@ from django.db import transaction
         OpenApiParameter("id", int, OpenApiParameter.PATH)
     ]
 )
-class FarmViewSet(viewsets.ModelViewSet):
+class FarmViewSet(CachedResponseMixin, SparseQuerysetMixin, FastListMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = FarmSerializer
 
@@ -33,79 +100,75 @@ class FarmViewSet(viewsets.ModelViewSet):
 
 
     @action(detail=False, methods=['post'])
-    @transaction.atomic
+    @compact_results
+    @idempotent(chunked=True)
     def sync(self, request):
         """
         Sync farms from the mobile app.
 
-        This endpoint handles bulk creation, update, and deletion of farms.
-        It expects a list of farms with mobile_id to identify them.
+        This endpoint handles bulk creation and update of farms, keyed by the
+        ``id`` the app assigned: it is looked up in the device's id mappings,
+        never taken as a server id. Farms whose content already matches the
+        server are reported as ``unchanged`` and not written.
         """
-        serializer = FarmSerializer(data=request.data)
+        serializer = FarmBulkSyncSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        farms_data = serializer.validated_data['farms']
-
-        # Track results
-        created_count = 0
-        updated_count = 0
-        failed_count = 0
-        results = []
-
-        for farm_data in farms_data:
-            try:
-                # Extract mobile_id
-                mobile_id = farm_data.get('id')
-
-                # Check if farm exists
-                farm = Farm.objects.filter(mobile_id=mobile_id).first()
-
-                if farm:
-                    # Update existing farm
-                    for key, value in farm_data.items():
-                        setattr(farm, key, value)
-
-                    farm.last_synced = timezone.now()
-                    farm.sync_status = 'synced'
-                    farm.save()
-
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'server_id': farm.id,
-                        'status': 'updated'
-                    })
-                    updated_count += 1
-                else:
-                    # Create new farm
-                    new_farm_data = {k: v for k, v in farm_data.items() if k != 'id'}
-                    new_farm_data['mobile_id'] = mobile_id
-                    new_farm_data['user'] = request.user
-
-                    farm = Farm.objects.create(**new_farm_data)
-
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'server_id': farm.id,
-                        'status': 'created'
-                    })
-                    created_count += 1
-
-            except Exception as e:
-                results.append({
-                    'mobile_id': farm_data.get('id'),
-                    'status': 'failed',
-                    'message': str(e)
-                })
-                failed_count += 1
+        engine = BulkSyncEngine(
+            request.user, device=mobile_ids.device_id(request), commit_every=settings.SYNC_COMMIT_EVERY
+        )
+        results = engine.run_mobile('farms', serializer.validated_data['farms'])
+        return sync_response(results)
 
-        return Response({
-            'status': 'success',
-            'created': created_count,
-            'updated': updated_count,
-            'failed': failed_count,
-            'results': results
-        })
+    @action(detail=True, methods=['get'])
+    def snapshot(self, request, pk=None):
+        """
+        Get the farm with all its boundary points, observation points,
+        inspection suggestions and observations.
+
+        The hierarchy is loaded in a fixed number of queries. Send the ``ETag``
+        of the last snapshot as ``If-None-Match`` to get a 304 if it is unchanged.
+        """
+        def build():
+            farm = snapshots.with_hierarchy(self.get_queryset()).filter(pk=pk).first()
+            if farm is None:
+                raise NotFound()
+            return FarmSnapshotSerializer(farm, context=self.get_serializer_context()).data
+
+        return snapshots.etag_response(request, build)
+
+    @action(detail=False, methods=['get'], url_path='snapshot', url_name='snapshots')
+    def snapshot_all(self, request):
+        """
+        Get every farm of the user with its whole hierarchy, like ``snapshot``.
+        """
+        def build():
+            farms = snapshots.with_hierarchy(self.get_queryset())
+            return FarmSnapshotSerializer(farms, many=True, context=self.get_serializer_context()).data
+
+        return snapshots.etag_response(request, build)
+
+    @action(detail=True, methods=['get'])
+    def digest(self, request, pk=None):
+        """
+        Get the farm's digest and the digests of its child collections.
+
+        With ``?collection=<name>`` the ``[id, content_hash]`` leaves of that
+        collection are included, so a client can find the individual rows that
+        differ.
+        """
+        farm = self.get_object()
+        node = digests.farm_node(farm)
+        collection = request.query_params.get('collection')
+        if collection:
+            if collection not in digests.COLLECTION_NAMES:
+                return Response(
+                    {'error': f"Unknown collection; expected one of {', '.join(digests.COLLECTION_NAMES)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            node['rows'] = digests.leaves(farm, collection)
+        return Response(node)
 
 
 @extend_schema(
@@ -113,88 +176,56 @@ class FarmViewSet(viewsets.ModelViewSet):
         OpenApiParameter("id", int, OpenApiParameter.PATH)
     ]
 )
-class BoundaryPointViewSet(viewsets.ModelViewSet):
+class BoundaryPointViewSet(CachedResponseMixin, SparseQuerysetMixin, FastListMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = BoundaryPointSerializer
+    pagination_ordering = ('timestamp', 'id')
 
     def get_queryset(self):
         return BoundaryPoint.objects.filter(farm__user=self.request.user)
 
+    @action(detail=False, methods=['post'])
+    @idempotent
     def sync(self, request):
         """
-        Sync boundary points from the mobile app.
+        Replace a farm's boundary from the mobile app.
 
-        This endpoint handles bulk creation, update, and deletion of boundary points.
-        It expects a list of boundary points with mobile_id to identify them.
+        The request carries the farm's whole boundary ring in order; it replaces
+        the stored ring in one diff pass, so saving a boundary of any size is a
+        single request and a fixed number of queries. The response lists the
+        ring's points with their server ids, and its bounding box and area.
         """
-        serializer = BoundaryPointSerializer(data=request.data)
+        serializer = BoundaryPointBulkSyncSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        boundary_points_data = serializer.validated_data['boundary_points']
-
-        # Track results
-        created_count = 0
-        updated_count = 0
-        failed_count = 0
-        results = []
-
-        for point_data in boundary_points_data:
-            try:
-                # Extract mobile_id and farm_id
-                mobile_id = point_data.get('id')
-                farm_id = point_data.get('farm_id')
-
-                # Verify farm belongs to user
-                farm = Farm.objects.filter(id=farm_id, user=request.user).first()
-                if not farm:
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'status': 'failed',
-                        'message': f'Farm with ID {farm_id} not found or does not belong to user'
-                    })
-                    failed_count += 1
-                    continue
-
-                # Check if boundary point exists
-                point = BoundaryPoint.objects.filter(mobile_id=mobile_id).first()
-
-                if point:
-                    # Update existing point
-                    for key, value in point_data.items():
-                        if key not in ['id', 'mobile_id']:
-                            setattr(point, key, value)
-
-                    point.last_synced = timezone.now()
-                    point.sync_status = 'synced'
-                    point.save()
-
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'server_id': point.id,
-                        'status': 'updated'
-                    })
-                    updated_count += 1
-                else:
-                    # Create new point
-                    new_point_data = {k: v for k, v in point_data.items() if k not in ['id', 'farm_id']}
-                    new_point_data['farm'] = farm
-                    new_point_data['mobile_id'] = mobile_id
-
-                    point = BoundaryPoint.objects.create(**new_point_data)
-
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'server_id': point.id,
-                        'status': 'created'
-                    })
-                    created_count += 1
-
-            except Exception as e:
-                results.append({
-                    'mobile_id': point_data.get('id'),
-                    'status': 'failed',
-                    'message': str(e)})
+        farm_id = serializer.validated_data['farm_id']
+        vertices = serializer.validated_data['boundary_points']
+        with transaction.atomic():
+            # Lock the farm so concurrent replaces of its ring run one after the other
+            farm = Farm.objects.select_for_update().filter(id=farm_id, user=request.user).first()
+            if not farm:
+                return Response(
+                    {'error': f'Farm with ID {farm_id} not found or does not belong to user'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            points, counts = replace_boundary(farm, vertices)
+
+        return Response({
+            'status': 'success',
+            'farm_id': farm.id,
+            **counts,
+            **geometry.ring_geometry([(point.latitude, point.longitude) for point in points]),
+            'boundary_points': [
+                {
+                    'id': point.id,
+                    'latitude': point.latitude,
+                    'longitude': point.longitude,
+                    'description': point.description,
+                }
+                for point in points
+            ]
+        })
 
 
 @extend_schema(
@@ -202,12 +233,15 @@ class BoundaryPointViewSet(viewsets.ModelViewSet):
         OpenApiParameter("id", int, OpenApiParameter.PATH)
     ]
 )
-class ObservationPointViewSet(viewsets.ModelViewSet):
+class ObservationPointViewSet(CachedResponseMixin, SparseQuerysetMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for ObservationPoint model.
+
+    ``?bbox=min_lon,min_lat,max_lon,max_lat`` restricts the points to a map viewport.
     """
     serializer_class = ObservationPointSerializer
     permission_classes = [IsAuthenticated]
+    filter_backends = [BoundingBoxFilter]
 
     def get_queryset(self):
         """
@@ -216,7 +250,8 @@ class ObservationPointViewSet(viewsets.ModelViewSet):
         return ObservationPoint.objects.filter(farm__user=self.request.user)
 
     @action(detail=False, methods=['post'])
-    @transaction.atomic
+    @compact_results
+    @idempotent(chunked=True)
     def sync(self, request):
         """
         Sync observation points from the mobile app.
@@ -228,130 +263,22 @@ class ObservationPointViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        observation_points_data = serializer.validated_data['observation_points']
-
-        # Track results
-        created_count = 0
-        updated_count = 0
-        failed_count = 0
-        results = []
-
-        for point_data in observation_points_data:
-            try:
-                # Extract mobile_id and farm_id
-                mobile_id = point_data.get('id')
-                farm_id = point_data.get('farm_id')
-
-                # Verify farm belongs to user
-                farm = Farm.objects.filter(id=farm_id, user=request.user).first()
-                if not farm:
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'status': 'failed',
-                        'message': f'Farm with ID {farm_id} not found or does not belong to user'
-                    })
-                    failed_count += 1
-                    continue
-
-                # Check if observation point exists
-                point = ObservationPoint.objects.filter(mobile_id=mobile_id).first()
-
-                if point:
-                    # Update existing point
-                    for key, value in point_data.items():
-                        if key not in ['id', 'mobile_id']:
-                            if key == 'farm_id':
-                                # Handle foreign key
-                                point.farm = farm
-                            elif key == 'inspection_suggestion_id':
-                                # Handle foreign key
-                                suggestion = InspectionSuggestion.objects.filter(
-                                    id=value,
-                                    property_location__user=request.user
-                                ).first()
-                                point.inspection_suggestion = suggestion
-                            else:
-                                setattr(point, key, value)
-
-                    point.last_synced = timezone.now()
-                    point.sync_status = 'synced'
-                    point.save()
-
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'server_id': point.id,
-                        'status': 'updated'
-                    })
-                    updated_count += 1
-                else:
-                    # Create new point
-                    new_point_data = {k: v for k, v in point_data.items() if
-                                      k not in ['id', 'farm_id', 'inspection_suggestion_id']}
-                    new_point_data['farm'] = farm
-                    new_point_data['mobile_id'] = mobile_id
-
-                    # Handle inspection suggestion if present
-                    if 'inspection_suggestion_id' in point_data:
-                        suggestion = InspectionSuggestion.objects.filter(
-                            id=point_data['inspection_suggestion_id'],
-                            property_location__user=request.user
-                        ).first()
-                        if suggestion:
-                            new_point_data['inspection_suggestion'] = suggestion
-
-                    new_point_data['last_synced'] = timezone.now()
-                    new_point_data['sync_status'] = 'synced'
-
-                    point = ObservationPoint.objects.create(**new_point_data)
-
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'server_id': point.id,
-                        'status': 'created'
-                    })
-                    created_count += 1
-
-            except Exception as e:
-                results.append({
-                    'mobile_id': point_data.get('id'),
-                    'status': 'failed',
-                    'message': str(e)
-                })
-                failed_count += 1
-
-        return Response({
-            'status': 'success',
-            'created': created_count,
-            'updated': updated_count,
-            'failed': failed_count,
-            'results': results
-        })
+        engine = BulkSyncEngine(
+            request.user, device=mobile_ids.device_id(request), commit_every=settings.SYNC_COMMIT_EVERY
+        )
+        results = engine.run_mobile('observation_points', serializer.validated_data['observation_points'])
+        return sync_response(results)
 
     @action(detail=False, methods=['get'])
     def pending_sync(self, request):
         """
         Get observation points that need to be synced to the mobile app.
 
-        This endpoint returns observation points that have been updated on the server
-        since the last sync.
+        Pass the ``X-Change-Cursor`` header of the previous response as ``since``
+        to get only the observation points inserted or updated on the server after it.
+        Deletions are only reported by the change feed (``/api/changes/``).
         """
-        last_sync = request.query_params.get('last_sync')
-
-        if last_sync:
-            try:
-                last_sync_time = timezone.datetime.fromisoformat(last_sync.replace('Z', '+00:00'))
-                queryset = self.get_queryset().filter(updated_at__gt=last_sync_time)
-            except ValueError:
-                return Response(
-                    {'error': 'Invalid last_sync format. Use ISO format (YYYY-MM-DDTHH:MM:SS.sssZ)'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        else:
-            # If no last_sync provided, return all observation points
-            queryset = self.get_queryset()
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return pending_sync_response(self, request, 'observation_points')
 
 
 @extend_schema(
@@ -359,7 +286,7 @@ class ObservationPointViewSet(viewsets.ModelViewSet):
         OpenApiParameter("id", int, OpenApiParameter.PATH)
     ]
 )
-class InspectionSuggestionViewSet(viewsets.ModelViewSet):
+class InspectionSuggestionViewSet(CachedResponseMixin, SparseQuerysetMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for InspectionSuggestion model.
     """
@@ -379,7 +306,8 @@ class InspectionSuggestionViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
     @action(detail=False, methods=['post'])
-    @transaction.atomic
+    @compact_results
+    @idempotent(chunked=True)
     def sync(self, request):
         """
         Sync inspection suggestions from the mobile app.
@@ -391,143 +319,25 @@ class InspectionSuggestionViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        suggestions_data = serializer.validated_data['inspection_suggestions']
-
-        # Track results
-        created_count = 0
-        updated_count = 0
-        failed_count = 0
-        results = []
-
-        for suggestion_data in suggestions_data:
-            try:
-                # Extract mobile_id and farm_id
-                mobile_id = suggestion_data.get('id')
-                farm_id = suggestion_data.get('property_location')
-
-                # Verify farm belongs to user
-                farm = Farm.objects.filter(id=farm_id, user=request.user).first()
-                if not farm:
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'status': 'failed',
-                        'message': f'Farm with ID {farm_id} not found or does not belong to user'
-                    })
-                    failed_count += 1
-                    continue
-
-                # Check if suggestion exists
-                suggestion = InspectionSuggestion.objects.filter(mobile_id=mobile_id).first()
-
-                if suggestion:
-                    # Update existing suggestion
-                    for key, value in suggestion_data.items():
-                        if key not in ['id', 'mobile_id', 'user']:
-                            if key == 'property_location':
-                                # Handle foreign key
-                                suggestion.property_location = farm
-                            else:
-                                setattr(suggestion, key, value)
-
-                    suggestion.last_synced = timezone.now()
-                    suggestion.sync_status = 'synced'
-                    suggestion.save()
-
-                    # Update related observation points
-                    self._update_observation_points(suggestion)
-
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'server_id': suggestion.id,
-                        'status': 'updated'
-                    })
-                    updated_count += 1
-                else:
-                    # Create new suggestion
-                    new_suggestion_data = {k: v for k, v in suggestion_data.items() if
-                                           k not in ['id', 'property_location', 'user']}
-                    new_suggestion_data['property_location'] = farm
-                    new_suggestion_data['user'] = request.user
-                    new_suggestion_data['mobile_id'] = mobile_id
-                    new_suggestion_data['last_synced'] = timezone.now()
-                    new_suggestion_data['sync_status'] = 'synced'
-
-                    suggestion = InspectionSuggestion.objects.create(**new_suggestion_data)
-
-                    # Update related observation points
-                    self._update_observation_points(suggestion)
-
-                    results.append({
-                        'mobile_id': mobile_id,
-                        'server_id': suggestion.id,
-                        'status': 'created'
-                    })
-                    created_count += 1
-
-            except Exception as e:
-                results.append({
-                    'mobile_id': suggestion_data.get('id'),
-                    'status': 'failed',
-                    'message': str(e)
-                })
-                failed_count += 1
-
-        return Response({
-            'status': 'success',
-            'created': created_count,
-            'updated': updated_count,
-            'failed': failed_count,
-            'results': results
-        })
-
-    def _update_observation_points(self, suggestion):
-        """
-        Update observation points related to this suggestion.
-
-        When a suggestion is created or updated, we need to update the related
-        observation points with the suggestion's target_entity and confidence_level.
-        """
-        from farm.models import ObservationPoint
-
-        # Get all observation points for this farm
-        observation_points = ObservationPoint.objects.filter(
-            farm=suggestion.property_location
-        )
-
-        # Update them with the suggestion's data
-        observation_points.update(
-            inspection_suggestion=suggestion,
-            target_entity=suggestion.target_entity,
-            confidence_level=suggestion.confidence_level,
-            last_synced=timezone.now(),
-            sync_status='synced'
+        # Each affected farm's observation points are pointed at its last
+        # written suggestion, once per farm rather than once per suggestion
+        engine = BulkSyncEngine(
+            request.user, fan_out=True, device=mobile_ids.device_id(request),
+            commit_every=settings.SYNC_COMMIT_EVERY
         )
+        results = engine.run_mobile('inspection_suggestions', serializer.validated_data['inspection_suggestions'])
+        return sync_response(results)
 
     @action(detail=False, methods=['get'])
     def pending_sync(self, request):
         """
         Get inspection suggestions that need to be synced to the mobile app.
 
-        This endpoint returns inspection suggestions that have been updated on the server
-        since the last sync.
+        Pass the ``X-Change-Cursor`` header of the previous response as ``since``
+        to get only the inspection suggestions inserted or updated on the server after it.
+        Deletions are only reported by the change feed (``/api/changes/``).
         """
-        last_sync = request.query_params.get('last_sync')
-
-        if last_sync:
-            try:
-                last_sync_time = timezone.datetime.fromisoformat(last_sync.replace('Z', '+00:00'))
-                queryset = self.get_queryset().filter(updated_at__gt=last_sync_time)
-            except ValueError:
-                return Response(
-                    {'error': 'Invalid last_sync format. Use ISO format (YYYY-MM-DDTHH:MM:SS.sssZ)'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        else:
-            # If no last_sync provided, return all inspection suggestions
-            queryset = self.get_queryset()
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return pending_sync_response(self, request, 'inspection_suggestions')
 
 
 @extend_schema(
@@ -535,7 +345,7 @@ class InspectionSuggestionViewSet(viewsets.ModelViewSet):
         OpenApiParameter("id", int, OpenApiParameter.PATH)
     ]
 )
-class InspectionObservationViewSet(viewsets.ModelViewSet):
+class InspectionObservationViewSet(CachedResponseMixin, SparseQuerysetMixin, FastListMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = InspectionObservationSerializer
 
@@ -545,202 +355,183 @@ class InspectionObservationViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class SyncDataAPIView(APIView):
+@extend_schema(
+    parameters=[
+        OpenApiParameter("id", int, OpenApiParameter.PATH)
+    ]
+)
+class SyncJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Poll the progress and per-record results of asynchronous sync jobs.
+    """
     permission_classes = [IsAuthenticated]
+    serializer_class = SyncJobSerializer
+    pagination_ordering = ('-created_at', '-id')
 
-    @transaction.atomic
-    def post(self, request):
-        data = request.data
-        results = {
-            'farms': [],
-            'boundary_points': [],
-            'observation_points': [],
-            'inspection_suggestions': [],
-            'inspection_observations': []
-        }
-
-        # 1) Farms
-        for farm in data.get('farms', []):
-            try:
-                obj, created = Farm.objects.update_or_create(
-                    id=farm['id'],
-                    defaults={
-                        'name': farm['name'],
-                        'size': farm['size'],
-                        'plant_type': farm['plant_type'],
-                        'user': request.user,
-                    }
-                )
-                results['farms'].append({
-                    'mobile_id': farm['id'],
-                    'server_id': obj.id,
-                    'status': 'created' if created else 'updated'
-                })
-            except Exception as e:
-                results['farms'].append({
-                    'mobile_id': farm.get('id'),
-                    'status': 'failed',
-                    'message': str(e)
-                })
-
-        # 2) Boundary Points
-        for bp in data.get('boundary_points', []):
-            try:
-                farm_obj = Farm.objects.get(id=bp['farm_id'], user=request.user)
-            except Farm.DoesNotExist:
-                results['boundary_points'].append({
-                    'mobile_id': bp.get('id'),
-                    'status': 'failed',
-                    'message': f"Farm {bp.get('farm_id')} not found"
-                })
-                continue
-
-            try:
-                obj, created = BoundaryPoint.objects.update_or_create(
-                    id=bp['id'],
-                    defaults={
-                        'farm': farm_obj,
-                        'latitude': bp['latitude'],
-                        'longitude': bp['longitude'],
-                        'description': bp.get('description', ''),
-                    }
-                )
-                results['boundary_points'].append({
-                    'mobile_id': bp['id'],
-                    'server_id': obj.id,
-                    'status': 'created' if created else 'updated'
-                })
-            except Exception as e:
-                results['boundary_points'].append({
-                    'mobile_id': bp.get('id'),
-                    'status': 'failed',
-                    'message': str(e)
-                })
-
-        # 3) Observation Points
-        for op in data.get('observation_points', []):
-            try:
-                farm_obj = Farm.objects.get(id=op['farm_id'], user=request.user)
-            except Farm.DoesNotExist:
-                results['observation_points'].append({
-                    'mobile_id': op.get('id'),
-                    'status': 'failed',
-                    'message': f"Farm {op.get('farm_id')} not found"
-                })
-                continue
-
-            # optional FK
-            insp = None
-            if op.get('inspection_suggestion_id') is not None:
-                insp = InspectionSuggestion.objects.filter(
-                    id=op['inspection_suggestion_id'],
-                    user=request.user
-                ).first()
-
-            try:
-                obj, created = ObservationPoint.objects.update_or_create(
-                    id=op['id'],
-                    defaults={
-                        'farm': farm_obj,
-                        'latitude': op['latitude'],
-                        'longitude': op['longitude'],
-                        'observation_status': op.get('observation_status', 'Nil'),
-                        'name': op.get('name', ''),
-                        'segment': op.get('segment', 0),
-                        'inspection_suggestion': insp,
-                        'confidence_level': op.get('confidence_level'),
-                        'target_entity': op.get('target_entity'),
-                    }
-                )
-                results['observation_points'].append({
-                    'mobile_id': op['id'],
-                    'server_id': obj.id,
-                    'status': 'created' if created else 'updated'
-                })
-            except Exception as e:
-                results['observation_points'].append({
-                    'mobile_id': op.get('id'),
-                    'status': 'failed',
-                    'message': str(e)
-                })
-
-        # 4) Inspection Suggestions
-        for sug in data.get('inspection_suggestions', []):
-            try:
-                farm_obj = Farm.objects.get(id=sug['property_location'], user=request.user)
-            except Farm.DoesNotExist:
-                results['inspection_suggestions'].append({
-                    'mobile_id': sug.get('id'),
-                    'status': 'failed',
-                    'message': f"Farm {sug.get('property_location')} not found"
-                })
-                continue
-
-            try:
-                obj, created = InspectionSuggestion.objects.update_or_create(
-                    id=sug['id'], property_location=farm_obj,
-                    defaults={
-                        'target_entity': sug['target_entity'],
-                        'confidence_level': sug['confidence_level'],
-
-                        'area_size': sug.get('area_size', 0),
-                        'density_of_plant': sug.get('density_of_plant', 0),
-                        'user': request.user,
-                    }
-                )
-                results['inspection_suggestions'].append({
-                    'mobile_id': sug['id'],
-                    'server_id': obj.id,
-                    'status': 'created' if created else 'updated'
-                })
-            except Exception as e:
-                results['inspection_suggestions'].append({
-                    'mobile_id': sug.get('id'),
-                    'status': 'failed',
-                    'message': str(e)
-                })
-
-        # 5) Inspection Observations (if you have that array)
-        for obs in data.get('inspection_observations', []):
-            try:
-                farm_obj = Farm.objects.get(id=obs['farm'], user=request.user)
-                insp_obj = InspectionSuggestion.objects.get(
-                    id=obs['inspection'], user=request.user
+    def get_queryset(self):
+        return SyncJob.objects.filter(user=self.request.user).order_by('-created_at')
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter("id", int, OpenApiParameter.PATH)
+    ]
+)
+class SyncSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                         viewsets.GenericViewSet):
+    """
+    Resumable multi-request sync.
+
+    Open a session, upload numbered chunks (each a regular sync payload) with
+    ``PUT /api/sync-sessions/{id}/chunks/{index}/``, then commit it. Every chunk
+    is applied and acknowledged on its own, so after a dropped connection the
+    client asks for the session and resumes from ``next_chunk``.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = SyncSessionSerializer
+    pagination_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        # Only the chunk indexes are needed to render a session, not their results
+        chunks = SyncSessionChunk.objects.only('id', 'session_id', 'index')
+        return (
+            SyncSession.objects.filter(user=self.request.user)
+            .prefetch_related(Prefetch('chunks', queryset=chunks))
+            .order_by('-created_at')
+        )
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)', url_name='chunk')
+    def chunk(self, request, pk=None, index=None):
+        """
+        Apply one chunk of the session.
+
+        Re-sending a chunk that was already applied returns its stored results
+        without touching the farm tables.
+        """
+        index = int(index)
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Expected a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+        digest = request_digest(request)
+
+        with transaction.atomic():
+            session = SyncSession.objects.select_for_update().filter(pk=pk, user=request.user).first()
+            if session is None:
+                raise NotFound()
+            if session.total_chunks is not None and index >= session.total_chunks:
+                return Response(
+                    {'error': f'Chunk {index} is out of range for a session of {session.total_chunks} chunks'},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-            except (Farm.DoesNotExist, InspectionSuggestion.DoesNotExist) as e:
-                results['inspection_observations'].append({
-                    'mobile_id': obs.get('id'),
-                    'status': 'failed',
-                    'message': str(e)
-                })
-                continue
-
-            try:
-                obj, created = InspectionObservation.objects.update_or_create(
-                    id=obs['id'],
-                    defaults={
-                        'date': obs['date'],
-                        'inspection': insp_obj,
-                        'farm': farm_obj,
-                        'confidence': obs.get('confidence', ''),
-                        'plant_per_section': obs.get('plant_per_section', ''),
-                        'status': obs.get('status', ''),
-                        'target_entity': obs.get('target_entity'),
-                        'severity': obs.get('severity'),
-                        # if you have an ImageField you can skip or handle separately
-                    }
+
+            applied = session.chunks.filter(index=index).first()
+            if applied is not None:
+                if applied.digest != digest:
+                    return Response(
+                        {'error': f'Chunk {index} has already been applied with different content'},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                return Response({'index': index, 'replayed': True, 'results': applied.results})
+
+            if session.status != 'open':
+                return Response({'error': 'Sync session is already committed'}, status=status.HTTP_409_CONFLICT)
+
+            results = BulkSyncEngine(request.user, device=mobile_ids.device_id(request)).run(request.data)
+            session.chunks.create(
+                index=index,
+                digest=digest,
+                row_count=sum(len(rows) for rows in results.values()),
+                results=results,
+            )
+
+        return Response({'index': index, 'replayed': False, 'results': results})
+
+    @action(detail=True, methods=['post'])
+    def commit(self, request, pk=None):
+        """
+        Close the session once every chunk has been applied.
+        """
+        with transaction.atomic():
+            session = self.get_queryset().select_for_update().filter(pk=pk).first()
+            if session is None:
+                raise NotFound()
+
+            indexes = [chunk.index for chunk in session.chunks.all()]
+            expected = session.total_chunks if session.total_chunks is not None else len(indexes)
+            missing = sorted(set(range(expected)) - set(indexes))
+            if missing:
+                return Response(
+                    {'error': 'Sync session has missing chunks', 'missing_chunks': missing},
+                    status=status.HTTP_409_CONFLICT
                 )
-                results['inspection_observations'].append({
-                    'mobile_id': obs['id'],
-                    'server_id': obj.id,
-                    'status': 'created' if created else 'updated'
-                })
-            except Exception as e:
-                results['inspection_observations'].append({
-                    'mobile_id': obs.get('id'),
-                    'status': 'failed',
-                    'message': str(e)
-                })
+
+            if session.status == 'open':
+                session.status = 'committed'
+                session.committed_at = timezone.now()
+                session.save(update_fields=['status', 'committed_at'])
+
+        summary = {}
+        for results in session.chunks.values_list('results', flat=True):
+            for entity, rows in results.items():
+                counts = summary.setdefault(entity, {})
+                for row in rows:
+                    counts[row['status']] = counts.get(row['status'], 0) + 1
+
+        data = self.get_serializer(session).data
+        data['summary'] = summary
+        return Response(data)
+
+
+class SyncDataAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [*api_settings.DEFAULT_PARSER_CLASSES, NDJSONParser]
+
+    def post(self, request):
+        """
+        Sync farms, boundary points, observation points, inspection suggestions
+        and inspection observations in one request.
+
+        Rows are upserted set-wise by ``BulkSyncEngine``; the response still
+        carries one result per incoming row. An ``application/x-ndjson`` body is
+        consumed line by line and answered with a streamed NDJSON response.
+        With ``Prefer: respond-async`` the payload is queued as a ``SyncJob``
+        instead and the response is ``202 Accepted``.
+        """
+        if request.content_type.startswith(NDJSONParser.media_type):
+            return self.stream(request)
+        if 'respond-async' in request.headers.get('Prefer', ''):
+            return self.enqueue(request)
+        return self.sync(request)
+
+    @idempotent
+    def enqueue(self, request):
+        """
+        Queue the payload for the ``process_sync_jobs`` workers and answer 202
+        with the job to poll.
+        """
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Expected a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+        for key in ENTITY_KEYS:
+            if not isinstance(request.data.get(key, []), list):
+                return Response({'error': f'{key} must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = enqueue_sync_job(request.user, request.data, device=mobile_ids.device_id(request))
+        status_url = request.build_absolute_uri(reverse('sync-job-detail', kwargs={'pk': job.pk}))
+        return Response({
+            'job_id': job.pk,
+            'status': job.status,
+            'status_url': status_url
+        }, status=status.HTTP_202_ACCEPTED, headers={'Location': status_url})
+
+    @compact_results
+    @idempotent(chunked=True)
+    def sync(self, request):
+        engine = BulkSyncEngine(
+            request.user, device=mobile_ids.device_id(request), commit_every=settings.SYNC_COMMIT_EVERY
+        )
+        results = engine.run(request.data)
 
         # all done
         return Response({
@@ -748,3 +539,98 @@ class SyncDataAPIView(APIView):
             'timestamp': timezone.now().isoformat(),
             'results': results
         }, status=status.HTTP_200_OK)
+
+    def stream(self, request):
+        """
+        Streaming variant of the sync: one JSON object per line in, one result
+        per line out, followed by a summary line.
+        """
+        results = stream_sync(request.user, request.data, device=mobile_ids.device_id(request))
+
+        def lines():
+            for result in results:
+                yield dumps(result) + b'\n'
+            yield dumps({'status': 'success', 'timestamp': timezone.now().isoformat()}) + b'\n'
+
+        return StreamingHttpResponse(lines(), content_type=NDJSONParser.media_type)
+
+
+class ChangeFeedAPIView(APIView):
+    """
+    Pull the inserts, updates and deletes of the user's farm data after a cursor.
+
+    ``since`` is the ``cursor`` of the previous response (omit it for a full
+    pull) and ``limit`` caps the number of log entries read. Each change is the
+    latest state of one record: ``upsert`` carries the serialized row and
+    ``delete`` is a tombstone. A farm tombstone covers the farm's whole subtree.
+    Keep pulling while ``has_more`` is true.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 500
+    max_limit = 5000
+
+    serializer_classes = {
+        'farms': FarmSerializer,
+        'boundary_points': BoundaryPointSerializer,
+        'observation_points': ObservationPointSerializer,
+        'inspection_suggestions': InspectionSuggestionSerializer,
+        'inspection_observations': InspectionObservationSerializer,
+    }
+
+    def get(self, request):
+        try:
+            since = parse_cursor(request.query_params.get('since'))
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return Response(
+                {'error': 'since and limit must be non-negative integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, self.max_limit))
+
+        entries, cursor, has_more = changes_since(request.user, since, limit)
+
+        # Load the current state of every upserted record, one query per entity type
+        upserted = {}
+        for seq, entity_type, object_id, operation in entries:
+            if operation == 'upsert':
+                upserted.setdefault(entity_type, set()).add(object_id)
+
+        rows = {}
+        for entity_type, ids in upserted.items():
+            queryset = ENTITY_MODELS[entity_type].objects.filter(id__in=ids)
+            serializer = self.serializer_classes[entity_type](queryset, many=True, context={'request': request})
+            for data in serializer.data:
+                rows[(entity_type, data['id'])] = data
+
+        changes = []
+        for seq, entity_type, object_id, operation in entries:
+            data = rows.get((entity_type, object_id)) if operation == 'upsert' else None
+            change = {'seq': seq, 'entity': entity_type, 'id': object_id}
+            if data is None:
+                # Deleted since it was logged; its tombstone follows later in the feed
+                change['op'] = 'delete'
+            else:
+                change['op'] = 'upsert'
+                change['data'] = data
+            changes.append(change)
+
+        return Response({
+            'cursor': cursor,
+            'has_more': has_more,
+            'changes': changes
+        })
+
+
+class DigestAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Get the Merkle digest of the user's farm data: a user-level ``digest``
+        and, per farm, its ``digest`` and the digests of its ``collections``.
+
+        Compare them with the digests from the previous sync to find the farms
+        and collections that need to be pulled or pushed.
+        """
+        return Response(digests.digest_tree(request.user))